@@ -12,7 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-import copy
+import argparse
+import concurrent.futures
 from enum import StrEnum
 import hashlib
 import json
@@ -26,20 +27,53 @@ import subprocess
 import base64
 import binascii
 import atexit
+import contextlib
 import time
 import signal
+import socket
+import fcntl
 import re
+import ssl
+import threading
+import http.client
+import urllib.parse
 
 """
 Dynamic Plugin Installer for Backstage Application
 
 This script is used to install dynamic plugins in the Backstage application, and is available in the container image to be called at container initialization, for example in an init container when using Kubernetes.
 
-It expects, as the only argument, the path to the root directory where the dynamic plugins will be installed.
+It expects, as the only positional argument, the path to the root directory where the dynamic plugins will be installed.
+An optional `--jobs N` argument sets how many plugins are downloaded and extracted concurrently (overrides INSTALL_JOBS).
 
 Environment Variables:
     MAX_ENTRY_SIZE: Maximum size of a file in the archive (default: DEFAULT_MAX_ENTRY_SIZE, 40MB)
     SKIP_INTEGRITY_CHECK: Set to "true" to skip integrity check of remote packages
+    NPM_PACK_BATCH_SIZE: Maximum number of NPM and local packages grabbed by a single `npm pack` invocation
+        (default: DEFAULT_NPM_PACK_BATCH_SIZE, 1, i.e. one `npm pack` per package). Integrity checks and extraction still
+        happen per plugin, and packages of a failed batch are packed one by one.
+    NPM_REGISTRY_FETCH: Set to "true" to download NPM packages with an exact version or a dist-tag straight from the registry
+        configured in `.npmrc` (or NPM_CONFIG_REGISTRY) instead of running `npm pack` for each of them. Their integrity
+        is verified while they download. Other package specifications, and setups using a proxy, still go through `npm pack`.
+    OCI_LAYER_CACHE_DIR: Optional directory (e.g. on a persistent volume) where the layers of OCI plugin images are cached
+        by digest across runs. When the layer of an image is already cached and its checksum verifies, `skopeo copy` is skipped.
+    OCI_LAYER_CACHE_MAX_SIZE: Maximum size in bytes of the OCI layer cache (default: DEFAULT_OCI_LAYER_CACHE_MAX_SIZE, 5GB).
+        The least recently used layers are evicted first.
+    INCREMENTAL_PLUGIN_UPDATE: Set to "true" to update the directory of an already installed OCI plugin in place, writing only the
+        files that changed in the image and removing the files that are no longer in it, instead of extracting the plugin again.
+    PLUGIN_FILE_STORE: Set to "true" to keep the files of the installed plugins in a content-addressed store under the dynamic
+        plugins root (`.plugin-store`), and hard link them into the plugin directories, so that identical files are stored only once.
+    IMAGE_RESOLUTION_CACHE_TTL: Number of seconds during which the registry fallback decisions for images from
+        registry.access.redhat.com/rhdh/ are persisted in the dynamic plugins root and reused by later runs (default: 0, not persisted).
+        Within a run, each image is always probed at most once.
+    OCI_PLUGIN_PATHS_CACHE_TTL: Number of seconds during which the plugin paths auto-detected from the annotations of OCI images
+        referenced by tag are persisted in the dynamic plugins root and reused by later runs (default: 0, not persisted).
+        The plugin paths of images pinned by digest never change, and are always persisted.
+    INSTALL_LOCK_TIMEOUT: Number of seconds to wait for the lock held by another installation sharing the dynamic plugins root,
+        before failing (default: wait until the lock is released).
+    INSTALL_JOBS: Number of plugins downloaded and extracted concurrently (default: DEFAULT_INSTALL_JOBS, 1).
+        Plugin configurations are always merged in declaration order, whatever the number of jobs.
+        Also bounds the number of OCI manifests fetched concurrently to auto-detect plugin paths.
     CATALOG_INDEX_IMAGE: OCI image reference for the primary plugin catalog index (e.g., quay.io/rhdh/plugin-catalog-index:1.9).
         This is the only index from which dynamic-plugins.default.yaml is read.
     EXTRA_CATALOG_INDEX_IMAGES: Comma-separated list of additional catalog index image references.
@@ -114,12 +148,301 @@ RECOGNIZED_ALGORITHMS = (
 )
 
 DEFAULT_MAX_ENTRY_SIZE = 40000000  # 40MB
+DEFAULT_INSTALL_JOBS = 1
+DEFAULT_NPM_PACK_BATCH_SIZE = 1
+DEFAULT_OCI_LAYER_CACHE_MAX_SIZE = 5 * 1024 * 1024 * 1024  # 5GB
 
 DOCKER_PROTOCOL_PREFIX = 'docker://'
 OCI_PROTOCOL_PREFIX = 'oci://'
 RHDH_REGISTRY_PREFIX = 'registry.access.redhat.com/rhdh/'
 RHDH_FALLBACK_PREFIX = 'quay.io/rhdh/'
 
+DEFAULT_NPM_REGISTRY = 'https://registry.npmjs.org/'
+NPM_REGISTRY_TIMEOUT = 60  # seconds
+
+IMAGE_RESOLUTION_CACHE_FILE = '.image-resolution-cache.json'
+RUN_JOURNAL_FILE = '.install-journal.jsonl'
+# Fingerprints of the plugin configuration installed by the last completed run, and of its inputs
+INSTALL_STATE_FILE = '.install-state.json'
+# Environment variables that change the merged plugin configuration or the way it is installed
+INPUT_FINGERPRINT_ENV_VARS = ('CATALOG_INDEX_IMAGE', 'SKIP_INTEGRITY_CHECK', 'MAX_ENTRY_SIZE', 'INCREMENTAL_PLUGIN_UPDATE', 'PLUGIN_FILE_STORE')
+# Digest of the catalog index image last extracted, stored next to the extracted catalog-entities directory
+CATALOG_INDEX_STATE_FILE = '.catalog-index.json'
+CATALOG_INDEX_DEFAULT_PLUGINS_FILE = '.catalog-index-dynamic-plugins.default.yaml'
+# Prefix of the directories in which the catalog entities are extracted before being renamed into place
+CATALOG_ENTITIES_STAGING_PREFIX = '.catalog-entities-staging-'
+# Lock serializing the extractions into the same catalog entities directory, e.g. by replicas sharing it
+CATALOG_ENTITIES_LOCK_FILE = '.catalog-entities.lock'
+OCI_PLUGIN_PATHS_BY_DIGEST_CACHE_FILE = '.oci-plugin-paths-by-digest.json'
+OCI_PLUGIN_PATHS_BY_TAG_CACHE_FILE = '.oci-plugin-paths-by-tag.json'
+# Suffix of the member index stored next to each OCI layer tarball
+LAYER_MEMBER_INDEX_SUFFIX = '.index.json'
+# Age after which the temporary files of the OCI layer cache are considered left over by an interrupted run
+LAYER_CACHE_TMP_MAX_AGE = 3600  # seconds
+# State files written in the plugin directories after installation
+PLUGIN_STATE_FILES = ('dynamic-plugin-config.hash', 'dynamic-plugin-image.hash')
+# Directory of the content-addressed plugin file store, under the dynamic plugins root
+PLUGIN_FILE_STORE_DIR = '.plugin-store'
+# Prefix of the temporary directories, under the dynamic plugins root, in which plugins are extracted before being moved into place
+STAGING_DIR_PREFIX = '.install-staging-'
+
+# Guards the plugin_path_by_hash dict shared by concurrent plugin installations
+plugin_path_by_hash_lock = threading.Lock()
+
+class RunCache:
+    """
+    Thread-safe cache of values computed once per run, optionally persisted to a JSON file with a time-to-live.
+
+    Values are computed at most once per key, even when several threads ask for the same key concurrently.
+    When a file is configured, the entries younger than the time-to-live are loaded from it, and `save()` writes
+    the entries back so that later runs can reuse them. Values must be JSON-serializable to be persisted.
+    With `prune_unused`, only the entries used by the run are written back, so that a cache without expiration
+    does not keep growing with the keys of the previous configurations.
+    """
+
+    def __init__(self):
+        self._entries = {}  # {key: (value, timestamp)}
+        self._key_locks = {}
+        self._used = set()
+        self._lock = threading.Lock()
+        self.path = None
+        self.ttl = 0
+        self.prune_unused = False
+
+    def configure(self, path: str, ttl: float, prune_unused: bool = False) -> None:
+        """Persist the cache to `path`, loading the entries that are younger than `ttl` seconds."""
+        self.path = path
+        self.ttl = ttl
+        self.prune_unused = prune_unused
+        try:
+            with open(path, 'r') as f:
+                persisted = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(persisted, dict):
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, entry in persisted.items():
+                if isinstance(entry, dict) and 'value' in entry and now - entry.get('timestamp', 0) < ttl:
+                    self._entries.setdefault(key, (entry['value'], entry['timestamp']))
+
+    def get_or_compute(self, key: str, compute):
+        """Return the cached value for `key`, calling `compute()` to create it on first use."""
+        with self._lock:
+            self._used.add(key)
+            if key in self._entries:
+                return self._entries[key][0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    return self._entries[key][0]
+            value = compute()
+            with self._lock:
+                self._entries[key] = (value, time.time())
+            return value
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry is not None else default
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._used.add(key)
+            self._entries[key] = (value, time.time())
+
+    def touch(self, key: str) -> None:
+        """Mark the entry of `key` as used by the run, when its value is obtained elsewhere."""
+        with self._lock:
+            self._used.add(key)
+
+    def values(self) -> list:
+        with self._lock:
+            return [value for value, _ in self._entries.values()]
+
+    def save(self) -> None:
+        """Atomically write the entries that are still valid to the configured file, if any."""
+        if not self.path or self.ttl <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            persisted = {
+                key: {'value': value, 'timestamp': timestamp}
+                for key, (value, timestamp) in self._entries.items()
+                if now - timestamp < self.ttl and (not self.prune_unused or key in self._used)
+            }
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(persisted, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f'WARNING: Unable to save cache file {self.path}: {e}', flush=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._key_locks.clear()
+            self._used.clear()
+        self.path = None
+        self.ttl = 0
+        self.prune_unused = False
+
+class RunJournal:
+    """
+    Journal of an installation run, persisted in the dynamic plugins root so that an interrupted run can be resumed.
+
+    It records the results of the remote lookups of the run (auto-detected OCI plugin paths, image reference
+    resolutions and the image manifests, which hold the image digests and layers) and the plugins whose
+    installation completed. A restarted run reuses them instead of querying the registries again, and does not
+    re-install the plugins completed before the interruption, even with the `Always` pull policy.
+    The journal is discarded when its fingerprint (the content of `dynamic-plugins.yaml` and its includes)
+    changes, and removed once a run completes.
+
+    The journal is a JSON Lines file: a header line with the fingerprint, then one line per recorded entry,
+    appended and synced to disk as it is recorded. When an entry is recorded several times, the last line wins.
+    A line cut short by an interruption is ignored. `open()` rewrites the journal with one line per entry.
+    """
+
+    SECTIONS = ('oci_plugin_paths', 'image_resolutions', 'manifests', 'completed')
+
+    def __init__(self):
+        self.path = None
+        self.resumed = False
+        self._data = {}
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def load(self, path: str, fingerprint: str) -> None:
+        """Read back the journal at `path` if it has the same fingerprint, without writing to it until `open()`."""
+        data = {'fingerprint': fingerprint}
+        for section in self.SECTIONS:
+            data[section] = {}
+        resumed = False
+        try:
+            with open(path, 'r') as f:
+                for line_number, line in enumerate(f):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if line_number == 0:
+                        resumed = isinstance(entry, dict) and entry.get('fingerprint') == fingerprint
+                        if not resumed:
+                            break
+                    elif isinstance(entry, dict) and entry.get('section') in self.SECTIONS and isinstance(entry.get('key'), str):
+                        data[entry['section']][entry['key']] = entry.get('value')
+        except OSError:
+            pass
+        with self._lock:
+            self.resumed = resumed
+            self._data = data
+
+    def open(self, path: str, fingerprint: str) -> None:
+        """Start journaling to `path`, resuming the journal already there if it has the same fingerprint."""
+        if self._data.get('fingerprint') != fingerprint:
+            self.load(path, fingerprint)
+        if self.resumed:
+            print(f"\n======= Resuming the interrupted installation run ({len(self._data['completed'])} plugins already installed)", flush=True)
+        with self._lock:
+            self.path = path
+            # Compact the journal, along with the entries recorded before it was opened
+            lines = [{'fingerprint': fingerprint}] + [
+                {'section': section, 'key': key, 'value': value}
+                for section in self.SECTIONS for key, value in self._data[section].items()
+            ]
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            try:
+                with open(tmp_path, 'w') as f:
+                    f.writelines(json.dumps(line) + '\n' for line in lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+                self._fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+            except OSError as e:
+                print(f'WARNING: Unable to save the installation journal {path}: {e}', flush=True)
+
+    def get(self, section: str, key: str, default=None):
+        with self._lock:
+            return self._data.get(section, {}).get(key, default)
+
+    def record(self, section: str, key: str, value) -> None:
+        with self._lock:
+            if 'fingerprint' not in self._data:
+                return
+            self._data[section][key] = value
+            fd = self._fd
+        if fd is None:
+            return
+        line = json.dumps({'section': section, 'key': key, 'value': value}) + '\n'
+        try:
+            # A single write of the whole line to a file opened for appending: concurrent records never interleave
+            os.write(fd, line.encode('utf-8'))
+            os.fsync(fd)
+        except OSError as e:
+            print(f'WARNING: Unable to save the installation journal {self.path}: {e}', flush=True)
+
+    def get_or_compute(self, section: str, key: str, compute):
+        """Return the journaled value for `key`, or compute and journal it."""
+        value = self.get(section, key)
+        if value is None:
+            value = compute()
+            self.record(section, key, value)
+        return value
+
+    def is_completed(self, plugin_hash: str) -> bool:
+        return bool(self.get('completed', plugin_hash))
+
+    def remove(self) -> None:
+        """Remove the journal of a completed run."""
+        with self._lock:
+            if self.path is not None and os.path.exists(self.path):
+                os.remove(self.path)
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+            self._fd = None
+            self.path = None
+            self.resumed = False
+            self._data = {}
+
+def files_fingerprint(paths: list[str]) -> str:
+    """Return a hash of the contents of the given files (missing files included), independent of their locations."""
+    hasher = hashlib.sha256()
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                hasher.update(hashlib.sha256(f.read()).digest())
+        except OSError:
+            hasher.update(b'missing')
+    return hasher.hexdigest()
+
+# Registry fallback decisions, keyed by image reference without protocol prefix
+image_resolution_cache = RunCache()
+# Digest, annotations and layers of the OCI images, keyed by image reference
+oci_manifests = RunCache()
+# Plugin paths auto-detected from the annotations of the OCI images pinned by digest, which can never change
+oci_plugin_paths_by_digest = RunCache()
+# Plugin paths auto-detected from the annotations of the OCI images referenced by tag
+oci_plugin_paths_by_tag = RunCache()
+# Journal of the current run, read back once `main()` has read the plugin configuration and written once it holds the exclusive lock
+run_journal = RunJournal()
+
+def clear_run_caches() -> None:
+    """Reset all the run-scoped caches."""
+    image_resolution_cache.clear()
+    oci_manifests.clear()
+    oci_plugin_paths_by_digest.clear()
+    oci_plugin_paths_by_tag.clear()
+    run_journal.clear()
+
 def merge(source, destination, prefix = ''):
     for key, value in source.items():
         if isinstance(value, dict):
@@ -219,6 +542,8 @@ def resolve_image_reference(image: str) -> str:
     Resolve an image reference, falling back to quay.io/rhdh/ if the image
     starts with registry.access.redhat.com/rhdh/ and doesn't exist there.
 
+    The decision is made once per image and per run (see `image_resolution_cache`).
+
     Args:
         image: The image reference (may start with oci:// or docker:// or just be the image path)
 
@@ -239,6 +564,12 @@ def resolve_image_reference(image: str) -> str:
     if not check_image.startswith(RHDH_REGISTRY_PREFIX):
         return image
 
+    resolution = image_resolution_cache.get_or_compute(
+        check_image, lambda: run_journal.get_or_compute('image_resolutions', check_image, lambda: _probe_image_reference(check_image)))
+    return f"{protocol_prefix}{resolution['image']}"
+
+def _probe_image_reference(check_image: str) -> dict:
+    """Check whether an image exists in registry.access.redhat.com/rhdh/ and record the registry fallback decision."""
     # Construct the docker:// URL for checking
     docker_url = f"{DOCKER_PROTOCOL_PREFIX}{check_image}"
 
@@ -246,14 +577,18 @@ def resolve_image_reference(image: str) -> str:
 
     if image_exists_in_registry(docker_url):
         print(f'\t==> Image found in {RHDH_REGISTRY_PREFIX}', flush=True)
-        return image
+        return {'image': check_image, 'fallback': False}
 
     # Fallback to quay.io/rhdh/
     fallback_image = check_image.replace(RHDH_REGISTRY_PREFIX, RHDH_FALLBACK_PREFIX, 1)
     print(f'\t==> Image not found in {RHDH_REGISTRY_PREFIX}, falling back to {RHDH_FALLBACK_PREFIX}', flush=True)
     print(f'\t==> Using fallback image: {fallback_image}', flush=True)
 
-    return f"{protocol_prefix}{fallback_image}"
+    return {'image': fallback_image, 'fallback': True}
+
+def fallback_image_references() -> list[str]:
+    """Return the images of this run that were resolved to the quay.io/rhdh/ fallback registry."""
+    return sorted(resolution['image'] for resolution in image_resolution_cache.values() if resolution['fallback'])
 
 def get_oci_plugin_paths(image: str) -> list[str]:
     """
@@ -264,27 +599,23 @@ def get_oci_plugin_paths(image: str) -> list[str]:
 
     Returns:
         List of plugin paths from the manifest annotation
+
+    The paths are looked up once per image and per run. They are persisted across runs for the images
+    pinned by digest as long as the configuration uses them, and for OCI_PLUGIN_PATHS_CACHE_TTL seconds
+    for the images referenced by tag.
     """
-    skopeo_path = shutil.which('skopeo')
-    if not skopeo_path:
-        raise InstallException('skopeo executable not found in PATH')
+    cache = oci_plugin_paths_by_digest if '@' in image else oci_plugin_paths_by_tag
+    # Still used when the paths come from the journal of an interrupted run
+    cache.touch(image)
+    return run_journal.get_or_compute(
+        'oci_plugin_paths', image, lambda: cache.get_or_compute(image, lambda: _get_oci_plugin_paths(image)))
 
-    # Resolve image reference with fallback if needed
-    resolved_image = resolve_image_reference(image)
-    image_url = resolved_image.replace(OCI_PROTOCOL_PREFIX, DOCKER_PROTOCOL_PREFIX)
-    result = run_command(
-        [skopeo_path, 'inspect', '--no-tags', '--raw', image_url],
-        f"Failed to inspect OCI image {image}"
-    )
+def _get_oci_plugin_paths(image: str) -> list[str]:
+    annotation_value = get_oci_manifest(image)['Annotations'].get('io.backstage.dynamic-packages')
+    if not annotation_value:
+        return []
 
     try:
-        manifest = json.loads(result.stdout)
-        annotations = manifest.get('annotations', {})
-        annotation_value = annotations.get('io.backstage.dynamic-packages')
-
-        if not annotation_value:
-            return []
-
         decoded = base64.b64decode(annotation_value).decode('utf-8')
         plugins_metadata = json.loads(decoded)
     except Exception as e:
@@ -297,6 +628,61 @@ def get_oci_plugin_paths(image: str) -> list[str]:
 
     return plugin_paths
 
+def image_repository(image_url: str) -> str:
+    """Return an image reference without its tag or digest."""
+    if '@' in image_url:
+        return image_url.split('@', 1)[0]
+    (repository, _, tag) = image_url.rpartition(':')
+    return repository if repository and '/' not in tag else image_url
+
+def get_oci_manifest(image: str) -> dict:
+    """
+    Return the digest, the annotations and the layers of an OCI image, with the keys of `skopeo inspect`
+    (`Digest`, `Annotations` and `Layers`).
+
+    The manifest is fetched once per image and per run with a single `skopeo inspect --raw`, and shared by
+    the plugin path auto-detection, the skip checks, the layer cache lookups and the digest files.
+    """
+    return oci_manifests.get_or_compute(image, lambda: run_journal.get_or_compute('manifests', image, lambda: _fetch_oci_manifest(image)))
+
+def _fetch_oci_manifest(image: str) -> dict:
+    skopeo_path = shutil.which('skopeo')
+    if not skopeo_path:
+        raise InstallException('skopeo executable not found in PATH')
+
+    # Resolve image reference with fallback if needed
+    resolved_image = resolve_image_reference(image)
+    image_url = resolved_image.replace(OCI_PROTOCOL_PREFIX, DOCKER_PROTOCOL_PREFIX)
+
+    def fetch(url: str) -> tuple[bytes, dict]:
+        # Raw bytes: the digest is computed from the manifest exactly as the registry serves it
+        raw = run_command([skopeo_path, 'inspect', '--no-tags', '--raw', url], f"Failed to inspect OCI image {image}", text=False).stdout
+        try:
+            return (raw, json.loads(raw))
+        except ValueError as e:
+            raise InstallException(f"Failed to parse the manifest of OCI image {image}: {e}")
+
+    (raw, manifest) = fetch(image_url)
+    annotations = manifest.get('annotations') or {}
+    if 'manifests' in manifest and 'layers' not in manifest:
+        # Image index: follow the manifest of the platform that `skopeo copy` pulls
+        platform_manifests = [
+            entry for entry in manifest['manifests']
+            if (entry.get('platform') or {}).get('os') == 'linux' and (entry.get('platform') or {}).get('architecture') == 'amd64'
+        ]
+        if not platform_manifests:
+            raise InstallException(f"OCI image {image} has no manifest for the linux/amd64 platform")
+        (_, platform_manifest) = fetch(f"{image_repository(image_url)}@{platform_manifests[0]['digest']}")
+        annotations = {**(platform_manifest.get('annotations') or {}), **annotations}
+        manifest = platform_manifest
+
+    return {
+        # The digest of an image is the digest of its top-level manifest, as reported by `skopeo inspect`
+        'Digest': f"sha256:{hashlib.sha256(raw).hexdigest()}",
+        'Annotations': annotations,
+        'Layers': [layer['digest'] for layer in manifest.get('layers') or []],
+    }
+
 class PackageMerger:
     def __init__(self, plugin: dict, dynamic_plugins_file: str, all_plugins: dict):
         self.plugin = plugin
@@ -465,6 +851,8 @@ class PluginInstaller:
     def __init__(self, destination: str, skip_integrity_check: bool = False):
         self.destination = destination
         self.skip_integrity_check = skip_integrity_check
+        # Size of the regular files of the installed plugins, by plugin path, as read from their package
+        self.installed_sizes = {}
 
     def should_skip_installation(self, plugin: dict, plugin_path_by_hash: dict) -> tuple[bool, str]:
         """Check if plugin installation should be skipped based on pull policy and current state."""
@@ -484,6 +872,44 @@ class PluginInstaller:
         """Install a plugin and return the plugin path. Must be implemented by subclasses."""
         raise NotImplementedError()
 
+    def prepare(self, plugins: list[dict], plugin_path_by_hash: dict) -> None:
+        """Called once before the plugins of a run are installed, with the enabled plugins handled by this installer."""
+        pass
+
+    def close(self) -> None:
+        """Called once after the plugins of a run are installed, to release any temporary resources."""
+        pass
+
+    def installed_size(self, plugin_path: str) -> int:
+        """Return the size in bytes of the files of a plugin just installed, or None if unknown."""
+        return self.installed_sizes.pop(plugin_path, None)
+
+    def create_staging_directory(self) -> str:
+        """Create a staging directory on the same filesystem as the installed plugins, so that they can be renamed into place."""
+        return tempfile.mkdtemp(prefix=STAGING_DIR_PREFIX, dir=self.destination)
+
+    def commit_staged_plugin(self, plugin: dict, staged_directory: str, plugin_path: str) -> None:
+        """
+        Write the installation hash in a fully staged plugin directory, then rename it into place.
+
+        A previous installation is first moved aside, so that the plugin directory is never partially written:
+        an interrupted installation leaves either the previous plugin, or no plugin at all.
+        """
+        if 'plugin_hash' in plugin:
+            with open(os.path.join(staged_directory, 'dynamic-plugin-config.hash'), 'w') as f:
+                f.write(plugin['plugin_hash'])
+
+        plugin_directory = os.path.join(self.destination, plugin_path)
+        os.makedirs(os.path.dirname(plugin_directory), exist_ok=True)
+        if os.path.lexists(plugin_directory):
+            print('\t==> Replacing previous plugin directory', plugin_directory, flush=True)
+            previous_directory = self.create_staging_directory()
+            os.rename(plugin_directory, os.path.join(previous_directory, 'previous'))
+            os.rename(staged_directory, plugin_directory)
+            shutil.rmtree(previous_directory, ignore_errors=True, onerror=None)
+        else:
+            os.rename(staged_directory, plugin_directory)
+
 class OciPackageMerger(PackageMerger):
     EXPECTED_OCI_PATTERN = (
         r'^(' + OCI_PROTOCOL_PREFIX +
@@ -657,6 +1083,199 @@ class OciPackageMerger(PackageMerger):
             self.all_plugins[plugin_key]["last_modified_level"] = level
             self.override_plugin(version, inherit_version, plugin_key)
 
+def file_digest(path: str, algorithm: str) -> str:
+    """Compute the hex digest of a file with a chunked read."""
+    hasher = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+class OciLayerCache:
+    """
+    Persistent content-addressed cache of OCI layer tarballs.
+
+    Layers are stored as `<cache_dir>/<algorithm>/<hash>` and are only reused when their checksum
+    still matches their digest. The cache is bounded in size: the least recently used layers
+    are evicted first.
+
+    The layers returned by `get()` and `put()` are pinned with a shared file lock until `close()`, and the eviction
+    skips the layers that are locked, so that it never removes a layer still used by this run or by another
+    installation sharing the cache.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_OCI_LAYER_CACHE_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._pinned = {}  # {path: file descriptor holding the shared lock}
+
+    @staticmethod
+    def from_environment() -> 'OciLayerCache':
+        """Create the layer cache configured by OCI_LAYER_CACHE_DIR, or return None if it is not set."""
+        cache_dir = os.environ.get('OCI_LAYER_CACHE_DIR', '')
+        if not cache_dir:
+            return None
+        max_size = os.environ.get('OCI_LAYER_CACHE_MAX_SIZE', '')
+        try:
+            max_size = int(max_size) if max_size else DEFAULT_OCI_LAYER_CACHE_MAX_SIZE
+        except ValueError:
+            raise InstallException(f"OCI_LAYER_CACHE_MAX_SIZE must be an integer number of bytes, got '{max_size}'")
+        return OciLayerCache(cache_dir, max_size)
+
+    def _path(self, layer_digest: str) -> str:
+        (algorithm, hash_value) = layer_digest.split(':', 1)
+        if algorithm not in hashlib.algorithms_available or not re.fullmatch(r'[0-9a-f]+', hash_value):
+            return None
+        return os.path.join(self.cache_dir, algorithm, hash_value)
+
+    def get(self, layer_digest: str) -> str:
+        """Return the path of the cached layer, pinned, or None if it is missing or does not match its digest."""
+        path = self._path(layer_digest)
+        if path is None or not self._pin(path):
+            return None
+
+        (algorithm, hash_value) = layer_digest.split(':', 1)
+        if file_digest(path, algorithm) != hash_value:
+            print(f'\t==> WARNING: removing corrupted cached layer {layer_digest}', flush=True)
+            self._remove(path)
+            return None
+
+        # Record the access for the LRU eviction
+        os.utime(path)
+        return path
+
+    def put(self, layer_digest: str, layer_file: str) -> str:
+        """Move a downloaded layer into the cache and return its cached path."""
+        path = self._path(layer_digest)
+        if path is None:
+            return layer_file
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Move to a temporary name first so that other readers of a shared cache never see a partial layer
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        shutil.move(layer_file, tmp_path)
+        # Pinned before it is visible, so that no eviction can remove it in between
+        fd = os.open(tmp_path, os.O_RDONLY)
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        os.replace(tmp_path, path)
+        with self._lock:
+            previous_fd = self._pinned.pop(path, None)
+            self._pinned[path] = fd
+        if previous_fd is not None:
+            os.close(previous_fd)
+        self.evict()
+        return path
+
+    def _pin(self, path: str) -> bool:
+        """Take a shared lock on a cached layer for the rest of the run, returning False if the layer is gone."""
+        with self._lock:
+            if path in self._pinned:
+                return True
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        try:
+            # The layer may have been evicted before it was locked
+            pinned = os.fstat(fd).st_ino == os.stat(path).st_ino
+        except FileNotFoundError:
+            pinned = False
+        if not pinned:
+            os.close(fd)
+            return False
+        with self._lock:
+            if path in self._pinned:
+                os.close(fd)
+            else:
+                self._pinned[path] = fd
+        return True
+
+    def close(self) -> None:
+        """Unpin the layers used by the run."""
+        with self._lock:
+            for fd in self._pinned.values():
+                os.close(fd)
+            self._pinned = {}
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used layers that are not in use until the cache fits in its maximum size.
+
+        Only the layers count toward the maximum size, along with their member index. The temporary files left
+        over by interrupted runs are removed, and those still being written by another installation are ignored.
+        """
+        now = time.time()
+        with self._lock:
+            layers = {}  # {path: [last access time, size]}
+            index_sizes = {}  # {layer path: size of its member index}
+            for algorithm in os.listdir(self.cache_dir):
+                algorithm_dir = os.path.join(self.cache_dir, algorithm)
+                if not os.path.isdir(algorithm_dir):
+                    continue
+                for name in os.listdir(algorithm_dir):
+                    path = os.path.join(algorithm_dir, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if name.endswith('.tmp'):
+                        if now - stat.st_mtime > LAYER_CACHE_TMP_MAX_AGE:
+                            print(f'\t==> Removing stale temporary file {path} from the layer cache', flush=True)
+                            self._remove_file(path)
+                    elif name.endswith(LAYER_MEMBER_INDEX_SUFFIX):
+                        index_sizes[path[:-len(LAYER_MEMBER_INDEX_SUFFIX)]] = stat.st_size
+                    elif re.fullmatch(r'[0-9a-f]+', name):
+                        layers[path] = [stat.st_mtime, stat.st_size]
+
+            for layer_path, size in index_sizes.items():
+                if layer_path in layers:
+                    layers[layer_path][1] += size
+                else:
+                    # Member index of a layer removed by another installation
+                    self._remove_file(layer_path + LAYER_MEMBER_INDEX_SUFFIX)
+
+            entries = sorted((mtime, size, path) for path, (mtime, size) in layers.items())
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total_size <= self.max_size:
+                    break
+                if path in self._pinned or not self._remove_unused(path):
+                    continue
+                total_size -= size
+
+    def _remove_unused(self, path: str) -> bool:
+        """Remove a cached layer unless another run holds a lock on it, and return whether it was removed."""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return True
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        try:
+            print(f'\t==> Evicting cached layer {path}', flush=True)
+            self._remove(path)
+        finally:
+            os.close(fd)
+        return True
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        """Remove a cached layer and its member index."""
+        for file_path in (path, path + LAYER_MEMBER_INDEX_SUFFIX):
+            OciLayerCache._remove_file(file_path)
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
 class OciDownloader:
     """Helper class for downloading and extracting plugins from OCI container images."""
 
@@ -668,15 +1287,49 @@ class OciDownloader:
         self.tmp_dir_obj = tempfile.TemporaryDirectory()
         self.tmp_dir = self.tmp_dir_obj.name
         self.image_to_tarball = {}
+        # One lock per image, so that concurrent installations of plugins from the same image copy it only once
+        self._image_locks = {}
+        self._image_locks_lock = threading.Lock()
+        # Plugins expected to be installed from each image, which are extracted together in a single pass
+        self._expected_plugin_paths = {}  # {image: {plugin_path}}
+        self._extracted_plugin_paths = {}  # {image: {plugin_path: extraction_dir}}
+        self._extraction_dirs = []
+        self.extracted_sizes = {}  # {plugin_path: size of the regular files of its last extraction}
         self.destination = destination
         self.max_entry_size = int(os.environ.get('MAX_ENTRY_SIZE', DEFAULT_MAX_ENTRY_SIZE))
+        self.layer_cache = OciLayerCache.from_environment()
+        self.incremental_update = os.environ.get('INCREMENTAL_PLUGIN_UPDATE', '').lower() == 'true'
 
     def skopeo(self, command):
         result = run_command([self._skopeo] + command, 'skopeo command failed')
         return result.stdout
 
+    def inspect(self, image: str) -> dict:
+        """
+        Return the digest and the layers of an image (without the plugin path), for the platform that `skopeo copy` would pull.
+
+        The manifest of the image is fetched only once per run, see `get_oci_manifest()`.
+        """
+        return get_oci_manifest(image)
+
+    def _image_lock(self, image: str) -> threading.Lock:
+        with self._image_locks_lock:
+            return self._image_locks.setdefault(image, threading.Lock())
+
     def get_plugin_tar(self, image: str) -> str:
+        with self._image_lock(image):
+            return self._get_plugin_tar(image)
+
+    def _get_plugin_tar(self, image: str) -> str:
         if image not in self.image_to_tarball:
+            if self.layer_cache is not None:
+                layers = self.inspect(image).get('Layers') or []
+                cached_layer = self.layer_cache.get(layers[0]) if layers else None
+                if cached_layer is not None:
+                    print(f'\t==> Using cached layer {layers[0]} for image {image}', flush=True)
+                    self.image_to_tarball[image] = cached_layer
+                    return cached_layer
+
             # Resolve image reference with fallback if needed
             resolved_image = resolve_image_reference(image)
 
@@ -684,8 +1337,9 @@ class OciDownloader:
             print(f'\t==> Copying image {resolved_image} to local filesystem', flush=True)
             image_digest = hashlib.sha256(resolved_image.encode('utf-8'), usedforsecurity=False).hexdigest()
             local_dir = os.path.join(self.tmp_dir, image_digest)
-            # replace oci:// prefix with docker://
+            # replace oci:// prefix with docker://, and copy the manifest that was inspected rather than the current tag
             image_url = resolved_image.replace(OCI_PROTOCOL_PREFIX, DOCKER_PROTOCOL_PREFIX)
+            image_url = f"{image_repository(image_url)}@{self.inspect(image)['Digest']}"
             self.skopeo(['copy', '--override-os=linux', '--override-arch=amd64', image_url, f'dir:{local_dir}'])
             manifest_path = os.path.join(local_dir, 'manifest.json')
             manifest = json.load(open(manifest_path))
@@ -693,54 +1347,338 @@ class OciDownloader:
             layer = manifest['layers'][0]['digest']
             (_sha, filename) = layer.split(':')
             local_path = os.path.join(local_dir, filename)
+            if self.layer_cache is not None:
+                local_path = self.layer_cache.put(layer, local_path)
             self.image_to_tarball[image] = local_path
 
         return self.image_to_tarball[image]
 
-    def extract_plugin(self, tar_file: str, plugin_path: str) -> None:
-        with tarfile.open(tar_file, 'r:*') as tar: # NOSONAR
-            # extract only the files in specified directory
-            files_to_extract = []
-            for member in tar.getmembers():
-                if not member.name.startswith(plugin_path):
+    @staticmethod
+    def _member_index_path(tar_file: str) -> str:
+        return tar_file + LAYER_MEMBER_INDEX_SUFFIX
+
+    def _load_member_index(self, tar_file: str) -> dict:
+        """Return the member index stored next to a layer tarball, or None if it is missing or stale."""
+        try:
+            with open(self._member_index_path(tar_file), 'r') as f:
+                index = json.load(f)
+            if index.get('version') != 1 or index.get('size') != os.path.getsize(tar_file):
+                return None
+            return index
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _save_member_index(self, tar_file: str, compressed: bool, offsets: dict) -> None:
+        index = {'version': 1, 'size': os.path.getsize(tar_file), 'compressed': compressed, 'members': offsets}
+        index_path = self._member_index_path(tar_file)
+        tmp_path = f'{index_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            # The index is only an optimization
+            print(f'\t==> WARNING: could not save the member index of {tar_file}: {e}', flush=True)
+
+    @staticmethod
+    def _indexed_offsets(index: dict, plugin_paths: list[str]) -> list[int]:
+        """Return the sorted offsets of the members that may belong to one of the plugin paths."""
+        offsets = set()
+        for plugin_path in plugin_paths:
+            top_level = plugin_path.split('/', 1)[0]
+            for name, member_offsets in index['members'].items():
+                # Without a slash in the plugin path, any top-level entry it prefixes may hold matching members
+                if name == top_level or ('/' not in plugin_path and name.startswith(plugin_path)):
+                    offsets.update(member_offsets)
+        return sorted(offsets)
+
+    def _scan_layer(self, tar: tarfile.TarFile, tar_file: str):
+        """Yield all the members of a streamed layer, and save the layer member index once it has been fully read."""
+        offsets = {}
+        for member in self._stream_members(tar):
+            offsets.setdefault(member.name.split('/', 1)[0], []).append(member.offset)
+            yield member
+        self._save_member_index(tar_file, tar.fileobj.comptype != 'tar', offsets)
+
+    @staticmethod
+    def _stream_members(tar: tarfile.TarFile):
+        """Yield the members of a streamed layer, dropping each header once consumed so that memory stays bounded."""
+        for member in iter(tar.next, None):
+            yield member
+            # tarfile appends every header it reads to its member list, which it only searches to resolve links
+            # whose target is not on disk yet: their content cannot be read back from a stream anyway
+            if tar.members and tar.members[-1] is member:
+                tar.members.pop()
+
+    @staticmethod
+    def _stream_layer_until(tar: tarfile.TarFile, last_offset: int):
+        """Yield the members of a streamed layer, stopping after the member at `last_offset`."""
+        for member in OciDownloader._stream_members(tar):
+            yield member
+            if member.offset >= last_offset:
+                break
+
+    @staticmethod
+    def _seek_layer(tar: tarfile.TarFile, offsets: list[int]):
+        """Yield the members of an uncompressed layer found at the given offsets, seeking directly to each of them."""
+        for offset in offsets:
+            tar.fileobj.seek(offset)
+            yield tarfile.TarInfo.fromtarfile(tar)
+
+    def _iter_plugin_members(self, members, plugin_paths: list[str]):
+        """Yield the members that belong to one of the plugin paths, with security checks, and record the size of each plugin."""
+        sizes = dict.fromkeys(plugin_paths, 0)
+        for member in members:
+            plugin_path = next((path for path in plugin_paths if member.name.startswith(path)), None)
+            if plugin_path is None:
+                continue
+            # zip bomb protection
+            if member.size > self.max_entry_size:
+                raise InstallException('Zip bomb detected in ' + member.name)
+
+            if member.islnk() or member.issym():
+                # Hard links are relative to the archive root, symbolic links to the directory of the link
+                link_target = member.linkname if member.islnk() else os.path.join(os.path.dirname(member.name), member.linkname)
+                if os.path.isabs(member.linkname) or not os.path.normpath(link_target).startswith(plugin_path):
+                    print(f'\t==> WARNING: skipping file containing link outside of the archive: {member.name} -> {member.linkpath}', flush=True)
                     continue
-                # zip bomb protection
-                if member.size > self.max_entry_size:
-                    raise InstallException('Zip bomb detected in ' + member.name)
-
-                if member.islnk() or member.issym():
-                    realpath = os.path.realpath(os.path.join(plugin_path, *os.path.split(member.linkname)))
-                    if not realpath.startswith(plugin_path):
-                        print(f'\t==> WARNING: skipping file containing link outside of the archive: {member.name} -> {member.linkpath}', flush=True)
-                        continue
 
-                files_to_extract.append(member)
-            tar.extractall(os.path.abspath(self.destination), members=files_to_extract, filter='tar')
+            if member.isreg():
+                sizes[plugin_path] += member.size
+            yield member
+        self.extracted_sizes.update(sizes)
+
+    def extract_plugins(self, tar_file: str, plugin_paths: list[str], destination: str = None) -> None:
+        """
+        Extract the files of several plugins from a layer tarball in a single streaming pass.
+
+        The layer is read sequentially and each member is dispatched to the plugin path it belongs to,
+        so the layer is decompressed only once whatever the number of plugins, and the content of the members
+        is never loaded in memory.
+
+        The first full pass also stores a member index next to the tarball, which maps each top-level entry
+        to the offsets of its members. Later extractions from the same tarball (including from the persistent
+        layer cache) seek directly to the plugin members of uncompressed layers, and stop reading compressed
+        layers after the last plugin member.
+        """
+        destination = os.path.abspath(destination or self.destination)
+        with self._plugin_members(tar_file, plugin_paths) as (tar, members):
+            if tar is not None:
+                tar.extractall(destination, members=members, filter='tar')
+
+    @contextlib.contextmanager
+    def _plugin_members(self, tar_file: str, plugin_paths: list[str]):
+        """Open a layer tarball and yield it with the checked members of the plugin paths, using its member index if any."""
+        index = self._load_member_index(tar_file)
+        if index is None:
+            with tarfile.open(tar_file, 'r|*') as tar: # NOSONAR
+                yield tar, self._iter_plugin_members(self._scan_layer(tar, tar_file), plugin_paths)
+            return
+
+        offsets = self._indexed_offsets(index, plugin_paths)
+        if not offsets:
+            yield None, iter(())
+        elif index['compressed']:
+            with tarfile.open(tar_file, 'r|*') as tar: # NOSONAR
+                yield tar, self._iter_plugin_members(self._stream_layer_until(tar, offsets[-1]), plugin_paths)
+        else:
+            with tarfile.open(tar_file, 'r:') as tar: # NOSONAR
+                yield tar, self._iter_plugin_members(self._seek_layer(tar, offsets), plugin_paths)
+
+    def update_plugin(self, tar_file: str, plugin_path: str) -> None:
+        """
+        Update an installed plugin directory in place, writing only the entries that changed in the layer.
+
+        A regular file is unchanged when its size and permissions match the layer member and its content hash
+        matches the hash of the member content: a matching modification time is never taken as proof, since an
+        image can be rebuilt with normalized times. Changed entries are replaced (never written through, since
+        they may be hard links to the plugin file store), and the files that are no longer in the layer are removed.
+        """
+        destination = os.path.abspath(self.destination)
+        counts = {'unchanged': 0, 'updated': 0, 'removed': 0}
+        seen = set()
+        with self._plugin_members(tar_file, [plugin_path]) as (tar, members):
+            if tar is not None:
+                tar.extractall(destination, members=self._changed_members(tar, members, destination, seen, counts), filter='tar')
+
+        # Remove the entries that are no longer in the layer, keeping the parent directories of the layer members
+        kept = set(seen)
+        for name in seen:
+            while name:
+                name = os.path.dirname(name)
+                kept.add(name)
+        plugin_directory = os.path.join(destination, plugin_path)
+        for dirpath, dirnames, filenames in os.walk(plugin_directory, topdown=False):
+            for name in filenames + dirnames:
+                path = os.path.join(dirpath, name)
+                if os.path.relpath(path, destination) in kept or (dirpath == plugin_directory and name in PLUGIN_STATE_FILES):
+                    continue
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path, ignore_errors=True, onerror=None)
+                else:
+                    os.remove(path)
+                counts['removed'] += 1
+
+        print(f"\t==> Updated plugin directory {plugin_directory}: {counts['updated']} changed, {counts['removed']} removed and {counts['unchanged']} unchanged entries", flush=True)
+
+    def _changed_members(self, tar: tarfile.TarFile, members, destination: str, seen: set, counts: dict):
+        """Yield the members that differ from the files on disk, after removing the files they replace."""
+        for member in members:
+            name = os.path.normpath(member.name)
+            seen.add(name)
+            target = os.path.join(destination, name)
+            unchanged = self._is_unchanged(member, target, destination)
+            if unchanged is None:
+                # The content of the member is read here: it can no longer be extracted from the streamed layer
+                updated = self._update_file_content(tar, member, target)
+                counts['updated' if updated else 'unchanged'] += 1
+                continue
+            if unchanged:
+                counts['unchanged'] += 1
+                continue
+
+            if os.path.isdir(target) and not os.path.islink(target):
+                if not member.isdir():
+                    shutil.rmtree(target, ignore_errors=True, onerror=None)
+            elif os.path.lexists(target):
+                os.remove(target)
+            counts['updated'] += 1
+            yield member
+
+    @staticmethod
+    def _is_unchanged(member: tarfile.TarInfo, target: str, destination: str) -> bool:
+        """Compare a member with the file on disk from their metadata, or return None when their contents must be compared."""
+        if member.isdir():
+            return os.path.isdir(target) and not os.path.islink(target)
+        if member.issym():
+            return os.path.islink(target) and os.readlink(target) == member.linkname
+        if not member.isreg() or os.path.islink(target) or not os.path.isfile(target):
+            return False
+
+        try:
+            # Permissions as they would be extracted
+            mode = tarfile.tar_filter(member, destination).mode
+        except tarfile.FilterError:
+            return False
+        stat_result = os.stat(target)
+        if stat_result.st_size != member.size or stat_result.st_mode & 0o7777 != mode:
+            return False
+        return None
+
+    @staticmethod
+    def _update_file_content(tar: tarfile.TarFile, member: tarfile.TarInfo, target: str) -> bool:
+        """
+        Write the content of a member with the size and permissions of the file on disk to a temporary file,
+        hashing it on the way, and swap it in if the contents differ. Return whether the file was replaced.
+        """
+        mode = os.stat(target).st_mode & 0o7777
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(target)}.', dir=os.path.dirname(target))
+        try:
+            hasher = hashlib.sha256()
+            source = tar.extractfile(member)
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: source.read(1024 * 1024), b''):
+                    hasher.update(chunk)
+                    f.write(chunk)
+            if hasher.hexdigest() == file_digest(target, 'sha256'):
+                # Same content: only record the layer time
+                if int(os.stat(target).st_mtime) != int(member.mtime):
+                    os.utime(target, (member.mtime, member.mtime))
+                return False
+            os.chmod(tmp_path, mode)
+            os.utime(tmp_path, (member.mtime, member.mtime))
+            # Replaced rather than written through, as the file may be a hard link to the plugin file store
+            os.replace(tmp_path, target)
+            return True
+        finally:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+
+    def extract_plugin(self, tar_file: str, plugin_path: str) -> None:
+        # extract only the files in specified directory
+        self.extract_plugins(tar_file, [plugin_path])
+
+    def expect(self, package: str) -> None:
+        """Register a plugin that may be downloaded during this run, so that it is extracted along with the other plugins of its image."""
+        (image, plugin_path) = package.split('!')
+        if self.incremental_update and os.path.isdir(os.path.join(self.destination, plugin_path)):
+            # Updated in place instead
+            return
+        with self._image_locks_lock:
+            self._expected_plugin_paths.setdefault(image, set()).add(plugin_path)
+
+    def _extract_expected_plugins(self, image: str, tar_file: str, plugin_path: str) -> str:
+        """Return the extraction directory holding `plugin_path`, extracting all the pending expected plugins of the image on first use."""
+        with self._image_lock(image):
+            extracted = self._extracted_plugin_paths.setdefault(image, {})
+            if plugin_path not in extracted:
+                plugin_paths = sorted((self._expected_plugin_paths.get(image, set()) - extracted.keys()) | {plugin_path})
+                extraction_dir = tempfile.mkdtemp(prefix=STAGING_DIR_PREFIX, dir=self.destination)
+                self._extraction_dirs.append(extraction_dir)
+                print(f'\t==> Extracting {len(plugin_paths)} plugins from image {image} in a single pass', flush=True)
+                self.extract_plugins(tar_file, plugin_paths, extraction_dir)
+                for path in plugin_paths:
+                    extracted[path] = extraction_dir
+            # Each extraction is moved into place only once
+            return extracted.pop(plugin_path)
+
+    def download(self, package: str, staging_dir: str = None) -> str:
+        """
+        Download a plugin and return its path.
 
-    def download(self, package: str) -> str:
+        The plugin is extracted under `staging_dir` when given, and otherwise directly into the destination
+        after removing the previous plugin directory. A plugin updated in place (INCREMENTAL_PLUGIN_UPDATE)
+        is never staged.
+        """
         # At this point, package always contains ! since parse_plugin_key resolved it
         (image, plugin_path) = package.split('!')
 
         tar_file = self.get_plugin_tar(image)
         plugin_directory = os.path.join(self.destination, plugin_path)
-        if os.path.exists(plugin_directory):
+        if self.incremental_update and os.path.isdir(plugin_directory) and not os.path.islink(plugin_directory):
+            self.update_plugin(tar_file, plugin_path)
+            return plugin_path
+        fan_out = bool(self._expected_plugin_paths.get(image, set()) - {plugin_path})
+        if fan_out:
+            # Other plugins of the same image are expected: extract them all at once, then move each one into place
+            extraction_dir = self._extract_expected_plugins(image, tar_file, plugin_path)
+        if staging_dir is None and os.path.exists(plugin_directory):
             print('\t==> Removing previous plugin directory', plugin_directory, flush=True)
             shutil.rmtree(plugin_directory, ignore_errors=True, onerror=None)
-        self.extract_plugin(tar_file=tar_file, plugin_path=plugin_path)
+        if fan_out:
+            extracted_directory = os.path.join(extraction_dir, plugin_path)
+            if os.path.exists(extracted_directory):
+                target_directory = os.path.join(staging_dir or self.destination, plugin_path)
+                os.makedirs(os.path.dirname(target_directory), exist_ok=True)
+                os.rename(extracted_directory, target_directory)
+        elif staging_dir is not None:
+            self.extract_plugins(tar_file, [plugin_path], staging_dir)
+        else:
+            self.extract_plugin(tar_file=tar_file, plugin_path=plugin_path)
         return plugin_path
 
+    def cleanup(self) -> None:
+        """Remove the extraction directories of the expected plugins that were not installed, and unpin the cached layers."""
+        for extraction_dir in self._extraction_dirs:
+            shutil.rmtree(extraction_dir, ignore_errors=True, onerror=None)
+        self._extraction_dirs = []
+        if self.layer_cache is not None:
+            self.layer_cache.close()
+
     def digest(self, package: str) -> str:
+        """
+        Return the remote digest of the image of a package.
+
+        The digest comes from the memoized `inspect()` data, so it is fetched once per image and per run,
+        and then reused by the skip check, the installation and the `dynamic-plugin-image.hash` file.
+        """
         # Extract image reference (before the ! if present)
         if '!' in package:
             (image, _) = package.split('!')
         else:
             image = package
 
-        # Resolve image reference with fallback if needed
-        resolved_image = resolve_image_reference(image)
-        image_url = resolved_image.replace(OCI_PROTOCOL_PREFIX, DOCKER_PROTOCOL_PREFIX)
-        output = self.skopeo(['inspect', '--no-tags', image_url])
-        data = json.loads(output)
+        data = self.inspect(image)
         # OCI artifact digest field is defined as "hash method" ":" "hash"
         digest = data['Digest'].split(':')[1]
         return f"{digest}"
@@ -780,30 +1718,286 @@ class OciPluginInstaller(PluginInstaller):
 
         return False, "force_download"
 
+    def prepare(self, plugins: list[dict], plugin_path_by_hash: dict) -> None:
+        """Let the downloader extract together the plugins of the same image that will be installed."""
+        for plugin in plugins:
+            package = plugin['package']
+            if '!' not in package:
+                continue
+            try:
+                # The remote digest of ALWAYS plugins is fetched once per run, and reused at installation time
+                should_skip, _ = self.should_skip_installation(plugin, plugin_path_by_hash)
+                should_skip = should_skip or (plugin['plugin_hash'] in plugin_path_by_hash and run_journal.is_completed(plugin['plugin_hash']))
+            except Exception:
+                # Reported when the plugin is installed
+                should_skip = False
+            if not should_skip:
+                self.downloader.expect(package)
+
+    def close(self) -> None:
+        self.downloader.cleanup()
+
     def install(self, plugin: dict, plugin_path_by_hash: dict) -> str:
         """Install an OCI plugin package."""
         package = plugin['package']
         if plugin.get('version') is None:
             raise InstallException(f"Tag or Digest is not set for {package}. Please ensure there is at least one plugin configurations contains a valid tag or digest.")
 
+        staging_dir = self.create_staging_directory()
         try:
-            plugin_path = self.downloader.download(package)
+            plugin_path = self.downloader.download(package, staging_dir)
+            self.installed_sizes[plugin_path] = self.downloader.extracted_sizes.pop(plugin_path, None)
 
-            # Save digest for future comparison
-            plugin_directory = os.path.join(self.destination, plugin_path)
+            # Save digest for future comparison, in the staged plugin directory unless it was updated in place
+            staged_directory = os.path.join(staging_dir, plugin_path)
+            is_staged = os.path.isdir(staged_directory)
+            plugin_directory = staged_directory if is_staged else os.path.join(self.destination, plugin_path)
             os.makedirs(plugin_directory, exist_ok=True)  # Ensure directory exists
             digest_file_path = os.path.join(plugin_directory, 'dynamic-plugin-image.hash')
             with open(digest_file_path, 'w') as f:
                 f.write(self.downloader.digest(package))
+            if is_staged:
+                self.commit_staged_plugin(plugin, staged_directory, plugin_path)
 
             # Clean up duplicate hashes
-            for key in [k for k, v in plugin_path_by_hash.items() if v == plugin_path]:
-                plugin_path_by_hash.pop(key)
+            with plugin_path_by_hash_lock:
+                for key in [k for k, v in plugin_path_by_hash.items() if v == plugin_path]:
+                    plugin_path_by_hash.pop(key)
 
             return plugin_path
 
         except Exception as e:
             raise InstallException(f"Error while installing OCI plugin {package}: {e}")
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True, onerror=None)
+
+class NpmrcConfig:
+    """
+    Subset of the npm configuration read from `.npmrc` files and `npm_config_*` environment variables.
+
+    Only the settings needed to download packages from a registry are supported: `registry`, `@scope:registry`,
+    the per-registry credentials (`//host/path/:_authToken`, `:_auth`, `:username` and `:_password`),
+    and the TLS settings `strict-ssl` and `cafile`.
+    """
+
+    def __init__(self, settings: dict):
+        self.settings = settings
+
+    @staticmethod
+    def load(project_dir: str) -> 'NpmrcConfig':
+        """Load the user and project `.npmrc` files the way `npm pack` run in `project_dir` would, then the environment."""
+        environment = {key.lower()[len('npm_config_'):]: value for key, value in os.environ.items() if key.lower().startswith('npm_config_')}
+        user_config = environment.get('userconfig') or os.path.join(os.path.expanduser('~'), '.npmrc')
+
+        settings = {}
+        for path in (user_config, os.path.join(project_dir, '.npmrc')):
+            settings.update(NpmrcConfig.parse(path))
+        settings.update(environment)
+        return NpmrcConfig(settings)
+
+    @staticmethod
+    def parse(path: str) -> dict:
+        settings = {}
+        try:
+            with open(path, 'r') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return settings
+
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith(('#', ';')) or '=' not in line:
+                continue
+            key, value = (part.strip() for part in line.split('=', 1))
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+                value = value[1:-1]
+            # ${VAR} (or ${VAR?}) references are replaced by environment variables
+            value = re.sub(r'\$\{([^}?]+)\??\}', lambda match: os.environ.get(match.group(1), ''), value)
+            settings[key] = value
+        return settings
+
+    def get(self, key: str, default: str = None) -> str:
+        return self.settings.get(key, default)
+
+    def registry(self, package_name: str) -> str:
+        """Return the registry URL of a package, honoring `@scope:registry` settings."""
+        if package_name.startswith('@'):
+            scope_registry = self.get(package_name.split('/', 1)[0] + ':registry')
+            if scope_registry:
+                return scope_registry
+        return self.get('registry', DEFAULT_NPM_REGISTRY)
+
+    def authorization(self, url: str) -> str:
+        """Return the Authorization header of the credentials configured for the longest registry prefix of `url`, if any."""
+        # npm keys credentials by "nerf dart": the registry URL without its scheme, e.g. //registry.example.com/path/
+        nerf_dart = '//' + url.split('://', 1)[-1]
+        prefixes = {key.rsplit(':', 1)[0] for key in self.settings if key.startswith('//') and ':' in key}
+        for prefix in sorted(prefixes, key=len, reverse=True):
+            if not nerf_dart.startswith(prefix if prefix.endswith('/') else prefix + '/'):
+                continue
+            token = self.get(prefix + ':_authToken')
+            if token:
+                return f'Bearer {token}'
+            auth = self.get(prefix + ':_auth')
+            if auth:
+                return f'Basic {auth}'
+            username = self.get(prefix + ':username')
+            password = self.get(prefix + ':_password')
+            if username and password:
+                credentials = f'{username}:{base64.b64decode(password).decode("utf-8")}'
+                return 'Basic ' + base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
+        return None
+
+class NpmRegistryFetcher:
+    """
+    Download NPM package archives straight from the registry, without starting `npm pack` for each package.
+
+    The package version is resolved from the registry packument (following dist-tags), and the archive is
+    streamed to the same file name as `npm pack` would use, over HTTP connections reused across packages.
+    The integrity of the archive can be verified while it streams.
+
+    Only registry packages with an exact version or a dist-tag (possibly through an `npm:` alias) are supported:
+    version ranges, git, tarball URLs and proxied setups are left to `npm pack`.
+    """
+
+    PACKAGE_SPEC_PATTERN = (
+        r'^(?:[^@/]+@npm:)?'                          # Optional alias
+        r'((?:@[a-z0-9][\w.~-]*/)?[a-z0-9][\w.~-]*)'  # [@scope/]name
+        r'(?:@(.+))?$'                                # Optional @version or @tag
+    )
+    EXACT_VERSION_PATTERN = r'^v?\d+\.\d+\.\d+(?:-[0-9A-Za-z.-]+)?(?:\+[0-9A-Za-z.-]+)?$'
+    DIST_TAG_PATTERN = r'^[A-Za-z][\w.-]*$'
+    MAX_REDIRECTS = 5
+
+    def __init__(self, destination: str, config: NpmrcConfig):
+        self.destination = destination
+        self.config = config
+        self._connections = threading.local()
+
+    @staticmethod
+    def from_environment(destination: str) -> 'NpmRegistryFetcher':
+        """Create the fetcher enabled by NPM_REGISTRY_FETCH, or return None if it is not enabled."""
+        if os.environ.get('NPM_REGISTRY_FETCH', '').lower() != 'true':
+            return None
+        return NpmRegistryFetcher(destination, NpmrcConfig.load(destination))
+
+    @staticmethod
+    def archive_name(name: str, version: str) -> str:
+        """Return the archive file name `npm pack` gives to a package, e.g. `scope-name-1.0.0.tgz` for `@scope/name`."""
+        return f"{name.removeprefix('@').replace('/', '-')}-{version}.tgz"
+
+    def _parse(self, package: str) -> tuple[str, str]:
+        match = re.match(self.PACKAGE_SPEC_PATTERN, package)
+        if not match:
+            return None
+        name, version = match.group(1), match.group(2) or 'latest'
+        if not (re.match(self.EXACT_VERSION_PATTERN, version) or re.match(self.DIST_TAG_PATTERN, version)):
+            return None
+        return name, version
+
+    def supports(self, package: str) -> bool:
+        """Whether the package can be fetched directly, or must be left to `npm pack`."""
+        proxied = any(self.config.get(key) for key in ('proxy', 'https-proxy')) or any(
+            os.environ.get(key) for key in ('HTTPS_PROXY', 'https_proxy', 'HTTP_PROXY', 'http_proxy'))
+        return not proxied and self._parse(package) is not None
+
+    def fetch(self, package: str, verifier: 'PackageIntegrityVerifier' = None) -> str:
+        """Download the archive of a package in the destination and return its path, verifying its integrity if a verifier is given."""
+        (name, version) = self._parse(package)
+        registry = self.config.registry(name)
+        packument_url = f"{registry.rstrip('/')}/{name.replace('/', '%2f')}"
+        # The abbreviated packument is much smaller, and holds all the fields needed to download a version
+        packument = json.loads(self._request(packument_url, {'Accept': 'application/vnd.npm.install-v1+json'}))
+
+        resolved_version = packument.get('dist-tags', {}).get(version, version.removeprefix('v'))
+        manifest = packument.get('versions', {}).get(resolved_version)
+        if manifest is None:
+            raise InstallException(f'Version {version} of package {name} not found in registry {registry}')
+
+        archive = os.path.join(self.destination, self.archive_name(manifest.get('name', name), manifest.get('version', resolved_version)))
+        try:
+            with open(archive, 'wb') as f:
+                self._request(manifest['dist']['tarball'], {}, f, verifier)
+            if verifier is not None:
+                verifier.verify()
+        except BaseException:
+            if os.path.exists(archive):
+                os.remove(archive)
+            raise
+        return archive
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        """Return the pooled connection of the current thread to a host."""
+        connections = self._connections.__dict__.setdefault('by_host', {})
+        key = (scheme, netloc)
+        if key not in connections:
+            if scheme == 'https':
+                context = ssl.create_default_context(cafile=self.config.get('cafile'))
+                if self.config.get('strict-ssl', 'true').lower() == 'false':
+                    context.check_hostname = False
+                    context.verify_mode = ssl.CERT_NONE
+                connections[key] = http.client.HTTPSConnection(netloc, timeout=NPM_REGISTRY_TIMEOUT, context=context)
+            else:
+                connections[key] = http.client.HTTPConnection(netloc, timeout=NPM_REGISTRY_TIMEOUT)
+        return connections[key]
+
+    def _close_connection(self, scheme: str, netloc: str) -> None:
+        connection = self._connections.__dict__.get('by_host', {}).pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+    def _request(self, url: str, headers: dict, output=None, verifier: 'PackageIntegrityVerifier' = None) -> bytes:
+        """GET an URL, following redirects, and return the body or stream it to `output`."""
+        for _ in range(self.MAX_REDIRECTS + 1):
+            parsed = urllib.parse.urlsplit(url)
+            if parsed.scheme not in ('http', 'https'):
+                raise InstallException(f'Unsupported URL scheme in {url}')
+            path = parsed.path or '/'
+            if parsed.query:
+                path += '?' + parsed.query
+            request_headers = {'User-Agent': 'install-dynamic-plugins', **headers}
+            authorization = self.config.authorization(url)
+            if authorization:
+                request_headers['Authorization'] = authorization
+
+            for attempt in range(2):
+                connection = self._connection(parsed.scheme, parsed.netloc)
+                try:
+                    connection.request('GET', path, headers=request_headers)
+                    response = connection.getresponse()
+                    break
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    # The server closed an idle pooled connection: retry once on a new one
+                    self._close_connection(parsed.scheme, parsed.netloc)
+                    if attempt:
+                        raise
+                except OSError as e:
+                    self._close_connection(parsed.scheme, parsed.netloc)
+                    raise InstallException(f'Error while fetching {url}: {e}')
+
+            try:
+                if response.status in (301, 302, 303, 307, 308):
+                    response.read()
+                    url = urllib.parse.urljoin(url, response.getheader('Location'))
+                    continue
+                if response.status != 200:
+                    response.read()
+                    raise InstallException(f'Error while fetching {url}: HTTP {response.status} {response.reason}')
+                if output is None:
+                    return response.read()
+                for chunk in iter(lambda: response.read(1024 * 1024), b''):
+                    output.write(chunk)
+                    if verifier is not None:
+                        verifier.update(chunk)
+                return None
+            except (OSError, http.client.HTTPException):
+                self._close_connection(parsed.scheme, parsed.netloc)
+                raise
+            finally:
+                if response.will_close:
+                    self._close_connection(parsed.scheme, parsed.netloc)
+
+        raise InstallException(f'Too many redirects while fetching {url}')
 
 class NpmPluginInstaller(PluginInstaller):
     """Handles NPM and local package installation using npm pack."""
@@ -811,6 +2005,72 @@ class NpmPluginInstaller(PluginInstaller):
     def __init__(self, destination: str, skip_integrity_check: bool = False):
         super().__init__(destination, skip_integrity_check)
         self.max_entry_size = int(os.environ.get('MAX_ENTRY_SIZE', DEFAULT_MAX_ENTRY_SIZE))
+        self.registry_fetcher = NpmRegistryFetcher.from_environment(destination)
+        self.pack_batch_size = get_npm_pack_batch_size()
+        # Archives already packed by a batched `npm pack`, by `npm pack` argument
+        self._packed_archives = {}
+        self._packed_archives_lock = threading.Lock()
+
+    @staticmethod
+    def _pack_argument(package: str) -> str:
+        # Local packages are packed from their absolute path
+        return os.path.join(os.getcwd(), package[2:]) if package.startswith('./') else package
+
+    def prepare(self, plugins: list[dict], plugin_path_by_hash: dict) -> None:
+        """Pack the packages that need to be installed with a few batched `npm pack` invocations, when NPM_PACK_BATCH_SIZE is set."""
+        if self.pack_batch_size <= 1:
+            return
+
+        arguments = []
+        for plugin in plugins:
+            package = plugin['package']
+            package_is_local = package.startswith('./')
+            if self.should_skip_installation(plugin, plugin_path_by_hash)[0]:
+                continue
+            if not package_is_local and self.registry_fetcher is not None and self.registry_fetcher.supports(package):
+                continue
+            if not package_is_local and not self.skip_integrity_check and 'integrity' not in plugin:
+                # Rejected by install() anyway
+                continue
+            arguments.append(self._pack_argument(package))
+        arguments = list(dict.fromkeys(arguments))
+
+        for i in range(0, len(arguments), self.pack_batch_size):
+            self._pack_batch(arguments[i:i + self.pack_batch_size])
+
+    def _pack_batch(self, arguments: list[str]) -> None:
+        if len(arguments) <= 1:
+            return
+        print(f'\n======= Grabbing {len(arguments)} package archives through a single `npm pack`', flush=True)
+        try:
+            result = run_command(
+                ['npm', 'pack', '--json'] + arguments,
+                'Error while packing NPM packages',
+                cwd=self.destination
+            )
+            filenames = [entry['filename'] for entry in json.loads(result.stdout)]
+        except (InstallException, ValueError, KeyError, TypeError) as e:
+            # Each package is then packed on its own, which reports the error of the faulty package
+            print(f'\t==> WARNING: batched `npm pack` failed, the packages will be packed one by one: {e}', flush=True)
+            return
+
+        # `npm pack --json` reports the archives in the order of its arguments
+        if len(filenames) != len(arguments):
+            print('\t==> WARNING: unexpected output of batched `npm pack`, the packages will be packed one by one', flush=True)
+            return
+        with self._packed_archives_lock:
+            for argument, filename in zip(arguments, filenames):
+                # Archives with the same name overwrote each other: pack them one by one
+                if filenames.count(filename) == 1:
+                    self._packed_archives[argument] = os.path.join(self.destination, filename)
+
+    def close(self) -> None:
+        """Remove the batched archives of the packages that were not installed."""
+        with self._packed_archives_lock:
+            for archive in self._packed_archives.values():
+                if os.path.isfile(archive):
+                    os.remove(archive)
+            self._packed_archives = {}
 
     def install(self, plugin: dict, plugin_path_by_hash: dict) -> str:
         """Install an NPM or local plugin package."""
@@ -824,15 +2084,23 @@ class NpmPluginInstaller(PluginInstaller):
         if not package_is_local and not self.skip_integrity_check and 'integrity' not in plugin:
             raise InstallException(f"No integrity hash provided for Package {package}")
 
+        if not package_is_local and self.registry_fetcher is not None and self.registry_fetcher.supports(package):
+            return self._install_from_registry(plugin)
+
         # Download package
-        print('\t==> Grabbing package archive through `npm pack`', flush=True)
-        result = run_command(
-            ['npm', 'pack', package],
-            f"Error while installing plugin {package} with 'npm pack'",
-            cwd=self.destination
-        )
+        with self._packed_archives_lock:
+            archive = self._packed_archives.pop(package, None)
+        if archive is not None and os.path.isfile(archive):
+            print('\t==> Using package archive grabbed by the batched `npm pack`', flush=True)
+        else:
+            print('\t==> Grabbing package archive through `npm pack`', flush=True)
+            result = run_command(
+                ['npm', 'pack', package],
+                f"Error while installing plugin {package} with 'npm pack'",
+                cwd=self.destination
+            )
 
-        archive = os.path.join(self.destination, result.stdout.strip())
+            archive = os.path.join(self.destination, result.stdout.strip())
 
         # Verify integrity for remote packages
         if not (package_is_local or self.skip_integrity_check):
@@ -840,16 +2108,38 @@ class NpmPluginInstaller(PluginInstaller):
             verify_package_integrity(plugin, archive)
 
         # Extract package
-        plugin_path = self._extract_npm_package(archive)
+        plugin_path = self._install_archive(plugin, archive)
+
+        return plugin_path
 
+    def _install_from_registry(self, plugin: dict) -> str:
+        """Install a remote package fetched directly from its registry, verifying its integrity while it downloads."""
+        package = plugin['package']
+        verifier = None if self.skip_integrity_check else PackageIntegrityVerifier(plugin)
+        print('\t==> Fetching package archive from the registry', flush=True)
+        try:
+            archive = self.registry_fetcher.fetch(package, verifier)
+        except (InstallException, OSError, ValueError, KeyError, http.client.HTTPException) as e:
+            raise InstallException(f"Error while installing plugin {package} from the registry: {e}")
+
+        return self._install_archive(plugin, archive)
+
+    def _install_archive(self, plugin: dict, archive: str) -> str:
+        """Extract a package archive in a staging directory, then move the plugin into place."""
+        staging_dir = self.create_staging_directory()
+        try:
+            plugin_path = self._extract_npm_package(archive, staging_dir)
+            self.commit_staged_plugin(plugin, os.path.join(staging_dir, plugin_path), plugin_path)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True, onerror=None)
         return plugin_path
 
-    def _extract_npm_package(self, archive: str) -> str:
-        """Extract NPM package archive with security protections."""
+    def _extract_npm_package(self, archive: str, staging_dir: str = None) -> str:
+        """Extract NPM package archive with security protections, under `staging_dir` if given or next to the archive otherwise."""
         PACKAGE_DIRECTORY_PREFIX = 'package/'
-        directory = archive.replace('.tgz', '')
+        plugin_path = os.path.basename(os.path.realpath(archive.replace('.tgz', '')))
+        directory = os.path.join(staging_dir, plugin_path) if staging_dir else archive.replace('.tgz', '')
         directory_realpath = os.path.realpath(directory)
-        plugin_path = os.path.basename(directory_realpath)
 
         if os.path.exists(directory):
             print('\t==> Removing previous plugin directory', directory, flush=True)
@@ -857,6 +2147,7 @@ class NpmPluginInstaller(PluginInstaller):
         os.mkdir(directory)
 
         print('\t==> Extracting package archive', archive, flush=True)
+        size = 0
         with tarfile.open(archive, 'r:*') as tar:  # NOSONAR
             for member in tar.getmembers():
                 if member.isreg():
@@ -868,6 +2159,7 @@ class NpmPluginInstaller(PluginInstaller):
 
                     member.name = member.name.removeprefix(PACKAGE_DIRECTORY_PREFIX)
                     tar.extract(member, path=directory, filter='data')
+                    size += member.size
 
                 elif member.isdir():
                     print('\t\tSkipping directory entry', member.name, flush=True)
@@ -897,6 +2189,7 @@ class NpmPluginInstaller(PluginInstaller):
         print('\t==> Removing package archive', archive, flush=True)
         os.remove(archive)
 
+        self.installed_sizes[plugin_path] = size
         return plugin_path
 
 def create_plugin_installer(package: str, destination: str, skip_integrity_check: bool = False) -> PluginInstaller:
@@ -906,7 +2199,195 @@ def create_plugin_installer(package: str, destination: str, skip_integrity_check
     else:
         return NpmPluginInstaller(destination, skip_integrity_check)
 
-def install_plugin(plugin: dict, plugin_path_by_hash: dict, destination: str, skip_integrity_check: bool = False) -> tuple[str, dict]:
+class PluginFileStore:
+    """
+    Content-addressed store of the files of the installed plugins, kept under the dynamic plugins root.
+
+    After a plugin is extracted, each of its regular files is replaced by a hard link to the store entry
+    with the same content and permissions, so that identical files (e.g. the same `node_modules` dependency
+    in several plugins, or the files left unchanged by a new version of a plugin) are stored only once on disk.
+    Entries are stored as `<store>/<hash[:2]>/<hash>-<mode>`, and removed once no plugin links to them anymore.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self.enabled = True
+
+    @staticmethod
+    def from_environment(destination: str) -> 'PluginFileStore':
+        """Create the file store enabled by PLUGIN_FILE_STORE, or return None if it is not enabled."""
+        if os.environ.get('PLUGIN_FILE_STORE', '').lower() != 'true':
+            return None
+        return PluginFileStore(os.path.join(destination, PLUGIN_FILE_STORE_DIR))
+
+    def _path(self, file_hash: str, mode: int) -> str:
+        return os.path.join(self.store_dir, file_hash[:2], f'{file_hash}-{mode:o}')
+
+    def link_tree(self, directory: str) -> None:
+        """Replace the regular files of an installed plugin directory by hard links to the store."""
+        if not self.enabled:
+            return
+        linked = 0
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                if filename in PLUGIN_STATE_FILES:
+                    continue
+                path = os.path.join(dirpath, filename)
+                # Symbolic links and files already linked (e.g. tar hard links) are left as is
+                if os.path.islink(path) or not os.path.isfile(path) or os.stat(path).st_nlink > 1:
+                    continue
+                try:
+                    linked += self._link(path, self._path(file_digest(path, 'sha256'), os.stat(path).st_mode & 0o7777))
+                except OSError as e:
+                    # e.g. a filesystem without hard links: keep the plain files
+                    print(f'\t==> WARNING: disabling the plugin file store: {e}', flush=True)
+                    self.enabled = False
+                    return
+        if linked:
+            print(f'\t==> Reused {linked} files from the plugin file store', flush=True)
+
+    def _link(self, path: str, store_path: str) -> int:
+        """Link a file to its store entry, and return 1 if an existing entry was reused instead of the file."""
+        os.makedirs(os.path.dirname(store_path), exist_ok=True)
+        try:
+            # New content: the store adopts the extracted file
+            os.link(path, store_path)
+            return 0
+        except FileExistsError:
+            pass
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        os.link(store_path, tmp_path)
+        os.replace(tmp_path, path)
+        return 1
+
+    def prune(self) -> None:
+        """Remove the store entries that are no longer linked from any plugin directory."""
+        if not os.path.isdir(self.store_dir):
+            return
+        for dirpath, _, filenames in os.walk(self.store_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    if os.lstat(path).st_nlink <= 1:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+class PluginInstallerRegistry:
+    """
+    Run-scoped registry of plugin installers.
+
+    A single installer of each kind is shared by all the plugins of a run, so that the
+    state they cache (e.g. the OCI image tarballs of the OciDownloader) is reused across plugins
+    and each distinct OCI image is copied only once per run.
+    """
+
+    def __init__(self, destination: str, skip_integrity_check: bool = False):
+        self.destination = destination
+        self.skip_integrity_check = skip_integrity_check
+        self._installers = {}
+        self._lock = threading.Lock()
+        self.file_store = PluginFileStore.from_environment(destination)
+
+    def get(self, package: str) -> PluginInstaller:
+        """Return the shared installer for the given package, creating it on first use."""
+        kind = 'oci' if package.startswith(OCI_PROTOCOL_PREFIX) else 'npm'
+        with self._lock:
+            if kind not in self._installers:
+                self._installers[kind] = create_plugin_installer(package, self.destination, self.skip_integrity_check)
+            return self._installers[kind]
+
+    def prepare(self, plugins: list[dict], plugin_path_by_hash: dict) -> None:
+        """Give each installer the enabled plugins it will handle during the run."""
+        plugins_by_installer = {}
+        for plugin in plugins:
+            if not plugin.get('disabled', False):
+                installer = self.get(plugin['package'])
+                plugins_by_installer.setdefault(id(installer), (installer, []))[1].append(plugin)
+        for installer, installer_plugins in plugins_by_installer.values():
+            installer.prepare(installer_plugins, plugin_path_by_hash)
+
+    def close(self) -> None:
+        for installer in self._installers.values():
+            installer.close()
+        if self.file_store is not None:
+            self.file_store.prune()
+
+class InstalledPluginManifest:
+    """
+    Manifest of the installed plugins, recorded in the install state at the end of each run so that the next run
+    finds them without opening the `dynamic-plugin-config.hash` file of every plugin directory.
+
+    Each entry is keyed by the configuration hash of the plugin, and records its path, the digest of its image
+    (OCI plugins only), its installation time and its size in bytes. The size is summed from the package members
+    while the plugin is extracted, and is unknown (None) for the plugin directories found by a scan. The plugin
+    directories that the manifest does not know of are still scanned for their hash files, and the entries whose
+    directory is gone are dropped.
+    """
+
+    def __init__(self, destination: str, entries: dict = None):
+        self.destination = destination
+        self.entries = dict(entries or {})
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load(destination: str, install_state: dict, dir_names: list[str]) -> 'InstalledPluginManifest':
+        """Load the manifest of the install state, checked against the entries of the dynamic plugins root."""
+        recorded = install_state.get('plugins')
+        if not isinstance(recorded, dict) or not all(isinstance(entry, dict) and isinstance(entry.get('path'), str) for entry in recorded.values()):
+            # Missing or unreadable manifest: scan all the plugin directories
+            recorded = {}
+        existing = set(dir_names)
+        manifest = InstalledPluginManifest(destination, {
+            plugin_hash: entry for plugin_hash, entry in recorded.items() if entry['path'] in existing
+        })
+        known_paths = {entry['path'] for entry in manifest.entries.values()}
+        for dir_name in dir_names:
+            if dir_name not in known_paths:
+                manifest._scan(dir_name)
+        return manifest
+
+    def _scan(self, dir_name: str) -> None:
+        try:
+            with open(os.path.join(self.destination, dir_name, 'dynamic-plugin-config.hash'), 'r') as hash_file:
+                hash_value = hash_file.read().strip()
+                installed_at = os.fstat(hash_file.fileno()).st_mtime
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            # Not a plugin directory
+            return
+        self.entries[hash_value] = self._describe(dir_name, installed_at)
+
+    def _describe(self, plugin_path: str, installed_at: float, size: int = None) -> dict:
+        image_digest = None
+        try:
+            with open(os.path.join(self.destination, plugin_path, 'dynamic-plugin-image.hash'), 'r') as f:
+                image_digest = f.read().strip()
+        except OSError:
+            pass
+        return {
+            'path': plugin_path,
+            'image_digest': image_digest,
+            'installed_at': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(installed_at)),
+            'size': size,
+        }
+
+    def plugin_path_by_hash(self) -> dict:
+        return {plugin_hash: entry['path'] for plugin_hash, entry in self.entries.items()}
+
+    def record(self, plugin_hash: str, plugin_path: str, size: int = None) -> None:
+        """Record a plugin just installed, replacing the plugins previously installed at the same path."""
+        entry = self._describe(plugin_path, time.time(), size)
+        with self._lock:
+            for key in [key for key, value in self.entries.items() if value['path'] == plugin_path]:
+                del self.entries[key]
+            self.entries[plugin_hash] = entry
+
+    def remove(self, plugin_hash: str) -> None:
+        with self._lock:
+            self.entries.pop(plugin_hash, None)
+
+def install_plugin(plugin: dict, plugin_path_by_hash: dict, destination: str, skip_integrity_check: bool = False, installers: PluginInstallerRegistry = None,
+                   manifest: InstalledPluginManifest = None) -> tuple[str, dict]:
     """Install a single plugin and handle configuration merging."""
     package = plugin['package']
 
@@ -915,31 +2396,159 @@ def install_plugin(plugin: dict, plugin_path_by_hash: dict, destination: str, sk
         print(f'\n======= Skipping disabled dynamic plugin {package}', flush=True)
         return None, {}
 
-    # Create appropriate installer
-    installer = create_plugin_installer(package, destination, skip_integrity_check)
+    # Use the run-scoped installer if available, otherwise create the appropriate installer
+    if installers is not None:
+        installer = installers.get(package)
+    else:
+        installer = create_plugin_installer(package, destination, skip_integrity_check)
 
     # Check if installation should be skipped
     should_skip, reason = installer.should_skip_installation(plugin, plugin_path_by_hash)
+    if not should_skip and plugin['plugin_hash'] in plugin_path_by_hash and run_journal.is_completed(plugin['plugin_hash']):
+        should_skip, reason = True, "installed_before_interruption"
     if should_skip:
         print(f'\n======= Skipping download of already installed dynamic plugin {package} ({reason})', flush=True)
         # Remove from tracking dict so we don't delete it later
-        if plugin['plugin_hash'] in plugin_path_by_hash:
-            plugin_path_by_hash.pop(plugin['plugin_hash'])
+        with plugin_path_by_hash_lock:
+            plugin_path_by_hash.pop(plugin['plugin_hash'], None)
         return None, plugin.get('pluginConfig', {})
 
     # Install the plugin
     print(f'\n======= Installing dynamic plugin {package}', flush=True)
     plugin_path = installer.install(plugin, plugin_path_by_hash)
 
+    # Share the identical files of the installed plugins
+    if installers is not None and installers.file_store is not None:
+        installers.file_store.link_tree(os.path.join(destination, plugin_path))
+
     # Create hash file for tracking
     hash_file_path = os.path.join(destination, plugin_path, 'dynamic-plugin-config.hash')
     with open(hash_file_path, 'w') as f:
         f.write(plugin['plugin_hash'])
+    if manifest is not None:
+        manifest.record(plugin['plugin_hash'], plugin_path, installer.installed_size(plugin_path))
 
+    run_journal.record('completed', plugin['plugin_hash'], True)
     print(f'\t==> Successfully installed dynamic plugin {package}', flush=True)
 
     return plugin_path, plugin.get('pluginConfig', {})
 
+def install_plugins(plugins: list[dict], plugin_path_by_hash: dict, destination: str, skip_integrity_check: bool = False, jobs: int = DEFAULT_INSTALL_JOBS,
+                    manifest: InstalledPluginManifest = None) -> list[dict]:
+    """
+    Install plugins using a bounded pool of worker threads.
+
+    Downloads and extractions run concurrently, but the plugin configurations are returned
+    in the order of the `plugins` list so that they can be merged deterministically.
+
+    Args:
+        plugins: Plugins to install, in declaration order
+        plugin_path_by_hash: Currently installed plugin paths by plugin hash
+        destination: Root directory where the dynamic plugins are installed
+        skip_integrity_check: If True, skip the integrity check of remote NPM packages
+        jobs: Maximum number of plugins installed concurrently
+        manifest: Manifest of the installed plugins, updated with the plugins installed by the run
+
+    Returns:
+        The plugin configurations, in the same order as `plugins`
+    """
+    installers = PluginInstallerRegistry(destination, skip_integrity_check)
+    try:
+        installers.prepare(plugins, plugin_path_by_hash)
+
+        if jobs <= 1 or len(plugins) <= 1:
+            return [install_plugin(plugin, plugin_path_by_hash, destination, skip_integrity_check, installers, manifest)[1] for plugin in plugins]
+
+        print(f'\n======= Installing {len(plugins)} dynamic plugins with {jobs} parallel jobs', flush=True)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(install_plugin, plugin, plugin_path_by_hash, destination, skip_integrity_check, installers, manifest)
+                for plugin in plugins
+            ]
+            try:
+                return [future.result()[1] for future in futures]
+            except BaseException:
+                # Report the first failure in declaration order, as a serial run would
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        installers.close()
+
+def requires_remote_check(plugin: dict) -> bool:
+    """Check if an enabled plugin must be checked against its registry by every run, as with the `Always` pull policy."""
+    if plugin.get('disabled') is True:
+        return False
+    package = plugin['package']
+    default_pull_policy = PullPolicy.ALWAYS if package.startswith(OCI_PROTOCOL_PREFIX) and ':latest!' in package else PullPolicy.IF_NOT_PRESENT
+    return plugin.get('pullPolicy', default_pull_policy) == PullPolicy.ALWAYS or plugin.get('forceDownload', False)
+
+def desired_state_fingerprint(plugins: list[dict]) -> str:
+    """Return a hash of the merged plugin configurations, which determine both the installed plugins and the generated app-config."""
+    return hashlib.sha256(json.dumps(plugins, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def input_fingerprint(config_files: list[str], local_packages: list[str]) -> str:
+    """
+    Return a hash of the inputs of the merged plugin configuration: the content of `dynamic-plugins.yaml` and
+    its includes, the environment variables that change the installation, and the local packages.
+    """
+    hasher = hashlib.sha256(files_fingerprint(config_files).encode('utf-8'))
+    for name in INPUT_FINGERPRINT_ENV_VARS:
+        hasher.update(f'{name}={os.environ.get(name, "")}\0'.encode('utf-8'))
+    for package in local_packages:
+        local_info = {'package': package, 'info': get_local_package_info(package)}
+        hasher.update(json.dumps(local_info, sort_keys=True).encode('utf-8'))
+    return hasher.hexdigest()
+
+def read_install_state(dynamic_plugins_root: str) -> dict:
+    """Read the state recorded by the last completed run, or an empty state."""
+    try:
+        with open(os.path.join(dynamic_plugins_root, INSTALL_STATE_FILE), 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+def save_install_state(dynamic_plugins_root: str, state: dict) -> None:
+    path = os.path.join(dynamic_plugins_root, INSTALL_STATE_FILE)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def remove_install_state(dynamic_plugins_root: str) -> None:
+    path = os.path.join(dynamic_plugins_root, INSTALL_STATE_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+
+def get_install_jobs(jobs: int = None) -> int:
+    """Resolve the number of parallel installation jobs from the `--jobs` argument or the INSTALL_JOBS environment variable."""
+    if jobs is None:
+        value = os.environ.get('INSTALL_JOBS', '')
+        if not value:
+            return DEFAULT_INSTALL_JOBS
+        try:
+            jobs = int(value)
+        except ValueError:
+            raise InstallException(f"INSTALL_JOBS must be a positive integer, got '{value}'")
+
+    if jobs < 1:
+        raise InstallException(f"The number of parallel installation jobs must be a positive integer, got {jobs}")
+    return jobs
+
+def get_npm_pack_batch_size() -> int:
+    """Resolve the maximum number of packages grabbed by a single `npm pack` from the NPM_PACK_BATCH_SIZE environment variable."""
+    value = os.environ.get('NPM_PACK_BATCH_SIZE', '')
+    if not value:
+        return DEFAULT_NPM_PACK_BATCH_SIZE
+    try:
+        batch_size = int(value)
+    except ValueError:
+        batch_size = 0
+    if batch_size < 1:
+        raise InstallException(f"NPM_PACK_BATCH_SIZE must be a positive integer, got '{value}'")
+    return batch_size
+
 RECOGNIZED_ALGORITHMS = (
     'sha512',
     'sha384',
@@ -987,71 +2596,210 @@ def get_local_package_info(package_path: str) -> dict:
         # This ensures we'll try to reinstall if there are permission issues, etc.
         return {'_error': str(e)}
 
-def verify_package_integrity(plugin: dict, archive: str) -> None:
-    package = plugin['package']
-    if 'integrity' not in plugin:
-        raise InstallException(f'Package integrity for {package} is missing')
+# Plugin fields that don't change the installed plugin: its configuration, and the internal field used to track version inheritance
+UNTRACKED_PLUGIN_FIELDS = ('pluginConfig', 'version')
+
+def compute_plugin_hash(plugin: dict) -> str:
+    """
+    Return the hash of the fields of a plugin that determine its installation, written to its `dynamic-plugin-config.hash` file.
+
+    Only the top-level fields are projected, without copying their values: the `pluginConfig` tree is never walked.
+    """
+    hash_dict = {key: value for key, value in plugin.items() if key not in UNTRACKED_PLUGIN_FIELDS}
+    if plugin['package'].startswith('./'):
+        hash_dict['_local_package_info'] = get_local_package_info(plugin['package'])
+    return hashlib.sha256(json.dumps(hash_dict, sort_keys=True).encode('utf-8')).hexdigest()
+
+class PackageIntegrityVerifier:
+    """
+    Verify the integrity of a package archive against the `integrity` field of its plugin, in-process.
 
-    integrity = plugin['integrity']
-    if not isinstance(integrity, str):
-        raise InstallException(f'Package integrity for {package} must be a string')
+    The archive content can be fed chunk by chunk with `update()` while it is being downloaded or written,
+    so that it does not need to be read again before calling `verify()`.
+    """
+
+    def __init__(self, plugin: dict):
+        package = plugin['package']
+        if 'integrity' not in plugin:
+            raise InstallException(f'Package integrity for {package} is missing')
+
+        integrity = plugin['integrity']
+        if not isinstance(integrity, str):
+            raise InstallException(f'Package integrity for {package} must be a string')
+
+        integrity = integrity.split('-')
+        if len(integrity) != 2:
+            raise InstallException(f'Package integrity for {package} must be a string of the form <algorithm>-<hash>')
+
+        algorithm = integrity[0]
+        if algorithm not in RECOGNIZED_ALGORITHMS:
+            raise InstallException(f'{package}: Provided Package integrity algorithm {algorithm} is not supported, please use one of following algorithms {RECOGNIZED_ALGORITHMS} instead')
 
-    integrity = integrity.split('-')
-    if len(integrity) != 2:
-        raise InstallException(f'Package integrity for {package} must be a string of the form <algorithm>-<hash>')
+        hash_digest = integrity[1]
+        try:
+          base64.b64decode(hash_digest, validate=True)
+        except binascii.Error:
+          raise InstallException(f'{package}: Provided Package integrity hash {hash_digest} is not a valid base64 encoding')
+
+        self.package = package
+        self.hash_digest = hash_digest
+        self._hasher = hashlib.new(algorithm)
+
+    def update(self, chunk: bytes) -> None:
+        self._hasher.update(chunk)
 
-    algorithm = integrity[0]
-    if algorithm not in RECOGNIZED_ALGORITHMS:
-        raise InstallException(f'{package}: Provided Package integrity algorithm {algorithm} is not supported, please use one of following algorithms {RECOGNIZED_ALGORITHMS} instead')
+    def update_from_file(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                self._hasher.update(chunk)
 
-    hash_digest = integrity[1]
+    def verify(self) -> None:
+        """Raise an InstallException if the hash of the content fed so far does not match the integrity hash."""
+        actual_digest = base64.b64encode(self._hasher.digest()).decode('utf-8')
+        if self.hash_digest != actual_digest:
+          raise InstallException(f'{self.package}: The hash of the downloaded package {actual_digest} does not match the provided integrity hash {self.hash_digest} provided in the configuration file')
+
+def verify_package_integrity(plugin: dict, archive: str) -> None:
+    verifier = PackageIntegrityVerifier(plugin)
     try:
-      base64.b64decode(hash_digest, validate=True)
-    except binascii.Error:
-      raise InstallException(f'{package}: Provided Package integrity hash {hash_digest} is not a valid base64 encoding')
-
-    cat_process = subprocess.Popen(["cat", archive], stdout=subprocess.PIPE)
-    openssl_dgst_process = subprocess.Popen(["openssl", "dgst", "-" + algorithm, "-binary"], stdin=cat_process.stdout, stdout=subprocess.PIPE)
-    openssl_base64_process = subprocess.Popen(["openssl", "base64", "-A"], stdin=openssl_dgst_process.stdout, stdout=subprocess.PIPE)
-
-    output, _ = openssl_base64_process.communicate()
-    if hash_digest != output.decode('utf-8').strip():
-      raise InstallException(f'{package}: The hash of the downloaded package {output.decode("utf-8").strip()} does not match the provided integrity hash {hash_digest} provided in the configuration file')
-
-# Create the lock file, so that other instances of the script will wait for this one to finish
-def create_lock(lock_file_path):
-    while True:
-      try:
-        with open(lock_file_path, 'x'):
-          print(f"======= Created lock file: {lock_file_path}")
-          return
-      except FileExistsError:
-        wait_for_lock_release(lock_file_path)
-
-# Remove the lock file
-def remove_lock(lock_file_path):
-   os.remove(lock_file_path)
-   print(f"======= Removed lock file: {lock_file_path}")
-
-# Wait for the lock file to be released
-def wait_for_lock_release(lock_file_path):
-   print(f"======= Waiting for lock release (file: {lock_file_path})...", flush=True)
-   while True:
-     if not os.path.exists(lock_file_path):
-       break
-     time.sleep(1)
-   print("======= Lock released.")
+        verifier.update_from_file(archive)
+    except OSError as e:
+        raise InstallException(f'{verifier.package}: The downloaded package {archive} could not be read ({e.strerror}), so its hash does not match the provided integrity hash {verifier.hash_digest} provided in the configuration file')
+    verifier.verify()
+
+class InstallLock:
+    """
+    Lock serializing the installations that share a dynamic plugins root, based on a kernel file lock (`fcntl.flock`).
+
+    A waiting installation wakes up as soon as the lock is released, and the kernel releases the lock when its
+    holder exits, even when it is killed with SIGKILL, so that a lock file left behind never blocks the next
+    installations. While the lock is held, the lock file records the PID and the host of its holder.
+
+    The lock is either exclusive, to change the installed plugins, or shared, to only read them: several
+    installations can hold the shared lock at the same time, e.g. to check that the plugins are up to date.
+
+    The exclusive holder removes the lock file before releasing the lock. A waiter that then gets the lock of the
+    removed file notices that the path now refers to another file (or to none), and tries again.
+    """
+
+    def __init__(self, path: str, timeout: float = None):
+        self.path = path
+        self.timeout = timeout
+        self._fd = None
+        self.shared = False
+
+    @staticmethod
+    def from_environment(path: str) -> 'InstallLock':
+        """Create the lock, with the timeout set by the INSTALL_LOCK_TIMEOUT environment variable (default: wait forever)."""
+        timeout = os.environ.get('INSTALL_LOCK_TIMEOUT', '')
+        try:
+            timeout = float(timeout) if timeout else None
+        except ValueError:
+            raise InstallException(f"INSTALL_LOCK_TIMEOUT must be a number of seconds, got '{timeout}'")
+        return InstallLock(path, timeout)
+
+    def holder(self) -> str:
+        """Describe the current holder of the lock from the lock file, if any."""
+        try:
+            with open(self.path, 'r') as f:
+                metadata = json.load(f)
+            return f"PID {metadata['pid']} on host {metadata['host']} since {metadata['since']}"
+        except (OSError, ValueError, KeyError, TypeError):
+            return 'unknown holder'
+
+    def acquire(self, shared: bool = False) -> None:
+        """Acquire the lock, exclusive unless `shared` is set, waiting for the other holders if needed."""
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        waited = False
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if not self._try_lock(fd, operation):
+                    if not waited:
+                        waited = True
+                        print(f"======= Waiting for lock release (file: {self.path}, held by {self.holder()})...", flush=True)
+                    self._wait(fd, operation, deadline)
+                if self._is_current(fd):
+                    break
+            except BaseException:
+                os.close(fd)
+                raise
+            # The lock file was removed by the previous holder: lock the new one
+            os.close(fd)
+
+        self._fd = fd
+        self.shared = shared
+        if waited:
+            print("======= Lock released.")
+        if shared:
+            print(f"======= Acquired shared lock: {self.path}")
+            return
+        metadata = {'pid': os.getpid(), 'host': socket.gethostname(), 'since': time.strftime('%Y-%m-%dT%H:%M:%S%z')}
+        os.ftruncate(fd, 0)
+        os.write(fd, json.dumps(metadata).encode('utf-8'))
+        print(f"======= Created lock file: {self.path}")
+
+    @staticmethod
+    def _try_lock(fd: int, operation: int) -> bool:
+        try:
+            fcntl.flock(fd, operation | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _wait(self, fd: int, operation: int, deadline: float) -> None:
+        if deadline is None:
+            # Blocks until the holder releases the lock
+            fcntl.flock(fd, operation)
+            return
+        while not self._try_lock(fd, operation):
+            if time.monotonic() >= deadline:
+                raise InstallException(f"Timed out after {self.timeout} seconds waiting for the lock {self.path}, held by {self.holder()}")
+            time.sleep(0.1)
+
+    def _is_current(self, fd: int) -> bool:
+        try:
+            return os.fstat(fd).st_ino == os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+
+    def upgrade(self) -> None:
+        """Trade the shared lock for the exclusive lock. Other installations may take the exclusive lock in between."""
+        self.release()
+        self.acquire()
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if self.shared:
+            # Other installations may still hold the shared lock on this file
+            os.close(self._fd)
+            self._fd = None
+            print(f"======= Released shared lock: {self.path}")
+            return
+        # Remove the lock file while still holding the lock, so that no other process locks it in between
+        if self._is_current(self._fd):
+            os.remove(self.path)
+        os.close(self._fd)
+        self._fd = None
+        print(f"======= Removed lock file: {self.path}")
 
 # Clean up temporary catalog index directory
-def cleanup_catalog_index_temp_dir(dynamic_plugins_root):
+def cleanup_catalog_index_temp_dir(catalog_index_mount):
    """Clean up temporary catalog index directory."""
-   catalog_index_temp_dir = os.path.join(dynamic_plugins_root, '.catalog-index-temp')
+   catalog_index_temp_dir = os.path.join(catalog_index_mount, '.catalog-index-temp')
    if os.path.exists(catalog_index_temp_dir):
        print('\n======= Cleaning up temporary catalog index directory', flush=True)
        shutil.rmtree(catalog_index_temp_dir, ignore_errors=True, onerror=None)
 
-def _extract_catalog_index_layers(manifest: dict, local_dir: str, catalog_index_temp_dir: str) -> None:
-    """Extract layers from the catalog index OCI image."""
+def _extract_catalog_index_layers(manifest: dict, local_dir: str, catalog_index_temp_dir: str, catalog_entities_staging_dir: str = None) -> None:
+    """
+    Extract layers from the catalog index OCI image.
+
+    When `catalog_entities_staging_dir` is given, the `catalog-entities/` subtree is extracted there instead of
+    `catalog_index_temp_dir`, and the other files are only extracted if `catalog_index_temp_dir` is set.
+    """
     max_entry_size = int(os.environ.get('MAX_ENTRY_SIZE', DEFAULT_MAX_ENTRY_SIZE))
 
     for layer in manifest.get('layers', []):
@@ -1066,22 +2814,128 @@ def _extract_catalog_index_layers(manifest: dict, local_dir: str, catalog_index_
             continue
 
         print(f"\t==> Extracting layer {filename}", flush=True)
-        _extract_layer_tarball(layer_file, catalog_index_temp_dir, max_entry_size)
+        _extract_layer_tarball(layer_file, catalog_index_temp_dir, max_entry_size, catalog_entities_staging_dir)
 
-def _extract_layer_tarball(layer_file: str, catalog_index_temp_dir: str, max_entry_size: int) -> None:
+def _extract_layer_tarball(layer_file: str, catalog_index_temp_dir: str, max_entry_size: int, catalog_entities_staging_dir: str = None) -> None:
     """Extract a single layer tarball with security checks."""
     with tarfile.open(layer_file, 'r:*') as tar:  # NOSONAR
         for member in tar.getmembers():
+            extract_dir = catalog_index_temp_dir
+            if catalog_entities_staging_dir is not None and os.path.normpath(member.name).split(os.sep)[0] == 'catalog-entities':
+                extract_dir = catalog_entities_staging_dir
+            if extract_dir is None:
+                continue
             # Security checks
             if member.size > max_entry_size:
                 print(f"\t==> WARNING: Skipping large file {member.name} in catalog index", flush=True)
                 continue
             if member.islnk() or member.issym():
-                realpath = os.path.realpath(os.path.join(catalog_index_temp_dir, *os.path.split(member.linkname)))
-                if not realpath.startswith(catalog_index_temp_dir):
+                realpath = os.path.realpath(os.path.join(extract_dir, *os.path.split(member.linkname)))
+                if not realpath.startswith(extract_dir):
                     print(f"\t==> WARNING: Skipping link outside archive: {member.name}", flush=True)
                     continue
-            tar.extract(member, path=catalog_index_temp_dir, filter='data')
+            tar.extract(member, path=extract_dir, filter='data')
+
+@contextlib.contextmanager
+def catalog_entities_lock(catalog_entities_parent_dir: str):
+    """
+    Hold an exclusive kernel file lock on a catalog entities directory while extracting into it.
+
+    Installations that share the directory then never remove each other's staging directories, nor rename
+    their catalog entities into place at the same time. The lock file is never removed.
+    """
+    os.makedirs(catalog_entities_parent_dir, exist_ok=True)
+    lock_path = os.path.join(catalog_entities_parent_dir, CATALOG_ENTITIES_LOCK_FILE)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print(f"\t==> Waiting for another extraction into {catalog_entities_parent_dir} to complete", flush=True)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+def _create_catalog_entities_staging_dir(catalog_entities_parent_dir: str) -> str:
+    """
+    Create a staging directory next to the catalog-entities directory, removing the ones left over by an interrupted run.
+    Must be called with the `catalog_entities_lock()` of the directory held.
+    """
+    os.makedirs(catalog_entities_parent_dir, exist_ok=True)
+    for dir_name in os.listdir(catalog_entities_parent_dir):
+        if dir_name.startswith(CATALOG_ENTITIES_STAGING_PREFIX):
+            shutil.rmtree(os.path.join(catalog_entities_parent_dir, dir_name), ignore_errors=True, onerror=None)
+    return tempfile.mkdtemp(prefix=CATALOG_ENTITIES_STAGING_PREFIX, dir=catalog_entities_parent_dir)
+
+def _move_catalog_entities(catalog_entities_staging_dir: str, catalog_entities_dest: str) -> bool:
+    """
+    Rename the extracted extensions catalog entities into `catalog_entities_dest`, replacing the previous ones.
+
+    Returns False when the catalog index has neither `catalog-entities/extensions/` nor `catalog-entities/marketplace/` directory.
+    """
+    extensions_dir_from_catalog_index = os.path.join(catalog_entities_staging_dir, 'catalog-entities', 'extensions')
+    if not os.path.isdir(extensions_dir_from_catalog_index):
+        # fallback to 'catalog-entities/marketplace' directory for backward compatibility
+        extensions_dir_from_catalog_index = os.path.join(catalog_entities_staging_dir, 'catalog-entities', 'marketplace')
+    if not os.path.isdir(extensions_dir_from_catalog_index):
+        return False
+
+    # Ensure the destination directory is in sync with the catalog entities from the index image:
+    # the previous entities are moved aside, within the same file system, and removed with the staging directory
+    if os.path.lexists(catalog_entities_dest):
+        os.rename(catalog_entities_dest, os.path.join(catalog_entities_staging_dir, 'previous'))
+    os.rename(extensions_dir_from_catalog_index, catalog_entities_dest)
+    return True
+
+def catalog_index_digest(catalog_index_image: str) -> str:
+    """
+    Return the digest of a catalog index image, or None when it cannot be determined.
+
+    The lookup is best-effort: without a digest, the catalog index is simply extracted again. The registry is
+    always queried, bypassing the run journal: a digest journaled by an interrupted run would hide an index pushed
+    again since, and the catalog index extractions also run in the background while the journal is loaded.
+    """
+    image = catalog_index_image
+    if image.startswith(DOCKER_PROTOCOL_PREFIX):
+        image = image[len(DOCKER_PROTOCOL_PREFIX):]
+    try:
+        return _fetch_oci_manifest(f'{OCI_PROTOCOL_PREFIX}{image}')['Digest']
+    except Exception:
+        return None
+
+def _catalog_index_unchanged(catalog_entities_parent_dir: str, digest: str) -> bool:
+    """Check whether the last successful extraction into a directory was made from the catalog index image with this digest."""
+    if digest is None:
+        return False
+    try:
+        with open(os.path.join(catalog_entities_parent_dir, CATALOG_INDEX_STATE_FILE), 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if not isinstance(state, dict) or state.get('digest') != digest:
+        return False
+    return not state.get('catalog_entities') or os.path.isdir(os.path.join(catalog_entities_parent_dir, 'catalog-entities'))
+
+def _save_catalog_index_state(catalog_entities_parent_dir: str, digest: str) -> None:
+    """Record the digest of the catalog index image extracted into a directory, once the extraction is complete."""
+    if digest is None:
+        return
+    os.makedirs(catalog_entities_parent_dir, exist_ok=True)
+    state = {
+        'digest': digest,
+        'catalog_entities': os.path.isdir(os.path.join(catalog_entities_parent_dir, 'catalog-entities')),
+    }
+    state_file = os.path.join(catalog_entities_parent_dir, CATALOG_INDEX_STATE_FILE)
+    with open(f'{state_file}.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(f'{state_file}.tmp', state_file)
+
+def _remove_catalog_index_state(catalog_entities_parent_dir: str) -> None:
+    try:
+        os.remove(os.path.join(catalog_entities_parent_dir, CATALOG_INDEX_STATE_FILE))
+    except FileNotFoundError:
+        pass
 
 def extract_catalog_index(catalog_index_image: str, catalog_index_mount: str, catalog_entities_parent_dir: str) -> str:
     """Extract the catalog index OCI image and return the path to dynamic-plugins.default.yaml if found."""
@@ -1096,56 +2950,70 @@ def extract_catalog_index(catalog_index_image: str, catalog_index_mount: str, ca
 
     catalog_index_temp_dir = os.path.join(catalog_index_mount, '.catalog-index-temp')
     os.makedirs(catalog_index_temp_dir, exist_ok=True)
+    default_plugins_file = os.path.join(catalog_index_temp_dir, 'dynamic-plugins.default.yaml')
+    # Copy of dynamic-plugins.default.yaml kept with the catalog entities, as the temporary directory is removed at exit
+    kept_default_plugins_file = os.path.join(catalog_entities_parent_dir, CATALOG_INDEX_DEFAULT_PLUGINS_FILE)
+
+    with catalog_entities_lock(catalog_entities_parent_dir):
+        return _extract_catalog_index(skopeo_path, catalog_index_image, resolved_image, default_plugins_file, kept_default_plugins_file,
+                                      catalog_index_temp_dir, catalog_entities_parent_dir)
+
+def _extract_catalog_index(skopeo_path: str, catalog_index_image: str, resolved_image: str, default_plugins_file: str,
+                           kept_default_plugins_file: str, catalog_index_temp_dir: str, catalog_entities_parent_dir: str) -> str:
+    digest = catalog_index_digest(catalog_index_image)
+    if _catalog_index_unchanged(catalog_entities_parent_dir, digest) and os.path.isfile(kept_default_plugins_file):
+        print(f"\t==> Catalog index image is unchanged ({digest}), skipping extraction", flush=True)
+        shutil.copyfile(kept_default_plugins_file, default_plugins_file)
+        return default_plugins_file
+    _remove_catalog_index_state(catalog_entities_parent_dir)
+
+    catalog_entities_staging_dir = _create_catalog_entities_staging_dir(catalog_entities_parent_dir)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_url = resolved_image
+            if not image_url.startswith(DOCKER_PROTOCOL_PREFIX):
+                image_url = f'{DOCKER_PROTOCOL_PREFIX}{image_url}'
+            if digest is not None:
+                # Copy the image that was inspected rather than the current tag
+                image_url = f'{image_repository(image_url)}@{digest}'
+            print("\t==> Copying catalog index image to local filesystem", flush=True)
+            local_dir = os.path.join(tmp_dir, 'catalog-index-oci')
+
+            # Download the OCI image using skopeo
+            run_command(
+                [skopeo_path, 'copy', '--override-os=linux', '--override-arch=amd64', image_url, f'dir:{local_dir}'],
+                f"Failed to download catalog index image {resolved_image}"
+            )
 
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        image_url = resolved_image
-        if not image_url.startswith(DOCKER_PROTOCOL_PREFIX):
-            image_url = f'{DOCKER_PROTOCOL_PREFIX}{image_url}'
-        print("\t==> Copying catalog index image to local filesystem", flush=True)
-        local_dir = os.path.join(tmp_dir, 'catalog-index-oci')
-
-        # Download the OCI image using skopeo
-        run_command(
-            [skopeo_path, 'copy', '--override-os=linux', '--override-arch=amd64', image_url, f'dir:{local_dir}'],
-            f"Failed to download catalog index image {resolved_image}"
-        )
-
-        manifest_path = os.path.join(local_dir, 'manifest.json')
-        if not os.path.isfile(manifest_path):
-            raise InstallException(f"manifest.json not found in catalog index image {catalog_index_image}")
-
-        with open(manifest_path, 'r') as f:
-            manifest = json.load(f)
-
-        print("\t==> Extracting catalog index layers", flush=True)
-        _extract_catalog_index_layers(manifest, local_dir, catalog_index_temp_dir)
+            manifest_path = os.path.join(local_dir, 'manifest.json')
+            if not os.path.isfile(manifest_path):
+                raise InstallException(f"manifest.json not found in catalog index image {catalog_index_image}")
 
-    default_plugins_file = os.path.join(catalog_index_temp_dir, 'dynamic-plugins.default.yaml')
-    if not os.path.isfile(default_plugins_file):
-        raise InstallException(f"Catalog index image {catalog_index_image} does not contain the expected dynamic-plugins.default.yaml file")
-    print("\t==> Successfully extracted dynamic-plugins.default.yaml from catalog index image", flush=True)
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
 
-    print(f"\t==> Extracting extensions catalog entities to {catalog_entities_parent_dir}", flush=True)
+            print("\t==> Extracting catalog index layers", flush=True)
+            _extract_catalog_index_layers(manifest, local_dir, catalog_index_temp_dir, catalog_entities_staging_dir)
 
-    extensions_dir_from_catalog_index = os.path.join(catalog_index_temp_dir, 'catalog-entities', 'extensions')
-    if not os.path.isdir(extensions_dir_from_catalog_index):
-        # fallback to 'catalog-entities/marketplace' directory for backward compatibility
-        extensions_dir_from_catalog_index = os.path.join(catalog_index_temp_dir, 'catalog-entities', 'marketplace')
+        if not os.path.isfile(default_plugins_file):
+            raise InstallException(f"Catalog index image {catalog_index_image} does not contain the expected dynamic-plugins.default.yaml file")
+        print("\t==> Successfully extracted dynamic-plugins.default.yaml from catalog index image", flush=True)
 
-    if os.path.isdir(extensions_dir_from_catalog_index):
-        os.makedirs(catalog_entities_parent_dir, exist_ok=True)
+        print(f"\t==> Extracting extensions catalog entities to {catalog_entities_parent_dir}", flush=True)
         catalog_entities_dest = os.path.join(catalog_entities_parent_dir, 'catalog-entities')
-        # Ensure the destination directory is is sync with the catalog entities from the index image
-        if os.path.exists(catalog_entities_dest):
-            shutil.rmtree(catalog_entities_dest, ignore_errors=True, onerror=None)
-        shutil.copytree(extensions_dir_from_catalog_index, catalog_entities_dest, dirs_exist_ok=True)
-        print("\t==> Successfully extracted extensions catalog entities from index image", flush=True)
-    else:
-        print(f"\t==> WARNING: Catalog index image {catalog_index_image} does not have neither 'catalog-entities/extensions/' nor 'catalog-entities/marketplace/' directory",
-            flush=True)
+        if _move_catalog_entities(catalog_entities_staging_dir, catalog_entities_dest):
+            print("\t==> Successfully extracted extensions catalog entities from index image", flush=True)
+        else:
+            print(f"\t==> WARNING: Catalog index image {catalog_index_image} does not have neither 'catalog-entities/extensions/' nor 'catalog-entities/marketplace/' directory",
+                flush=True)
+    finally:
+        shutil.rmtree(catalog_entities_staging_dir, ignore_errors=True, onerror=None)
 
-    return default_plugins_file
+    if digest is not None:
+        shutil.copyfile(default_plugins_file, kept_default_plugins_file)
+        _save_catalog_index_state(catalog_entities_parent_dir, digest)
 
+    return default_plugins_file
 
 def extract_extra_catalog_index(catalog_index_image: str, subdirectory: str, catalog_entities_parent_dir: str, previously_used_by: str = None) -> None:
     """Extract catalog entities from an extra catalog index image.
@@ -1169,48 +3037,56 @@ def extract_extra_catalog_index(catalog_index_image: str, subdirectory: str, cat
 
     resolved_image = resolve_image_reference(catalog_index_image)
 
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        image_url = resolved_image
-        if not image_url.startswith(DOCKER_PROTOCOL_PREFIX):
-            image_url = f'{DOCKER_PROTOCOL_PREFIX}{image_url}'
-        print("\t==> Copying extra catalog index image to local filesystem", flush=True)
-        local_dir = os.path.join(tmp_dir, 'catalog-index-oci')
+    subdirectory_parent = os.path.join(catalog_entities_parent_dir, subdirectory)
+    with catalog_entities_lock(subdirectory_parent):
+        _extract_extra_catalog_index(skopeo_path, catalog_index_image, resolved_image, subdirectory_parent)
 
-        run_command(
-            [skopeo_path, 'copy', '--override-os=linux', '--override-arch=amd64', image_url, f'dir:{local_dir}'],
-            f"Failed to download extra catalog index image {resolved_image}"
-        )
+def _extract_extra_catalog_index(skopeo_path: str, catalog_index_image: str, resolved_image: str, subdirectory_parent: str) -> None:
+    digest = catalog_index_digest(catalog_index_image)
+    if _catalog_index_unchanged(subdirectory_parent, digest):
+        print(f"\t==> Extra catalog index image is unchanged ({digest}), skipping extraction", flush=True)
+        return
+    _remove_catalog_index_state(subdirectory_parent)
 
-        manifest_path = os.path.join(local_dir, 'manifest.json')
-        if not os.path.isfile(manifest_path):
-            raise InstallException(f"manifest.json not found in extra catalog index image {catalog_index_image}")
+    catalog_entities_staging_dir = _create_catalog_entities_staging_dir(subdirectory_parent)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_url = resolved_image
+            if not image_url.startswith(DOCKER_PROTOCOL_PREFIX):
+                image_url = f'{DOCKER_PROTOCOL_PREFIX}{image_url}'
+            if digest is not None:
+                # Copy the image that was inspected rather than the current tag
+                image_url = f'{image_repository(image_url)}@{digest}'
+            print("\t==> Copying extra catalog index image to local filesystem", flush=True)
+            local_dir = os.path.join(tmp_dir, 'catalog-index-oci')
+
+            run_command(
+                [skopeo_path, 'copy', '--override-os=linux', '--override-arch=amd64', image_url, f'dir:{local_dir}'],
+                f"Failed to download extra catalog index image {resolved_image}"
+            )
 
-        with open(manifest_path, 'r') as f:
-            manifest = json.load(f)
+            manifest_path = os.path.join(local_dir, 'manifest.json')
+            if not os.path.isfile(manifest_path):
+                raise InstallException(f"manifest.json not found in extra catalog index image {catalog_index_image}")
 
-        catalog_index_temp_dir = os.path.join(tmp_dir, 'extracted')
-        os.makedirs(catalog_index_temp_dir, exist_ok=True)
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
 
-        print("\t==> Extracting extra catalog index layers", flush=True)
-        _extract_catalog_index_layers(manifest, local_dir, catalog_index_temp_dir)
+            # Only the catalog entities of extra catalog index images are extracted
+            print("\t==> Extracting extra catalog index layers", flush=True)
+            _extract_catalog_index_layers(manifest, local_dir, None, catalog_entities_staging_dir)
 
-        subdirectory_parent = os.path.join(catalog_entities_parent_dir, subdirectory)
         print(f"\t==> Extracting extensions catalog entities to {subdirectory_parent}", flush=True)
-
-        extensions_dir_from_catalog_index = os.path.join(catalog_index_temp_dir, 'catalog-entities', 'extensions')
-        if not os.path.isdir(extensions_dir_from_catalog_index):
-            extensions_dir_from_catalog_index = os.path.join(catalog_index_temp_dir, 'catalog-entities', 'marketplace')
-
-        if os.path.isdir(extensions_dir_from_catalog_index):
-            os.makedirs(subdirectory_parent, exist_ok=True)
-            catalog_entities_dest = os.path.join(subdirectory_parent, 'catalog-entities')
-            if os.path.exists(catalog_entities_dest):
-                shutil.rmtree(catalog_entities_dest, ignore_errors=True, onerror=None)
-            shutil.copytree(extensions_dir_from_catalog_index, catalog_entities_dest, dirs_exist_ok=True)
+        catalog_entities_dest = os.path.join(subdirectory_parent, 'catalog-entities')
+        if _move_catalog_entities(catalog_entities_staging_dir, catalog_entities_dest):
             print(f"\t==> Successfully extracted extensions catalog entities from extra index image to {subdirectory_parent}", flush=True)
         else:
             print(f"\t==> WARNING: Extra catalog index image {catalog_index_image} does not have neither 'catalog-entities/extensions/' nor 'catalog-entities/marketplace/' directory",
                 flush=True)
+    finally:
+        shutil.rmtree(catalog_entities_staging_dir, ignore_errors=True, onerror=None)
+
+    _save_catalog_index_state(subdirectory_parent, digest)
 
 def image_ref_to_subdirectory(image_ref: str) -> str:
     """Derive a subdirectory name from an image reference by replacing special characters with underscores."""
@@ -1248,6 +3124,63 @@ def parse_extra_catalog_index_images(extra_images_str: str) -> list[tuple[str, s
         result.append((name, image_ref))
     return result
 
+class CatalogIndexExtractor:
+    """
+    Extracts the primary and the extra catalog index images in the background, concurrently with each other
+    and with the merge and the installation of the plugins.
+
+    Only the `dynamic-plugins.default.yaml` file of the primary index is needed by the merge. The extra indexes
+    that share a subdirectory name are extracted one after the other, in declaration order, so that the last
+    one wins as with a sequential extraction.
+    """
+
+    def __init__(self, catalog_index_mount: str, catalog_entities_parent_dir: str):
+        self.catalog_index_mount = catalog_index_mount
+        self.catalog_entities_parent_dir = catalog_entities_parent_dir
+        self._executor = None
+        self._catalog_index = None
+        self._extra_catalog_indexes = []
+
+    def start(self, catalog_index_image: str, extra_entries: list[tuple[str, str]]) -> None:
+        """Start extracting the primary index (if any) and the extra indexes, given as (subdirectory, image) tuples."""
+        extra_parent_dir = os.path.join(self.catalog_entities_parent_dir, "extra")
+        extractions_by_name = {}  # {subdirectory: [(image_ref, previously_used_by), ...]}
+        seen_names = {}
+        for name, image_ref in extra_entries:
+            extractions_by_name.setdefault(name, []).append((image_ref, seen_names.get(name)))
+            seen_names[name] = image_ref
+
+        tasks = len(extractions_by_name) + (1 if catalog_index_image else 0)
+        if tasks == 0:
+            return
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=tasks)
+        if catalog_index_image:
+            self._catalog_index = self._executor.submit(
+                extract_catalog_index, catalog_index_image, self.catalog_index_mount, self.catalog_entities_parent_dir)
+
+        def extract_extra_catalog_indexes(name: str, extractions: list[tuple[str, str]]) -> None:
+            for image_ref, previously_used_by in extractions:
+                extract_extra_catalog_index(image_ref, name, extra_parent_dir, previously_used_by)
+
+        for name, extractions in extractions_by_name.items():
+            self._extra_catalog_indexes.append(self._executor.submit(extract_extra_catalog_indexes, name, extractions))
+
+    def default_plugins_file(self) -> str:
+        """Wait for the primary catalog index, and return the path to its dynamic-plugins.default.yaml file."""
+        return self._catalog_index.result() if self._catalog_index is not None else None
+
+    def wait(self) -> None:
+        """Wait for all the extractions, raising the first error in declaration order."""
+        if self._executor is None:
+            return
+        try:
+            self.default_plugins_file()
+            for future in self._extra_catalog_indexes:
+                future.result()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
 def pre_merge_oci_disabled_state(
     include_plugin_lists: list[tuple[str, list[dict]]],
     main_plugins: list[dict],
@@ -1378,33 +3311,103 @@ def filter_disabled_oci_plugins(plugins: list[dict], disabled_plugin_registries:
     return filtered
 
 
-def main():
+def prefetch_oci_plugin_paths(plugin_lists: list[list[dict]], jobs: int = DEFAULT_INSTALL_JOBS) -> None:
+    """
+    Auto-detect the plugin paths of the path-less OCI packages concurrently, so that the merge, which
+    processes the plugins one by one, finds them in the run caches.
 
-    dynamic_plugins_root = sys.argv[1]
+    Errors are ignored here: the merge looks up the failed images again and reports the errors in declaration order.
+    """
+    images = []
+    for plugins in plugin_lists:
+        for plugin in plugins:
+            package = plugin.get('package')
+            if not isinstance(package, str) or not package.startswith(OCI_PROTOCOL_PREFIX):
+                continue
+            match = re.match(OciPackageMerger.EXPECTED_OCI_PATTERN, package)
+            # Same images as the ones auto-detected by `OciPackageMerger.parse_plugin_key()`
+            if not match or match.group(4) or (match.group(2) == "{{inherit}}" and match.group(3) is None):
+                continue
+            image = f"{match.group(1)}:{match.group(2)}" if match.group(2) else f"{match.group(1)}@{match.group(3)}"
+            if image not in images:
+                images.append(image)
+
+    if jobs <= 1 or len(images) <= 1:
+        return
+
+    print(f'\n======= Fetching the manifests of {len(images)} OCI images with {jobs} parallel jobs', flush=True)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(get_oci_plugin_paths, image) for image in images]
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+
+def configure_run_caches(dynamic_plugins_root: str) -> None:
+    """Configure the persistence of the run-scoped caches from the environment."""
+    ttl = os.environ.get('IMAGE_RESOLUTION_CACHE_TTL', '')
+    try:
+        ttl = float(ttl) if ttl else 0
+    except ValueError:
+        raise InstallException(f"IMAGE_RESOLUTION_CACHE_TTL must be a number of seconds, got '{ttl}'")
+    if ttl > 0:
+        image_resolution_cache.configure(os.path.join(dynamic_plugins_root, IMAGE_RESOLUTION_CACHE_FILE), ttl)
+
+    # Never expires, but only keeps the images of the current configuration
+    oci_plugin_paths_by_digest.configure(os.path.join(dynamic_plugins_root, OCI_PLUGIN_PATHS_BY_DIGEST_CACHE_FILE), float('inf'), prune_unused=True)
+    ttl = os.environ.get('OCI_PLUGIN_PATHS_CACHE_TTL', '')
+    try:
+        ttl = float(ttl) if ttl else 0
+    except ValueError:
+        raise InstallException(f"OCI_PLUGIN_PATHS_CACHE_TTL must be a number of seconds, got '{ttl}'")
+    if ttl > 0:
+        oci_plugin_paths_by_tag.configure(os.path.join(dynamic_plugins_root, OCI_PLUGIN_PATHS_BY_TAG_CACHE_FILE), ttl)
+
+def save_run_caches() -> None:
+    """Persist the run-scoped caches that are configured to be persisted."""
+    image_resolution_cache.save()
+    oci_plugin_paths_by_digest.save()
+    oci_plugin_paths_by_tag.save()
+
+    fallback_images = fallback_image_references()
+    if fallback_images:
+        print(f'\n======= Images resolved to the {RHDH_FALLBACK_PREFIX} fallback registry:', flush=True)
+        for fallback_image in fallback_images:
+            print(f'\t- {fallback_image}', flush=True)
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Install dynamic plugins for the Backstage application.')
+    parser.add_argument('dynamic_plugins_root', help='root directory where the dynamic plugins will be installed')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help=f'number of plugins downloaded and extracted concurrently (default: INSTALL_JOBS or {DEFAULT_INSTALL_JOBS})')
+    return parser.parse_args(argv)
 
-    lock_file_path = os.path.join(dynamic_plugins_root, 'install-dynamic-plugins.lock')
-    atexit.register(remove_lock, lock_file_path)
-    atexit.register(cleanup_catalog_index_temp_dir, dynamic_plugins_root)
+def main():
+
+    args = parse_args(sys.argv[1:])
+    dynamic_plugins_root = args.dynamic_plugins_root
+    jobs = get_install_jobs(args.jobs)
+    configure_run_caches(dynamic_plugins_root)
+
+    # Installations sharing the dynamic plugins root hold the lock shared until they find out that they have to
+    # change the installed plugins, so that they do not wait for each other when the plugins are up to date
+    install_lock = InstallLock.from_environment(os.path.join(dynamic_plugins_root, 'install-dynamic-plugins.lock'))
+    atexit.register(install_lock.release)
+    # The catalog index is extracted in a directory of its own, as concurrent installations may be reading the same root
+    catalog_index_mount = tempfile.mkdtemp(prefix='catalog-index-')
+    atexit.register(shutil.rmtree, catalog_index_mount, True)
+    atexit.register(cleanup_catalog_index_temp_dir, catalog_index_mount)
     signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
-    create_lock(lock_file_path)
+    install_lock.acquire(shared=True)
 
-    # Extract catalog index if CATALOG_INDEX_IMAGE is set
+    # Extract catalog index if CATALOG_INDEX_IMAGE is set, and extra catalog index images if EXTRA_CATALOG_INDEX_IMAGES is set,
+    # in the background while the plugins are merged and installed
     catalog_index_image = os.environ.get("CATALOG_INDEX_IMAGE", "")
-    catalog_index_default_file = None
     catalog_entities_parent_dir = os.environ.get("CATALOG_ENTITIES_EXTRACT_DIR", os.path.join(tempfile.gettempdir(), "extensions"))
-    if catalog_index_image:
-        catalog_index_default_file = extract_catalog_index(catalog_index_image, dynamic_plugins_root, catalog_entities_parent_dir)
-
-    # Extract extra catalog index images if EXTRA_CATALOG_INDEX_IMAGES is set
     extra_catalog_index_images = os.environ.get("EXTRA_CATALOG_INDEX_IMAGES", "")
-    if extra_catalog_index_images:
-        extra_parent_dir = os.path.join(catalog_entities_parent_dir, "extra")
-        extra_entries = parse_extra_catalog_index_images(extra_catalog_index_images)
-        seen_names = {}
-        for name, image_ref in extra_entries:
-            previously_used_by = seen_names.get(name)
-            seen_names[name] = image_ref
-            extract_extra_catalog_index(image_ref, name, extra_parent_dir, previously_used_by)
+    catalog_indexes = CatalogIndexExtractor(catalog_index_mount, catalog_entities_parent_dir)
+    catalog_indexes.start(catalog_index_image, parse_extra_catalog_index_images(extra_catalog_index_images) if extra_catalog_index_images else [])
 
     skip_integrity_check = os.environ.get("SKIP_INTEGRITY_CHECK", "").lower() == "true"
 
@@ -1414,9 +3417,12 @@ def main():
     # test if file dynamic-plugins.yaml exists
     if not os.path.isfile(dynamic_plugins_file):
         print(f"No {dynamic_plugins_file} file found. Skipping dynamic plugins installation.")
+        install_lock.upgrade()
         with open(dynamic_plugins_global_config_file, 'w') as file:
             file.write('')
             file.close()
+        remove_install_state(dynamic_plugins_root)
+        catalog_indexes.wait()
         exit(0)
 
     global_config = {
@@ -1430,9 +3436,12 @@ def main():
 
     if content == '' or content is None:
         print(f"{dynamic_plugins_file} file is empty. Skipping dynamic plugins installation.")
+        install_lock.upgrade()
         with open(dynamic_plugins_global_config_file, 'w') as file:
             file.write('')
             file.close()
+        remove_install_state(dynamic_plugins_root)
+        catalog_indexes.wait()
         exit(0)
 
     if not isinstance(content, dict):
@@ -1455,11 +3464,23 @@ def main():
     if catalog_index_image:
         embedded_default = 'dynamic-plugins.default.yaml'
         if embedded_default in includes:
+            catalog_index_default_file = catalog_indexes.default_plugins_file()
             print(f"\n======= Replacing {embedded_default} with catalog index: {catalog_index_default_file}", flush=True)
             # Replace the embedded default file with the catalog index at the same position
             index = includes.index(embedded_default)
             includes[index] = catalog_index_default_file
 
+    # Nothing to do if the inputs of the configuration did not change since the last completed run, and none of
+    # its plugins must be checked against its registry: the includes are not even parsed then
+    config_files = [dynamic_plugins_file] + includes
+    install_state = read_install_state(dynamic_plugins_root)
+    if (install_state.get('input_fingerprint') and all(isinstance(include, str) for include in includes)
+            and install_state['input_fingerprint'] == input_fingerprint(config_files, install_state.get('local_packages', []))
+            and os.path.isfile(dynamic_plugins_global_config_file)):
+        print('\n======= Dynamic plugins configuration is unchanged, skipping installation', flush=True)
+        catalog_indexes.wait()
+        return
+
     include_plugin_lists = []  # [(filename, plugin_list), ...]
     for include in includes:
         if not isinstance(include, str):
@@ -1483,6 +3504,11 @@ def main():
 
         include_plugin_lists.append((include, include_plugins))
 
+    # Read back the journal of an interrupted run with the same configuration, if any
+    run_journal_file = os.path.join(dynamic_plugins_root, RUN_JOURNAL_FILE)
+    run_journal_fingerprint = files_fingerprint(config_files)
+    run_journal.load(run_journal_file, run_journal_fingerprint)
+
     if 'plugins' in content:
         plugins = content['plugins']
     else:
@@ -1502,6 +3528,9 @@ def main():
 
     plugins = filter_disabled_oci_plugins(plugins, disabled_plugin_registries)
 
+    # Auto-detect the OCI plugin paths concurrently, before the sequential merge
+    prefetch_oci_plugin_paths([include_plugins for _, include_plugins in include_plugin_lists] + [plugins], jobs)
+
     for include_file, include_plugins in include_plugin_lists:
         for plugin in include_plugins:
             merge_plugin(plugin, all_plugins, include_file, level=0)
@@ -1511,46 +3540,73 @@ def main():
 
     # add a hash for each plugin configuration to detect changes and check if version field is set for OCI packages
     for plugin in all_plugins.values():
-        hash_dict = copy.deepcopy(plugin)
-        # remove elements that shouldn't be tracked for installation detection
-        hash_dict.pop('pluginConfig', None)
-        # Don't track the internal version field used to track version inheritance
-        hash_dict.pop('version', None)
-
-        package = plugin['package']
-        if package.startswith('./'):
-            local_info = get_local_package_info(package)
-            hash_dict['_local_package_info'] = local_info
+        plugin['plugin_hash'] = compute_plugin_hash(plugin)
+
+    # Nothing to change if the last completed run installed the same configuration and no plugin must be checked
+    # against its registry: only the catalog indexes are extracted then
+    fingerprint = desired_state_fingerprint(list(all_plugins.values()))
+    remote_check = any(requires_remote_check(plugin) for plugin in all_plugins.values())
+    local_packages = sorted({plugin['package'] for plugin in all_plugins.values() if plugin['package'].startswith('./')})
+    inputs = None if remote_check else input_fingerprint(config_files, local_packages)
+
+    def up_to_date() -> bool:
+        return (not remote_check and read_install_state(dynamic_plugins_root).get('fingerprint') == fingerprint
+                and os.path.isfile(dynamic_plugins_global_config_file))
+
+    if not up_to_date():
+        install_lock.upgrade()
+    # Another installation may have installed the same configuration while this one was waiting for the exclusive lock
+    if up_to_date():
+        print('\n======= Dynamic plugins are up to date, skipping installation', flush=True)
+        catalog_indexes.wait()
+        return
+
+    # The installed plugins are about to change: the state is written again once the run completes
+    install_state = read_install_state(dynamic_plugins_root)
+    remove_install_state(dynamic_plugins_root)
+    # Resume the journal of an interrupted run with the same configuration, if any
+    run_journal.open(run_journal_file, run_journal_fingerprint)
+
+    # remove the staging directories left over by an interrupted run
+    dir_names = []
+    for dir_name in os.listdir(dynamic_plugins_root):
+        if dir_name.startswith(STAGING_DIR_PREFIX):
+            shutil.rmtree(os.path.join(dynamic_plugins_root, dir_name), ignore_errors=True, onerror=None)
+        else:
+            dir_names.append(dir_name)
 
-        plugin_hash = hashlib.sha256(json.dumps(hash_dict, sort_keys=True).encode('utf-8')).hexdigest()
-        plugin['plugin_hash'] = plugin_hash
+    # create a dict of all currently installed plugins in dynamic_plugins_root, from the manifest of the last completed run
+    manifest = InstalledPluginManifest.load(dynamic_plugins_root, install_state, dir_names)
+    plugin_path_by_hash = manifest.plugin_path_by_hash()
 
-    # create a dict of all currently installed plugins in dynamic_plugins_root
-    plugin_path_by_hash = {}
-    for dir_name in os.listdir(dynamic_plugins_root):
-        dir_path = os.path.join(dynamic_plugins_root, dir_name)
-        if os.path.isdir(dir_path):
-            hash_file_path = os.path.join(dir_path, 'dynamic-plugin-config.hash')
-            if os.path.isfile(hash_file_path):
-                with open(hash_file_path, 'r') as hash_file:
-                    hash_value = hash_file.read().strip()
-                    plugin_path_by_hash[hash_value] = dir_name
-
-    # iterate through the list of plugins
-    for plugin in all_plugins.values():
-        _, plugin_config = install_plugin(plugin, plugin_path_by_hash, dynamic_plugins_root, skip_integrity_check)
+    # install the plugins, possibly in parallel
+    plugin_configs = install_plugins(list(all_plugins.values()), plugin_path_by_hash, dynamic_plugins_root, skip_integrity_check, jobs, manifest)
 
-        # Merge plugin configuration if provided
+    # Merge plugin configurations in declaration order
+    for plugin_config in plugin_configs:
         if plugin_config:
             global_config = maybe_merge_config(plugin_config, global_config)
 
     yaml.safe_dump(global_config, open(dynamic_plugins_global_config_file, 'w'))
+    save_run_caches()
 
     # remove plugins that have been removed from the configuration
     for hash_value in plugin_path_by_hash:
         plugin_directory = os.path.join(dynamic_plugins_root, plugin_path_by_hash[hash_value])
         print('\n======= Removing previously installed dynamic plugin', plugin_path_by_hash[hash_value], flush=True)
         shutil.rmtree(plugin_directory, ignore_errors=True, onerror=None)
+        manifest.remove(hash_value)
+
+    catalog_indexes.wait()
+
+    # The run completed: the next one must not resume it
+    run_journal.remove()
+    save_install_state(dynamic_plugins_root, {
+        'fingerprint': fingerprint,
+        'input_fingerprint': inputs,
+        'local_packages': local_packages,
+        'plugins': manifest.entries,
+    })
 
 if __name__ == '__main__':
     main()
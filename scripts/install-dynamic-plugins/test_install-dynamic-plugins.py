@@ -105,6 +105,14 @@ def create_mock_skopeo_copy(manifest_path, layer_tarball, mock_result):
     return mock_subprocess_run
 
 
+@pytest.fixture(autouse=True)
+def clear_run_caches():
+    """Reset the run-scoped caches of the installer so that tests do not leak state into each other."""
+    install_dynamic_plugins.clear_run_caches()
+    yield
+    install_dynamic_plugins.clear_run_caches()
+
+
 class TestNPMPackageMergerParsePluginKey:
     """Test cases for NPMPackageMerger.parse_plugin_key() method."""
 
@@ -1305,9 +1313,7 @@ class TestNpmPluginInstallerInstall:
         mock_tar.getmembers.return_value = []
         mock_tarfile.return_value.__enter__.return_value = mock_tar
 
-        # Mock file operations
-        mocker.patch('os.path.exists', return_value=False)
-        mocker.patch('os.mkdir')
+        # Mock file operations (the package is extracted in a staging directory under tmp_path)
         mocker.patch('os.remove')
 
         installer = install_dynamic_plugins.NpmPluginInstaller(str(tmp_path), skip_integrity_check=True)
@@ -1315,6 +1321,284 @@ class TestNpmPluginInstallerInstall:
 
         assert plugin_path == 'test-package-1.0.0'
 
+    def test_integrity_verified_in_process(self, tmp_path, mocker):
+        """Test that the integrity of an archive is computed without spawning any process."""
+        archive = tmp_path / 'package.tgz'
+        archive.write_bytes(b'archive content' * 100000)
+        integrity = 'sha512-' + base64.b64encode(hashlib.sha512(archive.read_bytes()).digest()).decode()
+        mock_popen = mocker.patch('subprocess.Popen')
+        mock_run = mocker.patch('subprocess.run')
+
+        install_dynamic_plugins.verify_package_integrity({'package': 'test-package@1.0.0', 'integrity': integrity}, str(archive))
+
+        mock_popen.assert_not_called()
+        mock_run.assert_not_called()
+
+    def test_integrity_verified_while_streaming(self):
+        """Test that the integrity can be verified from chunks fed while the archive streams."""
+        content = b'streamed archive content'
+        plugin = {'package': 'test-package@1.0.0', 'integrity': 'sha256-' + base64.b64encode(hashlib.sha256(content).digest()).decode()}
+
+        verifier = install_dynamic_plugins.PackageIntegrityVerifier(plugin)
+        for i in range(0, len(content), 5):
+            verifier.update(content[i:i + 5])
+        verifier.verify()
+
+        verifier = install_dynamic_plugins.PackageIntegrityVerifier(plugin)
+        verifier.update(content[:-1])
+        with pytest.raises(InstallException) as exc_info:
+            verifier.verify()
+        assert 'does not match the provided integrity hash' in str(exc_info.value)
+
+@pytest.fixture
+def npm_registry(tmp_path):
+    """Local stand-in NPM registry serving a packument and a tarball, recording the requests it receives."""
+    import http.server
+    import io
+    import threading
+
+    tarball = tmp_path / 'registry-archive.tgz'
+    with create_test_tarball(tarball) as tar:
+        content = b'{"name": "@scope/plugin", "version": "1.2.3"}'
+        info = tarfile.TarInfo(name='package/package.json')
+        info.size = len(content)
+        tar.addfile(info, io.BytesIO(content))
+    tarball_bytes = tarball.read_bytes()
+
+    registry = {'requests': [], 'client_ports': set()}
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            registry['requests'].append((self.path, dict(self.headers)))
+            registry['client_ports'].add(self.client_address[1])
+            base_url = f'http://127.0.0.1:{self.server.server_port}'
+            if self.path == '/@scope%2fplugin':
+                body = json.dumps({
+                    'name': '@scope/plugin',
+                    'dist-tags': {'latest': '1.2.3'},
+                    'versions': {'1.2.3': {
+                        'name': '@scope/plugin',
+                        'version': '1.2.3',
+                        'dist': {'tarball': f'{base_url}/redirect/plugin-1.2.3.tgz'},
+                    }},
+                }).encode('utf-8')
+            elif self.path == '/redirect/plugin-1.2.3.tgz':
+                self.send_response(302)
+                self.send_header('Location', '/@scope/plugin/-/plugin-1.2.3.tgz')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            elif self.path == '/@scope/plugin/-/plugin-1.2.3.tgz':
+                body = tarball_bytes
+            else:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True)
+    thread.start()
+    registry['url'] = f'http://127.0.0.1:{server.server_port}/'
+    registry['integrity'] = 'sha512-' + base64.b64encode(hashlib.sha512(tarball_bytes).digest()).decode()
+    yield registry
+    server.shutdown()
+    server.server_close()
+
+
+class TestNpmRegistryFetcher:
+    """Test cases for fetching NPM packages directly from a registry, against a local stand-in registry."""
+
+    @pytest.fixture
+    def destination(self, tmp_path, npm_registry, monkeypatch):
+        destination = tmp_path / 'dynamic-plugins-root'
+        destination.mkdir()
+        host = npm_registry['url'].removeprefix('http:')
+        (destination / '.npmrc').write_text(f'@scope:registry={npm_registry["url"]}\n{host}:_authToken=${{TEST_NPM_TOKEN}}\n')
+        monkeypatch.setenv('TEST_NPM_TOKEN', 'secret-token')
+        monkeypatch.setenv('NPM_CONFIG_USERCONFIG', str(tmp_path / 'missing-user-npmrc'))
+        monkeypatch.setenv('NPM_REGISTRY_FETCH', 'true')
+        for proxy in ('HTTPS_PROXY', 'https_proxy', 'HTTP_PROXY', 'http_proxy'):
+            monkeypatch.delenv(proxy, raising=False)
+        return destination
+
+    @pytest.mark.parametrize('package,expected', [
+        ('@scope/plugin', 'scope-plugin-1.0.0.tgz'),
+        ('plugin', 'plugin-1.0.0.tgz'),
+    ])
+    def test_archive_name_matches_npm_pack(self, package, expected):
+        """Test that fetched archives are named as `npm pack` names them."""
+        assert install_dynamic_plugins.NpmRegistryFetcher.archive_name(package, '1.0.0') == expected
+
+    @pytest.mark.parametrize('package,supported', [
+        ('@scope/plugin@1.2.3', True),
+        ('@scope/plugin@latest', True),
+        ('@scope/plugin', True),
+        ('alias@npm:@scope/plugin@1.2.3', True),
+        ('@scope/plugin@^1.2.0', False),
+        ('git+https://github.com/user/repo.git', False),
+        ('https://example.com/plugin-1.2.3.tgz', False),
+    ])
+    def test_supported_package_specs(self, destination, package, supported):
+        """Test that only exact versions and dist-tags of registry packages are fetched directly."""
+        fetcher = install_dynamic_plugins.NpmRegistryFetcher.from_environment(str(destination))
+        assert fetcher.supports(package) is supported
+
+    def test_fetcher_disabled_by_default(self, tmp_path, monkeypatch):
+        """Test that `npm pack` remains the default."""
+        monkeypatch.delenv('NPM_REGISTRY_FETCH', raising=False)
+        assert install_dynamic_plugins.NpmRegistryFetcher.from_environment(str(tmp_path)) is None
+
+    def test_install_from_registry(self, destination, npm_registry, mocker):
+        """Test that a package is fetched with the .npmrc settings, verified and extracted without running npm."""
+        mock_run = mocker.patch('subprocess.run')
+        plugin = {'package': '@scope/plugin@latest', 'integrity': npm_registry['integrity']}
+
+        installer = install_dynamic_plugins.NpmPluginInstaller(str(destination))
+        plugin_path = installer.install(plugin, {})
+
+        assert plugin_path == 'scope-plugin-1.2.3'
+        assert json.loads((destination / plugin_path / 'package.json').read_text())['version'] == '1.2.3'
+        assert not (destination / 'scope-plugin-1.2.3.tgz').exists()
+        mock_run.assert_not_called()
+        assert [path for path, _ in npm_registry['requests']] == [
+            '/@scope%2fplugin', '/redirect/plugin-1.2.3.tgz', '/@scope/plugin/-/plugin-1.2.3.tgz'
+        ]
+        assert all(headers['Authorization'] == 'Bearer secret-token' for _, headers in npm_registry['requests'])
+        # All the requests went through the same pooled connection
+        assert len(npm_registry['client_ports']) == 1
+
+    def test_install_from_registry_integrity_mismatch(self, destination, npm_registry):
+        """Test that an archive not matching its integrity is rejected and removed."""
+        plugin = {'package': '@scope/plugin@1.2.3', 'integrity': 'sha512-' + base64.b64encode(b'wronghash').decode()}
+
+        installer = install_dynamic_plugins.NpmPluginInstaller(str(destination))
+        with pytest.raises(InstallException) as exc_info:
+            installer.install(plugin, {})
+
+        assert 'does not match the provided integrity hash' in str(exc_info.value)
+        assert not (destination / 'scope-plugin-1.2.3.tgz').exists()
+
+    def test_install_from_registry_unknown_version(self, destination, npm_registry):
+        """Test that a version missing from the packument raises an InstallException."""
+        plugin = {'package': '@scope/plugin@9.9.9', 'integrity': npm_registry['integrity']}
+
+        installer = install_dynamic_plugins.NpmPluginInstaller(str(destination))
+        with pytest.raises(InstallException) as exc_info:
+            installer.install(plugin, {})
+
+        assert 'Version 9.9.9 of package @scope/plugin not found' in str(exc_info.value)
+
+
+class TestNpmPackBatch:
+    """Test cases for grabbing several NPM packages with a single `npm pack`."""
+
+    @staticmethod
+    def mock_npm_pack(mocker, destination, fail_batch=False):
+        """Mock `npm pack` writing an archive per package, and return the recorded commands."""
+        import io
+        import subprocess
+
+        commands = []
+
+        def write_archive(package):
+            name = package.rsplit('@', 1)[0].removeprefix('@').replace('/', '-')
+            filename = f'{name}-1.0.0.tgz'
+            with create_test_tarball(destination / filename) as tar:
+                content = json.dumps({'name': package}).encode('utf-8')
+                info = tarfile.TarInfo(name='package/package.json')
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+            return filename
+
+        def mock_run(cmd, **kwargs):
+            commands.append(cmd)
+            if '--json' in cmd:
+                if fail_batch:
+                    raise subprocess.CalledProcessError(1, cmd, stderr='404 Not Found')
+                packages = cmd[3:]
+                return mocker.MagicMock(stdout=json.dumps([{'filename': write_archive(package)} for package in packages]))
+            return mocker.MagicMock(stdout=write_archive(cmd[2]) + '\n')
+
+        mocker.patch('subprocess.run', side_effect=mock_run)
+        return commands
+
+    def test_packages_are_packed_in_one_batch(self, tmp_path, mocker, monkeypatch):
+        """Test that the packages to install are packed together and each archive is mapped back to its plugin."""
+        monkeypatch.setenv('NPM_PACK_BATCH_SIZE', '10')
+        destination = tmp_path / 'dynamic-plugins-root'
+        destination.mkdir()
+        commands = self.mock_npm_pack(mocker, destination)
+        verify = mocker.patch.object(install_dynamic_plugins, 'verify_package_integrity')
+
+        plugins = [
+            {'package': '@scope/plugin-one@1.0.0', 'integrity': 'sha512-aaaa', 'plugin_hash': 'hash-one'},
+            {'package': 'plugin-two@1.0.0', 'integrity': 'sha512-bbbb', 'plugin_hash': 'hash-two'},
+            {'package': 'plugin-installed@1.0.0', 'integrity': 'sha512-cccc', 'plugin_hash': 'hash-installed'},
+        ]
+        install_dynamic_plugins.install_plugins(plugins, {'hash-installed': 'plugin-installed-1.0.0'}, str(destination))
+
+        assert commands == [['npm', 'pack', '--json', '@scope/plugin-one@1.0.0', 'plugin-two@1.0.0']]
+        assert [call.args[0]['package'] for call in verify.call_args_list] == ['@scope/plugin-one@1.0.0', 'plugin-two@1.0.0']
+        assert json.loads((destination / 'scope-plugin-one-1.0.0' / 'package.json').read_text()) == {'name': '@scope/plugin-one@1.0.0'}
+        assert json.loads((destination / 'plugin-two-1.0.0' / 'package.json').read_text()) == {'name': 'plugin-two@1.0.0'}
+        assert not list(destination.glob('*.tgz'))
+
+    def test_failed_batch_packs_packages_one_by_one(self, tmp_path, mocker, monkeypatch):
+        """Test that the packages of a failed batch are packed one by one."""
+        monkeypatch.setenv('NPM_PACK_BATCH_SIZE', '10')
+        destination = tmp_path / 'dynamic-plugins-root'
+        destination.mkdir()
+        commands = self.mock_npm_pack(mocker, destination, fail_batch=True)
+
+        plugins = [
+            {'package': 'plugin-one@1.0.0', 'plugin_hash': 'hash-one'},
+            {'package': 'plugin-two@1.0.0', 'plugin_hash': 'hash-two'},
+        ]
+        install_dynamic_plugins.install_plugins(plugins, {}, str(destination), skip_integrity_check=True)
+
+        assert commands == [
+            ['npm', 'pack', '--json', 'plugin-one@1.0.0', 'plugin-two@1.0.0'],
+            ['npm', 'pack', 'plugin-one@1.0.0'],
+            ['npm', 'pack', 'plugin-two@1.0.0'],
+        ]
+        assert (destination / 'plugin-one-1.0.0' / 'package.json').exists()
+        assert (destination / 'plugin-two-1.0.0' / 'package.json').exists()
+
+    def test_batches_are_limited_in_size(self, tmp_path, mocker, monkeypatch):
+        """Test that no more than NPM_PACK_BATCH_SIZE packages are packed at once, and unused archives are removed."""
+        monkeypatch.setenv('NPM_PACK_BATCH_SIZE', '2')
+        destination = tmp_path / 'dynamic-plugins-root'
+        destination.mkdir()
+        commands = self.mock_npm_pack(mocker, destination)
+
+        plugins = [{'package': f'plugin-{i}@1.0.0', 'plugin_hash': f'hash-{i}'} for i in range(5)]
+        installer = install_dynamic_plugins.NpmPluginInstaller(str(destination), skip_integrity_check=True)
+        installer.prepare(plugins, {})
+
+        assert [len(command) - 3 for command in commands] == [2, 2]
+        assert len(list(destination.glob('*.tgz'))) == 4
+        installer.close()
+        assert not list(destination.glob('*.tgz'))
+
+    @pytest.mark.parametrize('value', ['0', 'many'])
+    def test_invalid_batch_size(self, monkeypatch, value):
+        """Test that an invalid NPM_PACK_BATCH_SIZE raises an InstallException."""
+        monkeypatch.setenv('NPM_PACK_BATCH_SIZE', value)
+        with pytest.raises(InstallException) as exc_info:
+            install_dynamic_plugins.get_npm_pack_batch_size()
+        assert 'NPM_PACK_BATCH_SIZE must be a positive integer' in str(exc_info.value)
+
+
 @pytest.mark.integration
 class TestNpmPluginInstallerIntegration:
     """Integration tests with real file operations."""
@@ -1394,7 +1678,10 @@ class TestNpmPluginInstallerIntegration:
 
         # Test extraction
         installer = install_dynamic_plugins.NpmPluginInstaller(str(tmp_path))
-        _plugin_path = installer._extract_npm_package(str(tarball_path))
+        plugin_path = installer._extract_npm_package(str(tarball_path))
+        assert installer.installed_size(plugin_path) == sum(
+            len(content) for content in ['{"name": "test", "version": "1.0.0"}', "module.exports = {};", "exports.helper = () => {};"]
+        )
 
         # Verify extracted files
         extracted_dir = tmp_path / "test-package-1.0.0"
@@ -1622,7 +1909,7 @@ class TestOciDownloader:
         """Test that get_plugin_tar caches downloaded images."""
         mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
 
-        # Mock skopeo copy
+        # Mock skopeo inspect and skopeo copy
         mock_run = mocker.patch('subprocess.run')
         mock_run.return_value.returncode = 0
 
@@ -1630,6 +1917,7 @@ class TestOciDownloader:
         manifest_data = {
             'layers': [{'digest': 'sha256:abc123'}]
         }
+        mock_run.return_value.stdout = json.dumps(manifest_data).encode('utf-8')
 
         downloader = install_dynamic_plugins.OciDownloader(str(tmp_path))
 
@@ -1766,6 +2054,61 @@ class TestOciDownloader:
         assert "plugin-one" in paths
         assert "plugin-two" in paths
 
+    def test_get_oci_plugin_paths_persisted_by_digest(self, tmp_path, mocker, monkeypatch):
+        """Plugin paths of images pinned by digest are reused by later runs, those of tags only within their TTL."""
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        mock_run = mocker.patch('subprocess.run')
+        mock_run.return_value.returncode = 0
+        annotation_value = base64.b64encode(json.dumps([{"plugin-one": {}}]).encode('utf-8')).decode('utf-8')
+        mock_run.return_value.stdout = json.dumps({"annotations": {"io.backstage.dynamic-packages": annotation_value}}).encode('utf-8')
+        digest_image = 'oci://registry.io/plugin@sha256:' + 'a' * 64
+        tag_image = 'oci://registry.io/plugin:v1.0'
+
+        def run():
+            install_dynamic_plugins.clear_run_caches()
+            install_dynamic_plugins.configure_run_caches(str(tmp_path))
+            paths = [install_dynamic_plugins.get_oci_plugin_paths(image) for image in (digest_image, tag_image)]
+            install_dynamic_plugins.save_run_caches()
+            return paths
+
+        assert run() == [["plugin-one"], ["plugin-one"]]
+        assert mock_run.call_count == 2
+
+        mock_run.reset_mock()
+        assert run() == [["plugin-one"], ["plugin-one"]]
+        assert [call.args[0][-1] for call in mock_run.call_args_list] == ['docker://registry.io/plugin:v1.0']
+
+        monkeypatch.setenv('OCI_PLUGIN_PATHS_CACHE_TTL', '3600')
+        run()
+        mock_run.reset_mock()
+        assert run() == [["plugin-one"], ["plugin-one"]]
+        mock_run.assert_not_called()
+
+    def test_plugin_paths_by_digest_keep_only_used_images(self, tmp_path, mocker):
+        """Test that the persisted plugin paths of the images pinned by digest that a run no longer uses are dropped."""
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        mock_run = mocker.patch('subprocess.run')
+        annotation_value = base64.b64encode(json.dumps([{"plugin-one": {}}]).encode('utf-8')).decode('utf-8')
+        mock_run.return_value.stdout = json.dumps({"annotations": {"io.backstage.dynamic-packages": annotation_value}}).encode('utf-8')
+        old_image = 'oci://registry.io/plugin@sha256:' + 'a' * 64
+        new_image = 'oci://registry.io/plugin@sha256:' + 'b' * 64
+        journaled_image = 'oci://registry.io/other@sha256:' + 'c' * 64
+
+        def run(images, journaled=()):
+            install_dynamic_plugins.clear_run_caches()
+            install_dynamic_plugins.configure_run_caches(str(tmp_path))
+            install_dynamic_plugins.run_journal.open(str(tmp_path / '.install-journal.jsonl'), 'fingerprint')
+            for image in journaled:
+                install_dynamic_plugins.run_journal.record('oci_plugin_paths', image, ["plugin-one"])
+            for image in images:
+                install_dynamic_plugins.get_oci_plugin_paths(image)
+            install_dynamic_plugins.save_run_caches()
+            return set(json.loads((tmp_path / install_dynamic_plugins.OCI_PLUGIN_PATHS_BY_DIGEST_CACHE_FILE).read_text()))
+
+        assert run([old_image, journaled_image]) == {old_image, journaled_image}
+        # The paths of an image found in the journal of an interrupted run are kept
+        assert run([new_image, journaled_image], journaled=[journaled_image]) == {new_image, journaled_image}
+
     def test_get_oci_plugin_paths_no_annotation(self, tmp_path, mocker):
         """Test get_oci_plugin_paths when annotation is missing."""
         mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
@@ -1891,22 +2234,20 @@ class TestOciDownloader:
         """Test that digest() returns the correct digest from remote image."""
         mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
 
-        # Mock skopeo inspect output
-        inspect_output = {
-            'Digest': 'sha256:abc123def456789'
-        }
+        # Mock skopeo inspect --raw output
+        raw_manifest = json.dumps({'schemaVersion': 2, 'layers': [{'digest': 'sha256:layer123'}]}).encode('utf-8')
 
         mock_run = mocker.patch('subprocess.run')
         mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = json.dumps(inspect_output).encode('utf-8')
+        mock_run.return_value.stdout = raw_manifest
 
         downloader = install_dynamic_plugins.OciDownloader(str(tmp_path))
         package = 'oci://registry.io/plugin:v1.0!path'
 
         digest = downloader.digest(package)
 
-        # Should return just the hash part
-        assert digest == 'abc123def456789'
+        # Should return just the hash part of the manifest digest
+        assert digest == hashlib.sha256(raw_manifest).hexdigest()
 
         # Verify skopeo inspect was called
         mock_run.assert_called_once()
@@ -1914,6 +2255,652 @@ class TestOciDownloader:
         assert 'inspect' in call_args
         assert 'docker://registry.io/plugin:v1.0' in call_args
 
+    def test_digest_is_fetched_once_per_image(self, tmp_path, mocker):
+        """Test that digest() inspects each image only once, whatever the plugin path."""
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+
+        mock_run = mocker.patch('subprocess.run')
+        mock_run.return_value.returncode = 0
+        mock_run.return_value.stdout = json.dumps({'layers': []}).encode('utf-8')
+        digest = hashlib.sha256(mock_run.return_value.stdout).hexdigest()
+
+        downloader = install_dynamic_plugins.OciDownloader(str(tmp_path))
+
+        assert downloader.digest('oci://registry.io/plugin:v1.0!plugin-one') == digest
+        assert downloader.digest('oci://registry.io/plugin:v1.0!plugin-two') == digest
+        assert downloader.digest('oci://registry.io/plugin:v1.0') == digest
+
+        mock_run.assert_called_once()
+
+    def test_manifest_is_shared_by_path_detection_digest_and_copy(self, tmp_path, mocker):
+        """Test that one skopeo inspect --raw serves the plugin paths, the digest and the copy of the inspected digest."""
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+
+        annotation = base64.b64encode(json.dumps([{'plugin-one': {}}]).encode('utf-8')).decode('utf-8')
+        raw_manifest = json.dumps({
+            'annotations': {'io.backstage.dynamic-packages': annotation},
+            'layers': [{'digest': 'sha256:layer123'}],
+        }).encode('utf-8')
+        digest = hashlib.sha256(raw_manifest).hexdigest()
+
+        def mock_run(cmd, **kwargs):
+            result = mocker.MagicMock()
+            if 'copy' in cmd:
+                dest_dir = [arg for arg in cmd if arg.startswith('dir:')][0][len('dir:'):]
+                os.makedirs(dest_dir, exist_ok=True)
+                with open(os.path.join(dest_dir, 'manifest.json'), 'w') as f:
+                    json.dump({'layers': [{'digest': 'sha256:layer123'}]}, f)
+            else:
+                result.stdout = raw_manifest
+            return result
+
+        mock = mocker.patch('subprocess.run', side_effect=mock_run)
+
+        image = 'oci://registry.io:5000/plugin:v1.0'
+        assert install_dynamic_plugins.get_oci_plugin_paths(image) == ['plugin-one']
+        downloader = install_dynamic_plugins.OciDownloader(str(tmp_path))
+        assert downloader.digest(f'{image}!plugin-one') == digest
+        downloader.get_plugin_tar(image)
+
+        commands = [call[0][0] for call in mock.call_args_list]
+        assert [command[1] for command in commands] == ['inspect', 'copy']
+        assert f'docker://registry.io:5000/plugin@sha256:{digest}' in commands[1]
+
+    def test_manifest_digest_hashes_raw_bytes(self, tmp_path, mocker):
+        """Test that the digest is computed from the manifest bytes as served, without newline translation."""
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        raw_manifest = b'{\r\n  "layers": [{"digest": "sha256:layer123"}]\r\n}\r\n'
+        mock_run = mocker.patch('subprocess.run', return_value=mocker.MagicMock(stdout=raw_manifest))
+
+        manifest = install_dynamic_plugins.get_oci_manifest('oci://registry.io/plugin:v1.0')
+
+        assert manifest['Digest'] == 'sha256:' + hashlib.sha256(raw_manifest).hexdigest()
+        assert manifest['Layers'] == ['sha256:layer123']
+        assert mock_run.call_args[1]['text'] is False
+
+    def test_manifest_follows_image_index(self, tmp_path, mocker):
+        """Test that the layers of an image index come from the linux/amd64 manifest, and the digest from the index."""
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+
+        index = json.dumps({'annotations': {'key': 'index'}, 'manifests': [
+            {'digest': 'sha256:arm', 'platform': {'os': 'linux', 'architecture': 'arm64'}},
+            {'digest': 'sha256:amd', 'platform': {'os': 'linux', 'architecture': 'amd64'}},
+        ]}).encode('utf-8')
+        manifests = {
+            'docker://registry.io/plugin:v1.0': index,
+            'docker://registry.io/plugin@sha256:amd': json.dumps({'annotations': {'key': 'amd', 'other': 'amd'}, 'layers': [{'digest': 'sha256:layer123'}]}).encode('utf-8'),
+        }
+        mocker.patch('subprocess.run', side_effect=lambda cmd, **kwargs: mocker.MagicMock(stdout=manifests[cmd[-1]]))
+
+        manifest = install_dynamic_plugins.get_oci_manifest('oci://registry.io/plugin:v1.0')
+
+        assert manifest == {
+            'Digest': 'sha256:' + hashlib.sha256(index).hexdigest(),
+            'Annotations': {'key': 'index', 'other': 'amd'},
+            'Layers': ['sha256:layer123'],
+        }
+
+    def test_always_policy_install_inspects_image_once(self, tmp_path, mocker):
+        """Test that the skip check and the digest file of an updated plugin share a single skopeo inspect."""
+        import io
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+
+        plugin_path = 'plugin-one'
+        layer = tmp_path / 'layer.tar.gz'
+        with create_test_tarball(layer) as tar:
+            content = b'{"name": "plugin-one"}'
+            info = tarfile.TarInfo(name=f'{plugin_path}/package.json')
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+        inspections = []
+        raw_manifest = json.dumps({'layers': [{'digest': 'sha256:layer123'}]}).encode('utf-8')
+
+        def mock_run(cmd, **kwargs):
+            result = mocker.MagicMock()
+            if 'copy' in cmd:
+                dest_dir = [arg for arg in cmd if arg.startswith('dir:')][0][len('dir:'):]
+                os.makedirs(dest_dir, exist_ok=True)
+                with open(os.path.join(dest_dir, 'manifest.json'), 'w') as f:
+                    json.dump({'layers': [{'digest': 'sha256:layer123'}]}, f)
+                import shutil as sh
+                sh.copy(str(layer), os.path.join(dest_dir, 'layer123'))
+            else:
+                inspections.append(cmd)
+                result.stdout = raw_manifest
+            return result
+
+        mocker.patch('subprocess.run', side_effect=mock_run)
+
+        destination = tmp_path / 'dynamic-plugins-root'
+        (destination / plugin_path).mkdir(parents=True)
+        (destination / plugin_path / 'dynamic-plugin-image.hash').write_text('olddigest')
+
+        plugin = {
+            'package': f'oci://registry.io/plugin:v1.0!{plugin_path}',
+            'version': 'v1.0',
+            'pullPolicy': 'Always',
+            'plugin_hash': 'hash123',
+        }
+        plugin_path_by_hash = {'hash123': plugin_path}
+
+        install_dynamic_plugins.install_plugin(plugin, plugin_path_by_hash, str(destination))
+
+        assert len(inspections) == 1
+        assert (destination / plugin_path / 'dynamic-plugin-image.hash').read_text() == hashlib.sha256(raw_manifest).hexdigest()
+
+    def test_extract_plugins_single_pass_multiple_paths(self, tmp_path, mocker):
+        """Test that several plugins are extracted from a streamed layer, keeping the security checks."""
+        import io
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+
+        tarball_path = tmp_path / 'layer.tar.gz'
+        with create_test_tarball(tarball_path) as tar:
+            for name in ['plugin-one/package.json', 'plugin-two/package.json', 'other/package.json']:
+                content = b'{"name": "test"}'
+                info = tarfile.TarInfo(name=name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+            link = tarfile.TarInfo(name='plugin-two/escape')
+            link.type = tarfile.SYMTYPE
+            link.linkname = '../../etc/passwd'
+            tar.addfile(link)
+
+        member_counts = []
+        original_next = tarfile.TarFile.next
+
+        def recording_next(tar):
+            member_counts.append(len(tar.members))
+            return original_next(tar)
+
+        mocker.patch.object(tarfile.TarFile, 'next', recording_next)
+        mock_open = mocker.spy(tarfile, 'open')
+
+        destination = tmp_path / 'dest'
+        destination.mkdir()
+        downloader = install_dynamic_plugins.OciDownloader(str(destination))
+        downloader.extract_plugins(str(tarball_path), ['plugin-one', 'plugin-two'])
+
+        assert (destination / 'plugin-one' / 'package.json').exists()
+        assert (destination / 'plugin-two' / 'package.json').exists()
+        assert not (destination / 'other').exists()
+        assert not (destination / 'plugin-two' / 'escape').exists()
+        mock_open.assert_called_once()
+        # Member headers are not accumulated while streaming the layer
+        assert max(member_counts) <= 1
+        assert downloader.extracted_sizes == {'plugin-one': len(b'{"name": "test"}'), 'plugin-two': len(b'{"name": "test"}')}
+
+    @pytest.mark.parametrize('mode', ['w', 'w:gz'])
+    def test_extract_plugins_keeps_hardlinks_of_streamed_layer(self, tmp_path, mocker, mode):
+        """Test that a hard link inside a plugin path is extracted from a streamed layer, with or without a member index."""
+        import io
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+
+        tarball_path = tmp_path / 'layer.tar'
+        with create_test_tarball(tarball_path, mode) as tar:
+            content = b'module.exports = {};'
+            info = tarfile.TarInfo(name='plugin-one/dist/index.js')
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+            link = tarfile.TarInfo(name='plugin-one/dist/alias.js')
+            link.type = tarfile.LNKTYPE
+            link.linkname = 'plugin-one/dist/index.js'
+            tar.addfile(link)
+
+        downloader = install_dynamic_plugins.OciDownloader(str(tmp_path))
+        for extraction in ['first', 'indexed']:
+            destination = tmp_path / extraction
+            downloader.extract_plugins(str(tarball_path), ['plugin-one'], str(destination))
+
+            assert (destination / 'plugin-one' / 'dist' / 'alias.js').read_bytes() == b'module.exports = {};'
+            assert (destination / 'plugin-one' / 'dist' / 'alias.js').stat().st_ino == (destination / 'plugin-one' / 'dist' / 'index.js').stat().st_ino
+
+    def test_plugins_of_same_image_are_extracted_in_one_pass(self, tmp_path, mocker):
+        """Test that the plugins expected from an image are extracted together and each moved into place."""
+        import io
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+
+        layer = tmp_path / 'layer.tar.gz'
+        with create_test_tarball(layer) as tar:
+            for plugin_path in ['plugin-one', 'plugin-two']:
+                content = json.dumps({'name': plugin_path}).encode('utf-8')
+                info = tarfile.TarInfo(name=f'{plugin_path}/package.json')
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+
+        def mock_run(cmd, **kwargs):
+            result = mocker.MagicMock()
+            if 'copy' in cmd:
+                dest_dir = [arg for arg in cmd if arg.startswith('dir:')][0][len('dir:'):]
+                os.makedirs(dest_dir, exist_ok=True)
+                with open(os.path.join(dest_dir, 'manifest.json'), 'w') as f:
+                    json.dump({'layers': [{'digest': 'sha256:layer123'}]}, f)
+                import shutil as sh
+                sh.copy(str(layer), os.path.join(dest_dir, 'layer123'))
+            else:
+                result.stdout = raw_manifest
+            return result
+
+        raw_manifest = json.dumps({'layers': [{'digest': 'sha256:layer123'}]}).encode('utf-8')
+        mocker.patch('subprocess.run', side_effect=mock_run)
+        extract_spy = mocker.spy(install_dynamic_plugins.OciDownloader, 'extract_plugins')
+
+        destination = tmp_path / 'dynamic-plugins-root'
+        destination.mkdir()
+        plugins = [
+            {'package': f'oci://registry.io/plugin:v1.0!{plugin_path}', 'version': 'v1.0', 'plugin_hash': f'hash-{plugin_path}'}
+            for plugin_path in ['plugin-one', 'plugin-two']
+        ]
+
+        install_dynamic_plugins.install_plugins(plugins, {}, str(destination), jobs=2)
+
+        extract_spy.assert_called_once()
+        assert sorted(extract_spy.call_args[0][2]) == ['plugin-one', 'plugin-two']
+        for plugin_path in ['plugin-one', 'plugin-two']:
+            assert json.loads((destination / plugin_path / 'package.json').read_text()) == {'name': plugin_path}
+            assert (destination / plugin_path / 'dynamic-plugin-image.hash').read_text() == hashlib.sha256(raw_manifest).hexdigest()
+        assert not [name for name in os.listdir(destination) if name.startswith('.install-staging-')]
+
+    def test_prepare_expects_only_plugins_to_install(self, tmp_path, mocker):
+        """Test that the ALWAYS plugins whose image digest is unchanged are not extracted with the other plugins of their image."""
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        raw_manifest = json.dumps({'layers': [{'digest': 'sha256:layer123'}]}).encode('utf-8')
+        mocker.patch('subprocess.run', return_value=mocker.Mock(stdout=raw_manifest))
+
+        destination = tmp_path / 'dynamic-plugins-root'
+        (destination / 'plugin-one').mkdir(parents=True)
+        (destination / 'plugin-one' / 'dynamic-plugin-image.hash').write_text(hashlib.sha256(raw_manifest).hexdigest())
+        plugins = [
+            {'package': f'oci://registry.io/plugin:v1.0!{plugin_path}', 'version': 'v1.0', 'plugin_hash': f'hash-{plugin_path}', 'pullPolicy': 'Always'}
+            for plugin_path in ['plugin-one', 'plugin-two', 'plugin-three']
+        ]
+
+        installer = install_dynamic_plugins.OciPluginInstaller(str(destination))
+        installer.prepare(plugins, {'hash-plugin-one': 'plugin-one', 'hash-plugin-two': 'plugin-two'})
+
+        # plugin-two has no digest file, plugin-three is not installed
+        assert installer.downloader._expected_plugin_paths == {'oci://registry.io/plugin:v1.0': {'plugin-two', 'plugin-three'}}
+        installer.close()
+
+    @pytest.mark.parametrize('mode', ['w', 'w:gz'])
+    def test_extract_plugins_reuses_layer_member_index(self, tmp_path, mocker, mode):
+        """Test that a member index is stored next to the layer and used by later extractions."""
+        import io
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+
+        long_name = 'plugin-two/' + 'nested/' * 20 + 'index.js'
+        tarball_path = tmp_path / 'layer.tar'
+        with create_test_tarball(tarball_path, mode) as tar:
+            for name in ['plugin-one/package.json', long_name, 'plugin-three/package.json']:
+                content = name.encode('utf-8')
+                info = tarfile.TarInfo(name=name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+
+        downloader = install_dynamic_plugins.OciDownloader(str(tmp_path))
+        downloader.extract_plugins(str(tarball_path), ['plugin-one'], str(tmp_path / 'first'))
+
+        index = json.loads((tmp_path / 'layer.tar.index.json').read_text())
+        assert index['compressed'] == (mode == 'w:gz')
+        assert sorted(index['members']) == ['plugin-one', 'plugin-three', 'plugin-two']
+
+        read_names = []
+        original_fromtarfile = tarfile.TarInfo.fromtarfile.__func__
+
+        def recording_fromtarfile(cls, tar):
+            member = original_fromtarfile(cls, tar)
+            read_names.append(member.name)
+            return member
+
+        mocker.patch.object(tarfile.TarInfo, 'fromtarfile', classmethod(recording_fromtarfile))
+
+        downloader.extract_plugins(str(tarball_path), ['plugin-two'], str(tmp_path / 'second'))
+
+        assert (tmp_path / 'second' / long_name).read_text() == long_name
+        assert not (tmp_path / 'second' / 'plugin-one').exists()
+        # The layer is not read past the last member of the plugin
+        assert 'plugin-three/package.json' not in read_names
+
+    def test_extract_plugins_ignores_stale_member_index(self, tmp_path, mocker):
+        """Test that a member index that does not match the layer tarball is ignored and rebuilt."""
+        import io
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+
+        tarball_path = tmp_path / 'layer.tar'
+        with create_test_tarball(tarball_path, 'w') as tar:
+            content = b'{"name": "plugin-one"}'
+            info = tarfile.TarInfo(name='plugin-one/package.json')
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+        (tmp_path / 'layer.tar.index.json').write_text(json.dumps({
+            'version': 1, 'size': 1, 'compressed': False, 'members': {}
+        }))
+
+        downloader = install_dynamic_plugins.OciDownloader(str(tmp_path))
+        downloader.extract_plugins(str(tarball_path), ['plugin-one'], str(tmp_path / 'dest'))
+
+        assert (tmp_path / 'dest' / 'plugin-one' / 'package.json').exists()
+        index = json.loads((tmp_path / 'layer.tar.index.json').read_text())
+        assert index['size'] == os.path.getsize(tarball_path)
+        assert index['members']['plugin-one']
+
+    def test_incremental_update_writes_only_changed_files(self, tmp_path, mocker, monkeypatch):
+        """Test that an installed plugin is updated in place when INCREMENTAL_PLUGIN_UPDATE is enabled."""
+        import io
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        monkeypatch.setenv('INCREMENTAL_PLUGIN_UPDATE', 'true')
+
+        def create_layer(path, files):
+            with create_test_tarball(path) as tar:
+                for name, (content, mtime) in files.items():
+                    info = tarfile.TarInfo(name=f'plugin/{name}')
+                    info.size = len(content)
+                    info.mtime = mtime
+                    tar.addfile(info, io.BytesIO(content))
+
+        old_layer = tmp_path / 'old.tar.gz'
+        create_layer(old_layer, {
+            'unchanged.js': (b'same', 1000),
+            'touched.js': (b'same content', 1000),
+            'changed.js': (b'old', 1000),
+            'removed/file.js': (b'gone', 1000),
+        })
+        new_layer = tmp_path / 'new.tar.gz'
+        create_layer(new_layer, {
+            'unchanged.js': (b'same', 1000),
+            'touched.js': (b'same content', 2000),
+            'changed.js': (b'new content', 2000),
+            'added.js': (b'added', 2000),
+        })
+
+        destination = tmp_path / 'dynamic-plugins-root'
+        destination.mkdir()
+        downloader = install_dynamic_plugins.OciDownloader(str(destination))
+        downloader.extract_plugin(str(old_layer), 'plugin')
+        plugin_dir = destination / 'plugin'
+        (plugin_dir / 'dynamic-plugin-image.hash').write_text('olddigest')
+        # A file shared with the plugin file store must never be written through
+        shared = tmp_path / 'store-entry'
+        os.link(plugin_dir / 'changed.js', shared)
+        inodes = {name: (plugin_dir / name).stat().st_ino for name in ['unchanged.js', 'touched.js']}
+
+        mocker.patch.object(downloader, 'get_plugin_tar', return_value=str(new_layer))
+        assert downloader.download('oci://registry.io/plugin:v2!plugin') == 'plugin'
+
+        assert {name: (plugin_dir / name).stat().st_ino for name in inodes} == inodes
+        assert (plugin_dir / 'touched.js').stat().st_mtime == 2000
+        assert (plugin_dir / 'changed.js').read_bytes() == b'new content'
+        assert shared.read_bytes() == b'old'
+        assert (plugin_dir / 'added.js').read_bytes() == b'added'
+        assert not (plugin_dir / 'removed').exists()
+        assert (plugin_dir / 'dynamic-plugin-image.hash').read_text() == 'olddigest'
+
+    def test_incremental_update_replaces_same_size_file_from_streamed_layer(self, tmp_path, mocker, monkeypatch):
+        """Test that a file with the same size but another content and time is replaced from a gzip layer."""
+        import io
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        monkeypatch.setenv('INCREMENTAL_PLUGIN_UPDATE', 'true')
+
+        def create_layer(path, files):
+            with create_test_tarball(path, 'w:gz') as tar:
+                for name, (content, mtime) in files.items():
+                    info = tarfile.TarInfo(name=f'plugin/{name}')
+                    info.size = len(content)
+                    info.mtime = mtime
+                    tar.addfile(info, io.BytesIO(content))
+
+        old_layer = tmp_path / 'old.tar.gz'
+        create_layer(old_layer, {'index.js': (b'version 1', 1000), 'next.js': (b'next', 1000)})
+        new_layer = tmp_path / 'new.tar.gz'
+        create_layer(new_layer, {'index.js': (b'version 2', 2000), 'next.js': (b'next', 1000)})
+
+        destination = tmp_path / 'dynamic-plugins-root'
+        destination.mkdir()
+        downloader = install_dynamic_plugins.OciDownloader(str(destination))
+        downloader.extract_plugin(str(old_layer), 'plugin')
+        plugin_dir = destination / 'plugin'
+        shared = tmp_path / 'store-entry'
+        os.link(plugin_dir / 'index.js', shared)
+
+        downloader.update_plugin(str(new_layer), 'plugin')
+
+        assert (plugin_dir / 'index.js').read_bytes() == b'version 2'
+        assert (plugin_dir / 'index.js').stat().st_mtime == 2000
+        assert (plugin_dir / 'next.js').read_bytes() == b'next'
+        assert shared.read_bytes() == b'version 1'
+        assert sorted(os.listdir(plugin_dir)) == ['index.js', 'next.js']
+
+    def test_incremental_update_replaces_file_with_same_size_and_time(self, tmp_path, mocker, monkeypatch):
+        """Test that a file is replaced when only its content changed, as in images built with normalized times."""
+        import io
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        monkeypatch.setenv('INCREMENTAL_PLUGIN_UPDATE', 'true')
+
+        def create_layer(path, content):
+            with create_test_tarball(path, 'w:gz') as tar:
+                info = tarfile.TarInfo(name='plugin/dist/index.js')
+                info.size = len(content)
+                info.mtime = 0
+                tar.addfile(info, io.BytesIO(content))
+
+        old_layer = tmp_path / 'old.tar.gz'
+        create_layer(old_layer, b'console.log(1)')
+        new_layer = tmp_path / 'new.tar.gz'
+        create_layer(new_layer, b'console.log(2)')
+
+        destination = tmp_path / 'dynamic-plugins-root'
+        destination.mkdir()
+        downloader = install_dynamic_plugins.OciDownloader(str(destination))
+        downloader.extract_plugin(str(old_layer), 'plugin')
+
+        downloader.update_plugin(str(new_layer), 'plugin')
+
+        index_file = destination / 'plugin' / 'dist' / 'index.js'
+        assert index_file.read_bytes() == b'console.log(2)'
+        assert index_file.stat().st_mtime == 0
+
+
+class TestOciLayerCache:
+    """Test cases for the persistent OCI layer cache."""
+
+    @staticmethod
+    def _layer(tmp_path, name, content):
+        layer_file = tmp_path / name
+        layer_file.write_bytes(content)
+        return str(layer_file), 'sha256:' + hashlib.sha256(content).hexdigest()
+
+    def test_from_environment_disabled_by_default(self, monkeypatch):
+        """Test that no cache is used when OCI_LAYER_CACHE_DIR is not set."""
+        monkeypatch.delenv('OCI_LAYER_CACHE_DIR', raising=False)
+        assert install_dynamic_plugins.OciLayerCache.from_environment() is None
+
+    def test_from_environment(self, tmp_path, monkeypatch):
+        """Test that the cache directory and maximum size are read from the environment."""
+        monkeypatch.setenv('OCI_LAYER_CACHE_DIR', str(tmp_path / 'cache'))
+        monkeypatch.setenv('OCI_LAYER_CACHE_MAX_SIZE', '1234')
+
+        cache = install_dynamic_plugins.OciLayerCache.from_environment()
+
+        assert cache.cache_dir == str(tmp_path / 'cache')
+        assert cache.max_size == 1234
+
+    def test_from_environment_invalid_max_size(self, tmp_path, monkeypatch):
+        """Test that an invalid maximum size raises InstallException."""
+        monkeypatch.setenv('OCI_LAYER_CACHE_DIR', str(tmp_path / 'cache'))
+        monkeypatch.setenv('OCI_LAYER_CACHE_MAX_SIZE', '5GB')
+
+        with pytest.raises(InstallException, match='OCI_LAYER_CACHE_MAX_SIZE'):
+            install_dynamic_plugins.OciLayerCache.from_environment()
+
+    def test_put_and_get(self, tmp_path):
+        """Test that a stored layer is returned by its digest."""
+        cache = install_dynamic_plugins.OciLayerCache(str(tmp_path / 'cache'))
+        layer_file, digest = self._layer(tmp_path, 'layer', b'layer content')
+
+        cached_path = cache.put(digest, layer_file)
+
+        assert not os.path.exists(layer_file)
+        assert cached_path == str(tmp_path / 'cache' / 'sha256' / digest.split(':')[1])
+        assert cache.get(digest) == cached_path
+
+    def test_get_missing_layer(self, tmp_path):
+        """Test that a missing layer is not returned."""
+        cache = install_dynamic_plugins.OciLayerCache(str(tmp_path / 'cache'))
+        assert cache.get('sha256:' + 'a' * 64) is None
+
+    def test_get_corrupted_layer_is_removed(self, tmp_path, capsys):
+        """Test that a layer whose checksum does not match its digest is discarded."""
+        cache = install_dynamic_plugins.OciLayerCache(str(tmp_path / 'cache'))
+        layer_file, digest = self._layer(tmp_path, 'layer', b'layer content')
+        cached_path = cache.put(digest, layer_file)
+
+        with open(cached_path, 'wb') as f:
+            f.write(b'corrupted')
+
+        assert cache.get(digest) is None
+        assert not os.path.exists(cached_path)
+        assert 'removing corrupted cached layer' in capsys.readouterr().out
+
+    def test_unsupported_algorithm_is_not_cached(self, tmp_path):
+        """Test that layers with a digest algorithm hashlib cannot verify are left in place."""
+        cache = install_dynamic_plugins.OciLayerCache(str(tmp_path / 'cache'))
+        layer_file, _ = self._layer(tmp_path, 'layer', b'layer content')
+
+        assert cache.put('blake3:abc', layer_file) == layer_file
+        assert cache.get('blake3:abc') is None
+
+    def test_evicts_least_recently_used_layers(self, tmp_path):
+        """Test that the least recently used layers are evicted when the cache exceeds its maximum size."""
+        previous_run = install_dynamic_plugins.OciLayerCache(str(tmp_path / 'cache'), max_size=25)
+        old_file, old_digest = self._layer(tmp_path, 'old', b'o' * 10)
+        used_file, used_digest = self._layer(tmp_path, 'used', b'u' * 10)
+        old_path = previous_run.put(old_digest, old_file)
+        used_path = previous_run.put(used_digest, used_file)
+        previous_run.close()
+        cache = install_dynamic_plugins.OciLayerCache(str(tmp_path / 'cache'), max_size=25)
+
+        # Make the first layer the least recently used one, then use the second one
+        os.utime(old_path, (1, 1))
+        os.utime(used_path, (2, 2))
+        assert cache.get(used_digest) == used_path
+
+        new_file, new_digest = self._layer(tmp_path, 'new', b'n' * 10)
+        new_path = cache.put(new_digest, new_file)
+
+        assert not os.path.exists(old_path)
+        assert os.path.exists(used_path)
+        assert os.path.exists(new_path)
+
+    def test_eviction_skips_layers_in_use(self, tmp_path):
+        """Test that the layers used by this run or by another run sharing the cache are never evicted."""
+        other_run = install_dynamic_plugins.OciLayerCache(str(tmp_path / 'cache'), max_size=15)
+        shared_file, shared_digest = self._layer(tmp_path, 'shared', b's' * 10)
+        shared_path = other_run.put(shared_digest, shared_file)
+        os.utime(shared_path, (1, 1))
+
+        cache = install_dynamic_plugins.OciLayerCache(str(tmp_path / 'cache'), max_size=15)
+        first_file, first_digest = self._layer(tmp_path, 'first', b'f' * 10)
+        first_path = cache.put(first_digest, first_file)
+        os.utime(first_path, (2, 2))
+        second_file, second_digest = self._layer(tmp_path, 'second', b'n' * 10)
+        second_path = cache.put(second_digest, second_file)
+
+        # Both images of the run and the layer of the other run stay, although they exceed the maximum size
+        assert all(os.path.exists(path) for path in (shared_path, first_path, second_path))
+        assert cache.get(first_digest) == first_path
+
+        other_run.close()
+        cache.close()
+        install_dynamic_plugins.OciLayerCache(str(tmp_path / 'cache'), max_size=15).evict()
+        assert not os.path.exists(shared_path)
+        assert not os.path.exists(first_path)
+        assert os.path.exists(second_path)
+
+    def test_eviction_counts_only_layers_with_their_member_index(self, tmp_path):
+        """Test that temporary files do not count as layers, stale ones are removed, and member indexes count with their layer."""
+        cache_dir = tmp_path / 'cache'
+        previous_run = install_dynamic_plugins.OciLayerCache(str(cache_dir), max_size=100)
+        old_file, old_digest = self._layer(tmp_path, 'old', b'o' * 10)
+        new_file, new_digest = self._layer(tmp_path, 'new', b'n' * 10)
+        old_path = previous_run.put(old_digest, old_file)
+        new_path = previous_run.put(new_digest, new_file)
+        previous_run.close()
+        os.utime(old_path, (1, 1))
+        os.utime(new_path, (2, 2))
+        algorithm_dir = cache_dir / 'sha256'
+        (algorithm_dir / 'stale.1.2.tmp').write_bytes(b't' * 100)
+        os.utime(algorithm_dir / 'stale.1.2.tmp', (1, 1))
+        (algorithm_dir / 'partial.3.4.tmp').write_bytes(b't' * 100)
+        (algorithm_dir / ('0' * 64 + '.index.json')).write_text('{}')
+
+        # Two layers of 10 bytes fit, whatever the size of the temporary files
+        install_dynamic_plugins.OciLayerCache(str(cache_dir), max_size=20).evict()
+        assert os.path.exists(old_path) and os.path.exists(new_path)
+        assert sorted(os.listdir(algorithm_dir)) == sorted([os.path.basename(old_path), os.path.basename(new_path), 'partial.3.4.tmp'])
+
+        # The member index of the newest layer counts with it: 10 + 15 bytes fit, not 10 more for the oldest layer
+        (algorithm_dir / (os.path.basename(new_path) + '.index.json')).write_text('{"members": {}}')
+        install_dynamic_plugins.OciLayerCache(str(cache_dir), max_size=30).evict()
+        assert not os.path.exists(old_path)
+        assert os.path.exists(new_path)
+
+    def test_get_plugin_tar_skips_copy_when_layer_cached(self, tmp_path, mocker, monkeypatch):
+        """Test that skopeo copy is skipped when the image layer is already cached."""
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        monkeypatch.setenv('OCI_LAYER_CACHE_DIR', str(tmp_path / 'cache'))
+
+        layer_file, digest = self._layer(tmp_path, 'layer', b'layer content')
+        install_dynamic_plugins.OciLayerCache(str(tmp_path / 'cache')).put(digest, layer_file)
+
+        mock_run = mocker.patch('subprocess.run')
+        mock_run.return_value.stdout = json.dumps({'layers': [{'digest': digest}]}).encode('utf-8')
+
+        downloader = install_dynamic_plugins.OciDownloader(str(tmp_path))
+        tar_file = downloader.get_plugin_tar('oci://registry.io/plugin:v1.0')
+
+        assert tar_file == str(tmp_path / 'cache' / 'sha256' / digest.split(':')[1])
+        commands = [call[0][0] for call in mock_run.call_args_list]
+        assert all('copy' not in command for command in commands)
+
+    def test_get_plugin_tar_caches_copied_layer(self, tmp_path, mocker, monkeypatch):
+        """Test that a copied layer is stored in the cache for later runs."""
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        monkeypatch.setenv('OCI_LAYER_CACHE_DIR', str(tmp_path / 'cache'))
+
+        content = b'layer content'
+        digest = 'sha256:' + hashlib.sha256(content).hexdigest()
+
+        def mock_run(cmd, **kwargs):
+            result = mocker.MagicMock()
+            if 'copy' in cmd:
+                dest_dir = [arg for arg in cmd if arg.startswith('dir:')][0][len('dir:'):]
+                os.makedirs(dest_dir, exist_ok=True)
+                with open(os.path.join(dest_dir, 'manifest.json'), 'w') as f:
+                    json.dump({'layers': [{'digest': digest}]}, f)
+                with open(os.path.join(dest_dir, digest.split(':')[1]), 'wb') as f:
+                    f.write(content)
+            else:
+                result.stdout = json.dumps({'layers': [{'digest': digest}]}).encode('utf-8')
+            return result
+
+        mocker.patch('subprocess.run', side_effect=mock_run)
+
+        downloader = install_dynamic_plugins.OciDownloader(str(tmp_path))
+        tar_file = downloader.get_plugin_tar('oci://registry.io/plugin:v1.0')
+
+        assert tar_file == str(tmp_path / 'cache' / 'sha256' / digest.split(':')[1])
+        with open(tar_file, 'rb') as f:
+            assert f.read() == content
+
 
 class TestOciPluginInstallerInstall:
     """Test cases for OciPluginInstaller.install() method."""
@@ -2014,6 +3001,710 @@ class TestOciPluginInstallerInstall:
         assert 'Network error' in str(exc_info.value)
 
 
+class TestInstallPlugins:
+    """Test cases for install_plugins() and get_install_jobs()."""
+
+    def test_serial_install_preserves_order(self, tmp_path, mocker):
+        """Test that plugin configurations are returned in declaration order with a single job."""
+        plugins = [{'package': f'plugin-{i}', 'pluginConfig': {'key': i}} for i in range(3)]
+        mock_install = mocker.patch.object(
+            install_dynamic_plugins, 'install_plugin',
+            side_effect=lambda plugin, *args: (None, plugin['pluginConfig'])
+        )
+
+        configs = install_dynamic_plugins.install_plugins(plugins, {}, str(tmp_path), jobs=1)
+
+        assert configs == [{'key': 0}, {'key': 1}, {'key': 2}]
+        assert mock_install.call_count == 3
+
+    def test_parallel_install_preserves_order(self, tmp_path, mocker):
+        """Test that configurations keep declaration order even when installations finish out of order."""
+        import time
+
+        plugins = [{'package': f'plugin-{i}', 'pluginConfig': {'key': i}} for i in range(4)]
+
+        def slow_first(plugin, *args):
+            # The first plugins finish last
+            time.sleep(0.05 * (4 - plugin['pluginConfig']['key']))
+            return None, plugin['pluginConfig']
+
+        mocker.patch.object(install_dynamic_plugins, 'install_plugin', side_effect=slow_first)
+
+        configs = install_dynamic_plugins.install_plugins(plugins, {}, str(tmp_path), jobs=4)
+
+        assert configs == [{'key': 0}, {'key': 1}, {'key': 2}, {'key': 3}]
+
+    def test_parallel_install_is_bounded(self, tmp_path, mocker):
+        """Test that no more than `jobs` plugins are installed at the same time."""
+        import threading
+        import time
+
+        lock = threading.Lock()
+        state = {'running': 0, 'max_running': 0}
+
+        def track(plugin, *args):
+            with lock:
+                state['running'] += 1
+                state['max_running'] = max(state['max_running'], state['running'])
+            time.sleep(0.02)
+            with lock:
+                state['running'] -= 1
+            return None, {}
+
+        mocker.patch.object(install_dynamic_plugins, 'install_plugin', side_effect=track)
+
+        plugins = [{'package': f'plugin-{i}'} for i in range(8)]
+        install_dynamic_plugins.install_plugins(plugins, {}, str(tmp_path), jobs=2)
+
+        assert state['max_running'] <= 2
+
+    def test_parallel_install_raises_first_failure_in_declaration_order(self, tmp_path, mocker):
+        """Test that the failure of the first failing plugin in declaration order is raised."""
+        import time
+
+        def fail(plugin, *args):
+            if plugin['package'] == 'plugin-1':
+                time.sleep(0.05)
+                raise InstallException('plugin-1 failed')
+            if plugin['package'] == 'plugin-2':
+                raise InstallException('plugin-2 failed')
+            return None, {}
+
+        mocker.patch.object(install_dynamic_plugins, 'install_plugin', side_effect=fail)
+
+        plugins = [{'package': f'plugin-{i}'} for i in range(3)]
+        with pytest.raises(InstallException, match='plugin-1 failed'):
+            install_dynamic_plugins.install_plugins(plugins, {}, str(tmp_path), jobs=3)
+
+    def test_get_install_jobs_default(self, monkeypatch):
+        """Test that a single job is used by default."""
+        monkeypatch.delenv('INSTALL_JOBS', raising=False)
+        assert install_dynamic_plugins.get_install_jobs() == install_dynamic_plugins.DEFAULT_INSTALL_JOBS
+
+    def test_get_install_jobs_from_environment(self, monkeypatch):
+        """Test that INSTALL_JOBS is used when --jobs is not given."""
+        monkeypatch.setenv('INSTALL_JOBS', '6')
+        assert install_dynamic_plugins.get_install_jobs() == 6
+
+    def test_get_install_jobs_argument_overrides_environment(self, monkeypatch):
+        """Test that --jobs takes precedence over INSTALL_JOBS."""
+        monkeypatch.setenv('INSTALL_JOBS', '6')
+        assert install_dynamic_plugins.get_install_jobs(3) == 3
+
+    @pytest.mark.parametrize("value", ['zero', '0', '-2'])
+    def test_get_install_jobs_invalid_environment(self, monkeypatch, value):
+        """Test that invalid INSTALL_JOBS values raise InstallException."""
+        monkeypatch.setenv('INSTALL_JOBS', value)
+        with pytest.raises(InstallException):
+            install_dynamic_plugins.get_install_jobs()
+
+    def test_parse_args_jobs(self):
+        """Test that the --jobs argument is parsed along with the dynamic plugins root."""
+        args = install_dynamic_plugins.parse_args(['/dynamic-plugins-root', '--jobs', '4'])
+        assert args.dynamic_plugins_root == '/dynamic-plugins-root'
+        assert args.jobs == 4
+
+
+class TestPluginInstallerRegistry:
+    """Test cases for PluginInstallerRegistry and the sharing of installers across a run."""
+
+    def test_same_installer_for_all_oci_packages(self, tmp_path, mocker):
+        """Test that all OCI packages share a single installer and downloader."""
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        registry = install_dynamic_plugins.PluginInstallerRegistry(str(tmp_path))
+
+        first = registry.get('oci://registry.io/plugin:v1.0!plugin-one')
+        second = registry.get('oci://registry.io/other:v2.0!plugin-two')
+
+        assert isinstance(first, install_dynamic_plugins.OciPluginInstaller)
+        assert first is second
+        assert first.downloader is second.downloader
+
+    def test_npm_and_oci_installers_are_distinct(self, tmp_path, mocker):
+        """Test that NPM and OCI packages get installers of their own kind."""
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        registry = install_dynamic_plugins.PluginInstallerRegistry(str(tmp_path), skip_integrity_check=True)
+
+        npm_installer = registry.get('@scope/plugin@1.0.0')
+        local_installer = registry.get('./local-plugin')
+        oci_installer = registry.get('oci://registry.io/plugin:v1.0!plugin')
+
+        assert isinstance(npm_installer, install_dynamic_plugins.NpmPluginInstaller)
+        assert npm_installer is local_installer
+        assert npm_installer.skip_integrity_check is True
+        assert oci_installer is not npm_installer
+
+    def test_install_plugin_uses_registry(self, tmp_path, mocker):
+        """Test that install_plugin() uses the installer from the registry when provided."""
+        plugin = {'package': '@scope/plugin@1.0.0', 'plugin_hash': 'abc', 'pluginConfig': {'key': 'value'}}
+        plugin_path_by_hash = {'abc': 'scope-plugin-1.0.0'}
+
+        registry = install_dynamic_plugins.PluginInstallerRegistry(str(tmp_path))
+        mock_create = mocker.patch.object(install_dynamic_plugins, 'create_plugin_installer', wraps=install_dynamic_plugins.create_plugin_installer)
+
+        for _ in range(2):
+            plugin_path_by_hash['abc'] = 'scope-plugin-1.0.0'
+            _, config = install_dynamic_plugins.install_plugin(plugin, plugin_path_by_hash, str(tmp_path), installers=registry)
+            assert config == {'key': 'value'}
+
+        mock_create.assert_called_once()
+
+    def test_image_copied_once_for_multiple_plugins(self, tmp_path, mocker):
+        """Test that an image bundling several plugins is copied only once per run."""
+        import io
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+
+        # Build a layer with two plugins
+        layer = tmp_path / 'layer.tar.gz'
+        with create_test_tarball(layer) as tar:
+            for name in ['plugin-one', 'plugin-two']:
+                content = b'{"name": "' + name.encode() + b'"}'
+                info = tarfile.TarInfo(name=f'{name}/package.json')
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+
+        copies = []
+
+        def mock_run(cmd, **kwargs):
+            result = mocker.MagicMock()
+            result.returncode = 0
+            if 'copy' in cmd:
+                copies.append(cmd)
+                dest_dir = [arg for arg in cmd if arg.startswith('dir:')][0][len('dir:'):]
+                os.makedirs(dest_dir, exist_ok=True)
+                with open(os.path.join(dest_dir, 'manifest.json'), 'w') as f:
+                    json.dump({'layers': [{'digest': 'sha256:layer123'}]}, f)
+                import shutil as sh
+                sh.copy(str(layer), os.path.join(dest_dir, 'layer123'))
+            else:
+                result.stdout = json.dumps({'layers': [{'digest': 'sha256:layer123'}]}).encode('utf-8')
+            return result
+
+        mocker.patch('subprocess.run', side_effect=mock_run)
+
+        destination = tmp_path / 'dynamic-plugins-root'
+        destination.mkdir()
+        plugins = [
+            {'package': f'oci://registry.io/plugin:v1.0!{name}', 'version': 'v1.0', 'plugin_hash': name}
+            for name in ['plugin-one', 'plugin-two']
+        ]
+
+        install_dynamic_plugins.install_plugins(plugins, {}, str(destination), jobs=2)
+
+        assert len(copies) == 1
+        assert (destination / 'plugin-one' / 'package.json').exists()
+        assert (destination / 'plugin-two' / 'package.json').exists()
+
+
+class TestPluginFileStore:
+    """Test cases for the content-addressed plugin file store."""
+
+    @staticmethod
+    def write_plugin(directory, files):
+        for name, content in files.items():
+            path = directory / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+
+    def test_identical_files_are_stored_once(self, tmp_path):
+        """Test that identical files of several plugins are hard links to a single store entry."""
+        store = install_dynamic_plugins.PluginFileStore(str(tmp_path / '.plugin-store'))
+        self.write_plugin(tmp_path / 'plugin-one', {'package.json': 'one', 'node_modules/dep/index.js': 'shared'})
+        self.write_plugin(tmp_path / 'plugin-two', {'package.json': 'two', 'node_modules/dep/index.js': 'shared'})
+
+        store.link_tree(str(tmp_path / 'plugin-one'))
+        store.link_tree(str(tmp_path / 'plugin-two'))
+
+        shared_one = tmp_path / 'plugin-one' / 'node_modules' / 'dep' / 'index.js'
+        shared_two = tmp_path / 'plugin-two' / 'node_modules' / 'dep' / 'index.js'
+        assert os.path.samefile(shared_one, shared_two)
+        assert shared_one.stat().st_nlink == 3
+        assert (tmp_path / 'plugin-two' / 'package.json').read_text() == 'two'
+        assert len([f for f in (tmp_path / '.plugin-store').rglob('*') if f.is_file()]) == 3
+
+    def test_files_with_different_modes_are_not_shared(self, tmp_path):
+        """Test that the store keeps one entry per content and permissions."""
+        store = install_dynamic_plugins.PluginFileStore(str(tmp_path / '.plugin-store'))
+        self.write_plugin(tmp_path / 'plugin-one', {'bin/run': 'script'})
+        self.write_plugin(tmp_path / 'plugin-two', {'bin/run': 'script'})
+        os.chmod(tmp_path / 'plugin-two' / 'bin' / 'run', 0o755)
+
+        store.link_tree(str(tmp_path / 'plugin-one'))
+        store.link_tree(str(tmp_path / 'plugin-two'))
+
+        assert not os.path.samefile(tmp_path / 'plugin-one' / 'bin' / 'run', tmp_path / 'plugin-two' / 'bin' / 'run')
+        assert (tmp_path / 'plugin-two' / 'bin' / 'run').stat().st_mode & 0o777 == 0o755
+
+    def test_state_files_are_not_shared(self, tmp_path):
+        """Test that the hash files of the plugins are never linked to the store."""
+        store = install_dynamic_plugins.PluginFileStore(str(tmp_path / '.plugin-store'))
+        self.write_plugin(tmp_path / 'plugin-one', {'dynamic-plugin-image.hash': 'digest'})
+        self.write_plugin(tmp_path / 'plugin-two', {'dynamic-plugin-image.hash': 'digest'})
+
+        store.link_tree(str(tmp_path / 'plugin-one'))
+        store.link_tree(str(tmp_path / 'plugin-two'))
+
+        assert (tmp_path / 'plugin-one' / 'dynamic-plugin-image.hash').stat().st_nlink == 1
+        assert not (tmp_path / '.plugin-store').exists()
+
+    def test_prune_removes_unreferenced_entries(self, tmp_path):
+        """Test that the entries no longer linked from any plugin are pruned."""
+        import shutil
+
+        store = install_dynamic_plugins.PluginFileStore(str(tmp_path / '.plugin-store'))
+        self.write_plugin(tmp_path / 'plugin-one', {'index.js': 'one'})
+        self.write_plugin(tmp_path / 'plugin-two', {'index.js': 'two'})
+        store.link_tree(str(tmp_path / 'plugin-one'))
+        store.link_tree(str(tmp_path / 'plugin-two'))
+
+        shutil.rmtree(tmp_path / 'plugin-one')
+        store.prune()
+
+        remaining = [f for f in (tmp_path / '.plugin-store').rglob('*') if f.is_file()]
+        assert len(remaining) == 1
+        assert os.path.samefile(remaining[0], tmp_path / 'plugin-two' / 'index.js')
+
+    def test_install_plugins_links_files_to_store(self, tmp_path, mocker, monkeypatch):
+        """Test that installed plugins are linked to the store when PLUGIN_FILE_STORE is enabled."""
+        monkeypatch.setenv('PLUGIN_FILE_STORE', 'true')
+
+        def install(plugin, plugin_path_by_hash):
+            self.write_plugin(tmp_path / plugin['package'], {'index.js': 'shared'})
+            return plugin['package']
+
+        installer = mocker.MagicMock()
+        installer.should_skip_installation.return_value = (False, 'not_installed')
+        installer.install.side_effect = install
+        mocker.patch.object(install_dynamic_plugins, 'create_plugin_installer', return_value=installer)
+
+        plugins = [{'package': name, 'plugin_hash': f'hash-{name}'} for name in ['plugin-one', 'plugin-two']]
+        install_dynamic_plugins.install_plugins(plugins, {}, str(tmp_path))
+
+        assert os.path.samefile(tmp_path / 'plugin-one' / 'index.js', tmp_path / 'plugin-two' / 'index.js')
+        assert (tmp_path / 'plugin-one' / 'dynamic-plugin-config.hash').read_text() == 'hash-plugin-one'
+
+
+class TestStagedInstallation:
+    """Test cases for installing plugins in a staging directory before moving them into place."""
+
+    def test_commit_writes_hash_before_swap(self, tmp_path, mocker):
+        """Test that the staged plugin holds its installation hash when it is renamed into place."""
+        installer = install_dynamic_plugins.NpmPluginInstaller(str(tmp_path))
+        (tmp_path / 'plugin').mkdir()
+        (tmp_path / 'plugin' / 'old.js').write_text('old')
+        staging_dir = installer.create_staging_directory()
+        staged = os.path.join(staging_dir, 'plugin')
+        os.mkdir(staged)
+        with open(os.path.join(staged, 'index.js'), 'w') as f:
+            f.write('new')
+
+        renames = []
+        original_rename = os.rename
+
+        def recording_rename(source, target):
+            renames.append((source, target, os.path.isfile(os.path.join(staged, 'dynamic-plugin-config.hash'))))
+            original_rename(source, target)
+
+        mocker.patch('os.rename', side_effect=recording_rename)
+        installer.commit_staged_plugin({'plugin_hash': 'hash123'}, staged, 'plugin')
+
+        swap = [rename for rename in renames if rename[0] == staged]
+        assert swap == [(staged, str(tmp_path / 'plugin'), True)]
+        assert (tmp_path / 'plugin' / 'index.js').read_text() == 'new'
+        assert not (tmp_path / 'plugin' / 'old.js').exists()
+        assert (tmp_path / 'plugin' / 'dynamic-plugin-config.hash').read_text() == 'hash123'
+        assert [name for name in os.listdir(tmp_path) if name.startswith('.install-staging-')] == [os.path.basename(staging_dir)]
+
+    def test_failed_npm_extraction_keeps_previous_plugin(self, tmp_path, mocker):
+        """Test that a failure during extraction leaves the previous plugin untouched and no staging directory."""
+        (tmp_path / 'test-package-1.0.0').mkdir()
+        (tmp_path / 'test-package-1.0.0' / 'index.js').write_text('previous')
+        (tmp_path / 'test-package-1.0.0' / 'dynamic-plugin-config.hash').write_text('oldhash')
+        mock_result = mocker.MagicMock(stdout='test-package-1.0.0.tgz')
+        mocker.patch('subprocess.run', return_value=mock_result)
+        mocker.patch('tarfile.open', side_effect=tarfile.ReadError('truncated archive'))
+
+        installer = install_dynamic_plugins.NpmPluginInstaller(str(tmp_path), skip_integrity_check=True)
+        with pytest.raises(tarfile.ReadError):
+            installer.install({'package': 'test-package@1.0.0', 'plugin_hash': 'newhash'}, {})
+
+        assert (tmp_path / 'test-package-1.0.0' / 'index.js').read_text() == 'previous'
+        assert (tmp_path / 'test-package-1.0.0' / 'dynamic-plugin-config.hash').read_text() == 'oldhash'
+        assert not [name for name in os.listdir(tmp_path) if name.startswith('.install-staging-')]
+
+    def test_failed_oci_extraction_keeps_previous_plugin(self, tmp_path, mocker):
+        """Test that an OCI plugin is only replaced once fully extracted."""
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        (tmp_path / 'plugin').mkdir()
+        (tmp_path / 'plugin' / 'index.js').write_text('previous')
+
+        installer = install_dynamic_plugins.OciPluginInstaller(str(tmp_path))
+        mocker.patch.object(installer.downloader, 'get_plugin_tar', return_value=str(tmp_path / 'layer.tar.gz'))
+        mocker.patch.object(installer.downloader, 'extract_plugins', side_effect=InstallException('Zip bomb detected in plugin/huge.bin'))
+
+        with pytest.raises(InstallException):
+            installer.install({'package': 'oci://registry.io/plugin:v1.0!plugin', 'version': 'v1.0', 'plugin_hash': 'newhash'}, {})
+
+        assert (tmp_path / 'plugin' / 'index.js').read_text() == 'previous'
+        assert not [name for name in os.listdir(tmp_path) if name.startswith('.install-staging-')]
+
+
+class TestRunJournal:
+    """Test cases for the journal used to resume interrupted installation runs."""
+
+    def test_journal_resumed_with_same_fingerprint(self, tmp_path):
+        """Test that a journal is resumed only by a run with the same fingerprint."""
+        path = str(tmp_path / '.install-journal.jsonl')
+        journal = install_dynamic_plugins.RunJournal()
+        journal.open(path, 'fingerprint1')
+        journal.record('manifests', 'oci://registry.io/plugin:v1', {'Digest': 'sha256:abc'})
+        journal.record('completed', 'hash1', True)
+
+        resumed = install_dynamic_plugins.RunJournal()
+        resumed.open(path, 'fingerprint1')
+        assert resumed.get('manifests', 'oci://registry.io/plugin:v1') == {'Digest': 'sha256:abc'}
+        assert resumed.is_completed('hash1')
+
+        discarded = install_dynamic_plugins.RunJournal()
+        discarded.open(path, 'fingerprint2')
+        assert discarded.get('manifests', 'oci://registry.io/plugin:v1') is None
+        assert not discarded.is_completed('hash1')
+
+        discarded.remove()
+        assert not os.path.exists(path)
+
+    def test_loaded_journal_is_written_only_once_opened(self, tmp_path):
+        """Test that the lookups made before the journal is opened are kept, and only written once it is opened."""
+        path = str(tmp_path / '.install-journal.jsonl')
+        journal = install_dynamic_plugins.RunJournal()
+        journal.load(path, 'fingerprint')
+        journal.record('manifests', 'oci://registry.io/plugin:v1', {'Digest': 'sha256:abc'})
+        assert not os.path.exists(path)
+
+        journal.open(path, 'fingerprint')
+        lines = [json.loads(line) for line in open(path)]
+        assert lines == [
+            {'fingerprint': 'fingerprint'},
+            {'section': 'manifests', 'key': 'oci://registry.io/plugin:v1', 'value': {'Digest': 'sha256:abc'}},
+        ]
+
+    def test_records_are_appended_and_last_one_wins(self, tmp_path):
+        """Test that each record appends a line, and that a line cut short by an interruption is ignored."""
+        path = tmp_path / '.install-journal.jsonl'
+        journal = install_dynamic_plugins.RunJournal()
+        journal.open(str(path), 'fingerprint')
+        journal.record('image_resolutions', 'registry.io/plugin:v1', {'resolved': 'a'})
+        journal.record('image_resolutions', 'registry.io/plugin:v1', {'resolved': 'b'})
+        journal.clear()
+        assert len(path.read_text().splitlines()) == 3
+        with open(path, 'a') as f:
+            f.write('{"section": "completed", "key": "hash1", "val')
+
+        resumed = install_dynamic_plugins.RunJournal()
+        resumed.load(str(path), 'fingerprint')
+        assert resumed.resumed
+        assert resumed.get('image_resolutions', 'registry.io/plugin:v1') == {'resolved': 'b'}
+        assert not resumed.is_completed('hash1')
+
+    def test_files_fingerprint_tracks_contents(self, tmp_path):
+        """Test that the fingerprint changes with the content of any configuration file."""
+        config = tmp_path / 'dynamic-plugins.yaml'
+        include = tmp_path / 'include.yaml'
+        config.write_text('plugins: []')
+        include.write_text('plugins: []')
+        fingerprint = install_dynamic_plugins.files_fingerprint([str(config), str(include)])
+
+        assert install_dynamic_plugins.files_fingerprint([str(config), str(include)]) == fingerprint
+        include.write_text('plugins: [{package: foo}]')
+        assert install_dynamic_plugins.files_fingerprint([str(config), str(include)]) != fingerprint
+        assert install_dynamic_plugins.files_fingerprint([str(config)]) != fingerprint
+
+    def test_journaled_lookups_are_not_repeated(self, tmp_path, mocker):
+        """Test that a resumed run reuses the journaled path auto-detection and image inspection."""
+        install_dynamic_plugins.run_journal.open(str(tmp_path / '.install-journal.jsonl'), 'fingerprint')
+        install_dynamic_plugins.run_journal.record('oci_plugin_paths', 'oci://registry.io/plugin:v1', ['plugin-one'])
+        install_dynamic_plugins.run_journal.record('manifests', 'oci://registry.io/plugin:v1', {'Digest': 'sha256:abc'})
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        mock_run = mocker.patch('subprocess.run')
+
+        assert install_dynamic_plugins.get_oci_plugin_paths('oci://registry.io/plugin:v1') == ['plugin-one']
+        downloader = install_dynamic_plugins.OciDownloader(str(tmp_path))
+        assert downloader.digest('oci://registry.io/plugin:v1!plugin-one') == 'abc'
+        mock_run.assert_not_called()
+
+    def test_plugin_completed_before_interruption_is_skipped(self, tmp_path, mocker):
+        """Test that a plugin installed by the interrupted run is not installed again, even with the Always pull policy."""
+        install_dynamic_plugins.run_journal.open(str(tmp_path / '.install-journal.jsonl'), 'fingerprint')
+        install_dynamic_plugins.run_journal.record('completed', 'hash1', True)
+        installer = mocker.MagicMock()
+        installer.should_skip_installation.return_value = (False, 'force_download')
+        plugin = {'package': 'test-package@1.0.0', 'pullPolicy': 'Always', 'plugin_hash': 'hash1', 'pluginConfig': {'a': 1}}
+        plugin_path_by_hash = {'hash1': 'test-package-1.0.0'}
+
+        registry = install_dynamic_plugins.PluginInstallerRegistry(str(tmp_path))
+        mocker.patch.object(registry, 'get', return_value=installer)
+        result = install_dynamic_plugins.install_plugin(plugin, plugin_path_by_hash, str(tmp_path), installers=registry)
+
+        assert result == (None, {'a': 1})
+        installer.install.assert_not_called()
+        assert plugin_path_by_hash == {}
+
+    def test_completed_installation_is_journaled(self, tmp_path, mocker):
+        """Test that each completed installation is recorded in the journal file."""
+        journal_path = tmp_path / '.install-journal.jsonl'
+        install_dynamic_plugins.run_journal.open(str(journal_path), 'fingerprint')
+        installer = mocker.MagicMock()
+        installer.should_skip_installation.return_value = (False, 'not_installed')
+        installer.install.return_value = 'test-package-1.0.0'
+        (tmp_path / 'test-package-1.0.0').mkdir()
+        mocker.patch.object(install_dynamic_plugins, 'create_plugin_installer', return_value=installer)
+
+        install_dynamic_plugins.install_plugin({'package': 'test-package@1.0.0', 'plugin_hash': 'hash1'}, {}, str(tmp_path))
+
+        assert json.loads(journal_path.read_text().splitlines()[-1]) == {'section': 'completed', 'key': 'hash1', 'value': True}
+
+
+class TestPrefetchOciPluginPaths:
+    """Test cases for the concurrent auto-detection of OCI plugin paths before the merge."""
+
+    @staticmethod
+    def _mock_skopeo(mocker, failing=()):
+        import subprocess
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        inspected = []
+
+        def mock_run(cmd, **kwargs):
+            inspected.append(cmd[-1])
+            if cmd[-1] in failing:
+                raise subprocess.CalledProcessError(1, cmd, stderr='manifest unknown')
+            plugin_path = cmd[-1].split('/')[-1].split(':')[0].split('@')[0]
+            annotation = base64.b64encode(json.dumps([{plugin_path: {}}]).encode('utf-8')).decode('utf-8')
+            return mocker.MagicMock(stdout=json.dumps({'annotations': {'io.backstage.dynamic-packages': annotation}}).encode('utf-8'))
+
+        mocker.patch('subprocess.run', side_effect=mock_run)
+        return inspected
+
+    def test_prefetch_warms_the_merge(self, mocker):
+        """Test that each path-less image is inspected once, before the merge, which then makes no skopeo call."""
+        inspected = self._mock_skopeo(mocker)
+        include_plugins = [{'package': 'oci://registry.io/plugin-a:v1'}, {'package': 'oci://registry.io/plugin-b:v1!plugin-b'}]
+        main_plugins = [
+            {'package': 'oci://registry.io/plugin-a:v1', 'disabled': False},
+            {'package': 'oci://registry.io/plugin-c@sha256:' + 'c' * 64},
+            {'package': 'oci://registry.io/plugin-d:{{inherit}}'},
+            {'package': '@scope/npm-plugin@1.0.0'},
+        ]
+
+        install_dynamic_plugins.prefetch_oci_plugin_paths([include_plugins, main_plugins], jobs=4)
+
+        assert sorted(inspected) == ['docker://registry.io/plugin-a:v1', 'docker://registry.io/plugin-c@sha256:' + 'c' * 64]
+
+        inspected.clear()
+        all_plugins = {}
+        for plugin in include_plugins:
+            install_dynamic_plugins.merge_plugin(plugin, all_plugins, 'includes.yaml', level=0)
+        install_dynamic_plugins.merge_plugin(main_plugins[1], all_plugins, 'dynamic-plugins.yaml', level=1)
+
+        assert inspected == []
+        assert 'oci://registry.io/plugin-c:!plugin-c' in all_plugins
+
+    def test_prefetch_errors_are_reported_by_the_merge(self, mocker):
+        """Test that a failed prefetch is not fatal, and that the merge reports the error of the image."""
+        inspected = self._mock_skopeo(mocker, failing=('docker://registry.io/plugin-a:v1',))
+        plugins = [{'package': 'oci://registry.io/plugin-a:v1'}, {'package': 'oci://registry.io/plugin-b:v1'}]
+
+        install_dynamic_plugins.prefetch_oci_plugin_paths([plugins], jobs=2)
+
+        with pytest.raises(InstallException, match='Failed to inspect OCI image oci://registry.io/plugin-a:v1'):
+            install_dynamic_plugins.merge_plugin(plugins[0], {}, 'dynamic-plugins.yaml', level=0)
+        assert inspected.count('docker://registry.io/plugin-a:v1') == 2
+        assert inspected.count('docker://registry.io/plugin-b:v1') == 1
+
+    def test_no_prefetch_with_a_single_job(self, mocker):
+        """Test that the manifests are only fetched by the merge when the installation is not parallel."""
+        inspected = self._mock_skopeo(mocker)
+
+        install_dynamic_plugins.prefetch_oci_plugin_paths([[{'package': 'oci://registry.io/plugin-a:v1'}, {'package': 'oci://registry.io/plugin-b:v1'}]], jobs=1)
+
+        assert inspected == []
+
+
+class TestInstallLock:
+    """Test cases for the kernel file lock serializing the installations."""
+
+    def test_acquire_records_holder_and_release_removes_file(self, tmp_path):
+        """Test that the lock file records its holder while held, and is removed on release."""
+        lock_path = tmp_path / 'install-dynamic-plugins.lock'
+        lock = install_dynamic_plugins.InstallLock(str(lock_path))
+
+        lock.acquire()
+        metadata = json.loads(lock_path.read_text())
+        assert metadata['pid'] == os.getpid()
+        assert f"PID {os.getpid()}" in lock.holder()
+
+        lock.release()
+        assert not lock_path.exists()
+
+    def test_stale_lock_file_does_not_block(self, tmp_path):
+        """Test that a lock file left behind by a killed installation is locked right away."""
+        lock_path = tmp_path / 'install-dynamic-plugins.lock'
+        lock_path.write_text('{"pid": 1, "host": "dead-pod", "since": "yesterday"}')
+        lock = install_dynamic_plugins.InstallLock(str(lock_path), timeout=0)
+
+        lock.acquire()
+        lock.release()
+
+    def test_timeout_reports_holder(self, tmp_path):
+        """Test that waiting for a held lock times out with the holder of the lock."""
+        lock_path = str(tmp_path / 'install-dynamic-plugins.lock')
+        holder = install_dynamic_plugins.InstallLock(lock_path)
+        holder.acquire()
+        try:
+            with pytest.raises(InstallException, match=f'held by PID {os.getpid()}'):
+                install_dynamic_plugins.InstallLock(lock_path, timeout=0.2).acquire()
+        finally:
+            holder.release()
+
+    def test_waiter_gets_lock_when_holder_releases(self, tmp_path):
+        """Test that a waiter wakes up on release, and locks a new lock file rather than the removed one."""
+        import threading
+        import time
+
+        lock_path = tmp_path / 'install-dynamic-plugins.lock'
+        holder = install_dynamic_plugins.InstallLock(str(lock_path))
+        holder.acquire()
+        waiter = install_dynamic_plugins.InstallLock(str(lock_path))
+        thread = threading.Thread(target=waiter.acquire, daemon=True)
+        thread.start()
+        time.sleep(0.1)
+        assert thread.is_alive()
+
+        holder.release()
+        thread.join(timeout=5)
+
+        assert not thread.is_alive()
+        assert lock_path.exists()
+        assert os.fstat(waiter._fd).st_ino == os.stat(lock_path).st_ino
+        waiter.release()
+
+    def test_shared_holders_coexist_and_exclude_writers(self, tmp_path):
+        """Test that several shared holders hold the lock together, and that the exclusive lock waits for them."""
+        lock_path = str(tmp_path / 'install-dynamic-plugins.lock')
+        first = install_dynamic_plugins.InstallLock(lock_path, timeout=0)
+        second = install_dynamic_plugins.InstallLock(lock_path, timeout=0)
+        first.acquire(shared=True)
+        second.acquire(shared=True)
+
+        with pytest.raises(InstallException, match='Timed out'):
+            install_dynamic_plugins.InstallLock(lock_path, timeout=0.2).acquire()
+
+        first.release()
+        second.upgrade()
+        assert not second.shared
+        assert json.loads((tmp_path / 'install-dynamic-plugins.lock').read_text())['pid'] == os.getpid()
+        with pytest.raises(InstallException, match='Timed out'):
+            install_dynamic_plugins.InstallLock(lock_path, timeout=0.2).acquire(shared=True)
+        second.release()
+        assert not os.path.exists(lock_path)
+
+
+    def test_from_environment_rejects_invalid_timeout(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('INSTALL_LOCK_TIMEOUT', 'soon')
+        with pytest.raises(InstallException, match='INSTALL_LOCK_TIMEOUT must be a number of seconds'):
+            install_dynamic_plugins.InstallLock.from_environment(str(tmp_path / 'install-dynamic-plugins.lock'))
+
+
+class TestInstallState:
+    """Test cases for the state used to skip the installation when the plugins are up to date."""
+
+    def test_install_state_round_trip(self, tmp_path):
+        """Test that the state recorded by a completed run is read back, and that a missing state is empty."""
+        plugins = [{'package': './plugin-one', 'plugin_hash': 'hash1', 'pluginConfig': {'a': 1}}]
+        changed = [{'package': './plugin-one', 'plugin_hash': 'hash1', 'pluginConfig': {'a': 2}}]
+        fingerprint = install_dynamic_plugins.desired_state_fingerprint(plugins)
+        assert fingerprint != install_dynamic_plugins.desired_state_fingerprint(changed)
+        assert install_dynamic_plugins.read_install_state(str(tmp_path)) == {}
+
+        install_dynamic_plugins.save_install_state(str(tmp_path), {'fingerprint': fingerprint})
+        assert install_dynamic_plugins.read_install_state(str(tmp_path)) == {'fingerprint': fingerprint}
+
+        install_dynamic_plugins.remove_install_state(str(tmp_path))
+        assert install_dynamic_plugins.read_install_state(str(tmp_path)) == {}
+
+    def test_input_fingerprint_tracks_inputs(self, tmp_path, monkeypatch):
+        """Test that the input fingerprint changes with the configuration files, the environment and the local packages."""
+        monkeypatch.chdir(tmp_path)
+        config = tmp_path / 'dynamic-plugins.yaml'
+        config.write_text('plugins: []')
+        (tmp_path / 'plugin-one').mkdir()
+        package_json = tmp_path / 'plugin-one' / 'package.json'
+        package_json.write_text('{"name": "plugin-one", "version": "1.0.0"}')
+        fingerprint = install_dynamic_plugins.input_fingerprint([str(config)], ['./plugin-one'])
+
+        assert install_dynamic_plugins.input_fingerprint([str(config)], ['./plugin-one']) == fingerprint
+        assert install_dynamic_plugins.input_fingerprint([str(config)], []) != fingerprint
+        monkeypatch.setenv('SKIP_INTEGRITY_CHECK', 'true')
+        assert install_dynamic_plugins.input_fingerprint([str(config)], ['./plugin-one']) != fingerprint
+        monkeypatch.delenv('SKIP_INTEGRITY_CHECK')
+        package_json.write_text('{"name": "plugin-one", "version": "1.0.1"}')
+        assert install_dynamic_plugins.input_fingerprint([str(config)], ['./plugin-one']) != fingerprint
+
+    @pytest.mark.parametrize("plugin,expected", [
+        ({'package': 'oci://quay.io/user/plugin:1.0!plugin'}, False),
+        ({'package': 'oci://quay.io/user/plugin:latest!plugin'}, True),
+        ({'package': 'oci://quay.io/user/plugin:latest!plugin', 'pullPolicy': 'IfNotPresent'}, False),
+        ({'package': 'oci://quay.io/user/plugin:1.0!plugin', 'pullPolicy': 'Always'}, True),
+        ({'package': '@scope/plugin@1.0.0', 'forceDownload': True}, True),
+        ({'package': '@scope/plugin@1.0.0', 'pullPolicy': 'Always', 'disabled': True}, False),
+    ])
+    def test_requires_remote_check(self, plugin, expected):
+        assert install_dynamic_plugins.requires_remote_check(plugin) is expected
+
+
+class TestInstalledPluginManifest:
+    """Test cases for the manifest of the installed plugins kept in the install state."""
+
+    def test_load_trusts_recorded_plugins_and_scans_unknown_directories(self, tmp_path):
+        """Test that recorded plugins are not scanned, unknown plugin directories are, and removed ones are dropped."""
+        (tmp_path / 'plugin-one').mkdir()
+        (tmp_path / 'plugin-one' / 'dynamic-plugin-config.hash').write_text('stale')
+        (tmp_path / 'plugin-two').mkdir()
+        (tmp_path / 'plugin-two' / 'dynamic-plugin-config.hash').write_text('hash2')
+        (tmp_path / 'plugin-two' / 'dynamic-plugin-image.hash').write_text('sha256:abc')
+        (tmp_path / 'not-a-plugin').mkdir()
+        install_state = {'plugins': {
+            'hash1': {'path': 'plugin-one', 'image_digest': None, 'installed_at': '2025-01-01T10:00:00+0000', 'size': 1},
+            'hash3': {'path': 'plugin-three', 'image_digest': None, 'installed_at': '2025-01-01T10:00:00+0000', 'size': 1},
+        }}
+
+        manifest = install_dynamic_plugins.InstalledPluginManifest.load(str(tmp_path), install_state, sorted(os.listdir(tmp_path)))
+
+        assert manifest.plugin_path_by_hash() == {'hash1': 'plugin-one', 'hash2': 'plugin-two'}
+        assert manifest.entries['hash2']['image_digest'] == 'sha256:abc'
+        # Only known once installed: the directory is not walked to compute it
+        assert manifest.entries['hash2']['size'] is None
+
+    def test_load_scans_all_directories_without_manifest(self, tmp_path):
+        (tmp_path / 'plugin-one').mkdir()
+        (tmp_path / 'plugin-one' / 'dynamic-plugin-config.hash').write_text('hash1\n')
+
+        manifest = install_dynamic_plugins.InstalledPluginManifest.load(str(tmp_path), {'plugins': 'corrupted'}, os.listdir(tmp_path))
+
+        assert manifest.plugin_path_by_hash() == {'hash1': 'plugin-one'}
+
+    def test_record_replaces_plugin_at_same_path(self, tmp_path):
+        (tmp_path / 'plugin-one').mkdir()
+        manifest = install_dynamic_plugins.InstalledPluginManifest(str(tmp_path), {'hash1': {'path': 'plugin-one'}})
+
+        manifest.record('hash2', 'plugin-one', 1234)
+        assert manifest.plugin_path_by_hash() == {'hash2': 'plugin-one'}
+        assert manifest.entries['hash2']['size'] == 1234
+        manifest.remove('hash2')
+        assert manifest.entries == {}
+
+
 @pytest.mark.integration
 class TestOciIntegration:
     """Integration tests with real OCI images."""
@@ -2350,6 +4041,31 @@ class TestGetLocalPackageInfo:
         hash2 = hashlib.sha256(json.dumps(info2, sort_keys=True).encode('utf-8')).hexdigest()
         assert hash1 != hash2
 
+    def test_compute_plugin_hash_matches_previous_hashes(self, tmp_path, monkeypatch):
+        """Test that the plugin hash is unchanged from the hash of a deep copy without the untracked fields."""
+        import copy
+
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'local-plugin').mkdir()
+        (tmp_path / 'local-plugin' / 'package.json').write_text(json.dumps({'name': 'local-plugin', 'version': '1.0.0'}))
+        plugins = [
+            {'package': 'oci://quay.io/user/plugin:1.0!plugin', 'version': '1.0', 'pullPolicy': 'Always',
+             'pluginConfig': {'dynamicPlugins': {'frontend': {'plugin': {'mountPoints': [{'mountPoint': 'a'}]}}}}},
+            {'package': '@scope/plugin@1.0.0', 'integrity': 'sha512-abc', 'disabled': False},
+            {'package': './local-plugin', 'pluginConfig': {'a': 1}},
+        ]
+
+        for plugin in plugins:
+            hash_dict = copy.deepcopy(plugin)
+            hash_dict.pop('pluginConfig', None)
+            hash_dict.pop('version', None)
+            if plugin['package'].startswith('./'):
+                hash_dict['_local_package_info'] = install_dynamic_plugins.get_local_package_info(plugin['package'])
+            expected = hashlib.sha256(json.dumps(hash_dict, sort_keys=True).encode('utf-8')).hexdigest()
+            assert install_dynamic_plugins.compute_plugin_hash(plugin) == expected
+        assert 'pluginConfig' in plugins[0]
+
+
 class TestExtractCatalogIndex:
     """Test cases for extract_catalog_index() function."""
 
@@ -2565,7 +4281,7 @@ class TestExtractCatalogIndex:
             assert '@backstage/plugin-catalog' in content
 
         # Verify catalog entities were extracted
-        # Note: copytree copies the contents of marketplace into catalog-entities
+        # Note: the contents of marketplace are moved into catalog-entities
         entities_dir = catalog_entities_parent_dir / "catalog-entities"
         assert entities_dir.exists()
         entity_file = entities_dir / "test-entity.yaml"
@@ -2727,7 +4443,7 @@ class TestExtractCatalogIndex:
         )
 
         # Verify catalog entities directory was created
-        # Note: copytree copies the contents of marketplace into catalog-entities
+        # Note: the contents of marketplace are moved into catalog-entities
         entities_dir = catalog_entities_parent_dir / "catalog-entities"
         assert entities_dir.exists(), "Catalog entities directory should exist"
 
@@ -2766,7 +4482,7 @@ class TestExtractCatalogIndex:
 
         # Verify directory was created
         assert catalog_entities_parent_dir.exists(), "Catalog entities parent directory should be created"
-        # Note: copytree copies the contents of marketplace into catalog-entities
+        # Note: the contents of marketplace are moved into catalog-entities
         entities_dir = catalog_entities_parent_dir / "catalog-entities"
         assert entities_dir.exists(), "Catalog entities directory should exist"
 
@@ -2906,6 +4622,110 @@ class TestExtractCatalogIndex:
         assert 'Successfully extracted dynamic-plugins.default.yaml' in captured.out
         assert 'Successfully extracted extensions catalog entities' in captured.out
 
+    def test_extract_catalog_index_moves_entities_into_place(self, tmp_path, mocker, mock_oci_image):
+        """Test that the catalog entities are extracted next to their destination and renamed into place, not copied."""
+        catalog_mount = tmp_path / "catalog-mount"
+        catalog_mount.mkdir()
+        catalog_entities_parent_dir = tmp_path / "m4rk3tpl4c3"
+        leftover_staging_dir = catalog_entities_parent_dir / ".catalog-entities-staging-leftover"
+        leftover_staging_dir.mkdir(parents=True)
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        mock_result = mocker.Mock()
+        mock_result.returncode = 0
+        mocker.patch('subprocess.run', side_effect=create_mock_skopeo_copy(
+            mock_oci_image['manifest_path'], mock_oci_image['layer_tarball'], mock_result))
+        copytree_spy = mocker.spy(install_dynamic_plugins.shutil, 'copytree')
+
+        install_dynamic_plugins.extract_catalog_index(
+            "quay.io/test/catalog-index:1.9", str(catalog_mount), str(catalog_entities_parent_dir))
+
+        copytree_spy.assert_not_called()
+        assert (catalog_entities_parent_dir / "catalog-entities" / "test-entity.yaml").exists()
+        assert not (catalog_mount / ".catalog-index-temp" / "catalog-entities").exists()
+        assert (catalog_mount / ".catalog-index-temp" / "dynamic-plugins.default.yaml").exists()
+        assert [path.name for path in catalog_entities_parent_dir.iterdir() if path.name.startswith('.catalog-entities-staging-')] == []
+
+    def test_extract_catalog_index_skipped_when_digest_unchanged(self, tmp_path, mocker, mock_oci_image):
+        """Test that an index with the digest of the last extraction is neither copied nor extracted again."""
+        catalog_mount = tmp_path / "catalog-mount"
+        catalog_mount.mkdir()
+        catalog_entities_parent_dir = tmp_path / "m4rk3tpl4c3"
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        raw_manifest = {'value': json.dumps({'layers': [{'digest': 'sha256:abc123def456'}]}).encode('utf-8')}
+        copy = create_mock_skopeo_copy(mock_oci_image['manifest_path'], mock_oci_image['layer_tarball'], mocker.Mock())
+        commands = []
+
+        def mock_run(cmd, **kwargs):
+            commands.append(cmd[1])
+            return mocker.Mock(stdout=raw_manifest['value']) if 'inspect' in cmd else copy(cmd)
+
+        mocker.patch('subprocess.run', side_effect=mock_run)
+
+        def extract():
+            install_dynamic_plugins.clear_run_caches()
+            commands.clear()
+            result = install_dynamic_plugins.extract_catalog_index(
+                "quay.io/test/catalog-index:1.9", str(catalog_mount), str(catalog_entities_parent_dir))
+            with open(result, 'r') as f:
+                content = f.read()
+            install_dynamic_plugins.cleanup_catalog_index_temp_dir(str(catalog_mount))
+            return content
+
+        extract()
+        assert commands == ['inspect', 'copy']
+        assert (catalog_entities_parent_dir / "catalog-entities" / "test-entity.yaml").exists()
+
+        assert extract() == mock_oci_image['yaml_content']
+        assert commands == ['inspect']
+        assert (catalog_entities_parent_dir / "catalog-entities" / "test-entity.yaml").exists()
+
+        # The catalog entities are extracted again when they are missing or when the image changes
+        import shutil as sh
+        sh.rmtree(catalog_entities_parent_dir / "catalog-entities")
+        extract()
+        assert commands == ['inspect', 'copy']
+
+        raw_manifest['value'] = json.dumps({'layers': [{'digest': 'sha256:abc123def456'}], 'annotations': {'new': 'digest'}}).encode('utf-8')
+        extract()
+        assert commands == ['inspect', 'copy']
+
+    def test_extract_catalog_index_ignores_journaled_digest(self, tmp_path, mocker, mock_oci_image):
+        """Test that a resumed run extracts again a catalog index pushed again since the interrupted run."""
+        catalog_mount = tmp_path / "catalog-mount"
+        catalog_mount.mkdir()
+        catalog_entities_parent_dir = tmp_path / "m4rk3tpl4c3"
+
+        mocker.patch('shutil.which', return_value='/usr/bin/skopeo')
+        raw_manifest = {'value': json.dumps({'layers': [{'digest': 'sha256:abc123def456'}]}).encode('utf-8')}
+        copy = create_mock_skopeo_copy(mock_oci_image['manifest_path'], mock_oci_image['layer_tarball'], mocker.Mock())
+        commands = []
+
+        def mock_run(cmd, **kwargs):
+            commands.append(cmd[1])
+            return mocker.Mock(stdout=raw_manifest['value']) if 'inspect' in cmd else copy(cmd)
+
+        mocker.patch('subprocess.run', side_effect=mock_run)
+        journal_path = str(tmp_path / '.install-journal.jsonl')
+
+        def extract():
+            install_dynamic_plugins.clear_run_caches()
+            install_dynamic_plugins.run_journal.open(journal_path, 'fingerprint')
+            commands.clear()
+            install_dynamic_plugins.extract_catalog_index(
+                "quay.io/test/catalog-index:1.9", str(catalog_mount), str(catalog_entities_parent_dir))
+            install_dynamic_plugins.cleanup_catalog_index_temp_dir(str(catalog_mount))
+
+        # Interrupted run, then the index is pushed again before the run resumes
+        extract()
+        assert commands == ['inspect', 'copy']
+        raw_manifest['value'] = json.dumps({'layers': [{'digest': 'sha256:abc123def456'}], 'annotations': {'new': 'digest'}}).encode('utf-8')
+
+        extract()
+        assert install_dynamic_plugins.run_journal.resumed
+        assert commands == ['inspect', 'copy']
+
     def test_extract_catalog_index_without_catalog_entities(self, tmp_path, mocker, capsys):
         """Test that extraction succeeds with warning if neither extensions nor marketplace directory exists."""
         import tarfile
@@ -3064,6 +4884,92 @@ class TestResolveImageReference:
         result = install_dynamic_plugins.resolve_image_reference('oci://registry.access.redhat.com/rhdh/catalog/plugin-name:v2.0')
         assert result == 'oci://quay.io/rhdh/catalog/plugin-name:v2.0'
 
+    def test_resolution_is_memoized_per_image(self, mocker):
+        """Test that each image is probed only once per run, whatever its protocol prefix."""
+        mock_exists = mocker.patch.object(install_dynamic_plugins, 'image_exists_in_registry', return_value=False)
+
+        for image in [
+            'oci://registry.access.redhat.com/rhdh/plugin:v1.0',
+            'docker://registry.access.redhat.com/rhdh/plugin:v1.0',
+            'registry.access.redhat.com/rhdh/plugin:v1.0',
+        ]:
+            result = install_dynamic_plugins.resolve_image_reference(image)
+            assert result.endswith('quay.io/rhdh/plugin:v1.0')
+
+        mock_exists.assert_called_once_with('docker://registry.access.redhat.com/rhdh/plugin:v1.0')
+
+    def test_resolution_is_memoized_across_threads(self, mocker):
+        """Test that concurrent resolutions of the same image probe the registry only once."""
+        import concurrent.futures
+        import time
+
+        def slow_exists(image_url):
+            time.sleep(0.05)
+            return True
+
+        mock_exists = mocker.patch.object(install_dynamic_plugins, 'image_exists_in_registry', side_effect=slow_exists)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(
+                install_dynamic_plugins.resolve_image_reference,
+                ['oci://registry.access.redhat.com/rhdh/plugin:v1.0'] * 4
+            ))
+
+        assert results == ['oci://registry.access.redhat.com/rhdh/plugin:v1.0'] * 4
+        mock_exists.assert_called_once()
+
+    def test_fallback_is_recorded(self, mocker):
+        """Test that the images resolved to the fallback registry are recorded."""
+        mocker.patch.object(
+            install_dynamic_plugins, 'image_exists_in_registry',
+            side_effect=lambda image_url: 'found' in image_url
+        )
+
+        install_dynamic_plugins.resolve_image_reference('oci://registry.access.redhat.com/rhdh/found:v1.0')
+        install_dynamic_plugins.resolve_image_reference('oci://registry.access.redhat.com/rhdh/missing:v1.0')
+
+        assert install_dynamic_plugins.fallback_image_references() == ['quay.io/rhdh/missing:v1.0']
+
+    def test_resolution_persisted_within_ttl(self, tmp_path, mocker):
+        """Test that persisted resolutions are reused by a later run within the TTL."""
+        cache_file = str(tmp_path / 'cache.json')
+        mock_exists = mocker.patch.object(install_dynamic_plugins, 'image_exists_in_registry', return_value=False)
+
+        install_dynamic_plugins.image_resolution_cache.configure(cache_file, ttl=60)
+        install_dynamic_plugins.resolve_image_reference('oci://registry.access.redhat.com/rhdh/plugin:v1.0')
+        install_dynamic_plugins.image_resolution_cache.save()
+
+        # Simulate a new run
+        install_dynamic_plugins.clear_run_caches()
+        install_dynamic_plugins.image_resolution_cache.configure(cache_file, ttl=60)
+        result = install_dynamic_plugins.resolve_image_reference('oci://registry.access.redhat.com/rhdh/plugin:v1.0')
+
+        assert result == 'oci://quay.io/rhdh/plugin:v1.0'
+        mock_exists.assert_called_once()
+
+    def test_resolution_persisted_entries_expire(self, tmp_path, mocker):
+        """Test that persisted resolutions older than the TTL are probed again."""
+        cache_file = tmp_path / 'cache.json'
+        cache_file.write_text(json.dumps({
+            'registry.access.redhat.com/rhdh/plugin:v1.0': {
+                'value': {'image': 'quay.io/rhdh/plugin:v1.0', 'fallback': True},
+                'timestamp': 0
+            }
+        }))
+        mock_exists = mocker.patch.object(install_dynamic_plugins, 'image_exists_in_registry', return_value=True)
+
+        install_dynamic_plugins.image_resolution_cache.configure(str(cache_file), ttl=60)
+        result = install_dynamic_plugins.resolve_image_reference('oci://registry.access.redhat.com/rhdh/plugin:v1.0')
+
+        assert result == 'oci://registry.access.redhat.com/rhdh/plugin:v1.0'
+        mock_exists.assert_called_once()
+
+    def test_configure_run_caches_invalid_ttl(self, tmp_path, monkeypatch):
+        """Test that an invalid IMAGE_RESOLUTION_CACHE_TTL raises InstallException."""
+        monkeypatch.setenv('IMAGE_RESOLUTION_CACHE_TTL', 'one hour')
+        with pytest.raises(InstallException, match='IMAGE_RESOLUTION_CACHE_TTL'):
+            install_dynamic_plugins.configure_run_caches(str(tmp_path))
+
 
 class TestPreMergeOciDisabledState:
     """Test cases for pre_merge_oci_disabled_state function."""
@@ -3736,6 +5642,29 @@ class TestExtractExtraCatalogIndex:
         captured = capsys.readouterr()
         assert "Successfully extracted extensions catalog entities from extra index image" in captured.out
 
+    def test_skipped_when_digest_unchanged(self, tmp_path, mocker, mock_extra_oci_image, capsys):
+        """Test that an extra index with the digest of the last extraction into its subdirectory is not extracted again."""
+        catalog_entities_parent_dir = tmp_path / "extensions"
+
+        mocker.patch("shutil.which", return_value="/usr/bin/skopeo")
+        copy = create_mock_skopeo_copy(mock_extra_oci_image["manifest_path"], mock_extra_oci_image["layer_tarball"], mocker.Mock())
+        commands = []
+
+        def mock_run(cmd, **kwargs):
+            commands.append(cmd[1])
+            return mocker.Mock(stdout=json.dumps({"layers": []}).encode("utf-8")) if "inspect" in cmd else copy(cmd)
+
+        mocker.patch("subprocess.run", side_effect=mock_run)
+
+        for _ in range(2):
+            install_dynamic_plugins.clear_run_caches()
+            install_dynamic_plugins.extract_extra_catalog_index(
+                "quay.io/rhdh-community/plugin-catalog-index:1.10", "community", str(catalog_entities_parent_dir))
+
+        assert commands == ["inspect", "copy", "inspect"]
+        assert (catalog_entities_parent_dir / "community" / "catalog-entities" / "community-plugin.yaml").exists()
+        assert "Extra catalog index image is unchanged" in capsys.readouterr().out
+
     def test_marketplace_fallback(self, tmp_path, mocker, mock_extra_oci_image_marketplace, capsys):
         """Test that extraction falls back to marketplace directory."""
         catalog_entities_parent_dir = tmp_path / "extensions"
@@ -3887,3 +5816,77 @@ class TestExtractExtraCatalogIndex:
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
 
+
+
+class TestCatalogIndexExtractor:
+    """Test cases for the background extraction of the catalog index images."""
+
+    def test_extractions_run_concurrently(self, tmp_path, mocker):
+        """Test that the primary index and the extra indexes with distinct subdirectories are extracted concurrently."""
+        import threading
+
+        barrier = threading.Barrier(3, timeout=5)
+
+        def extract(*args):
+            barrier.wait()
+            return str(tmp_path / 'dynamic-plugins.default.yaml')
+
+        mocker.patch.object(install_dynamic_plugins, 'extract_catalog_index', side_effect=extract)
+        mocker.patch.object(install_dynamic_plugins, 'extract_extra_catalog_index', side_effect=extract)
+
+        extractor = install_dynamic_plugins.CatalogIndexExtractor(str(tmp_path), str(tmp_path / 'extensions'))
+        extractor.start('quay.io/rhdh/index:1.9', [('one', 'quay.io/one:1'), ('two', 'quay.io/two:1')])
+
+        assert extractor.default_plugins_file() == str(tmp_path / 'dynamic-plugins.default.yaml')
+        extractor.wait()
+
+    def test_extractions_sharing_a_subdirectory_are_sequential(self, tmp_path, mocker):
+        """Test that the extra indexes sharing a subdirectory are extracted in declaration order, with the overwrite warning."""
+        calls = []
+        mocker.patch.object(install_dynamic_plugins, 'extract_extra_catalog_index', side_effect=lambda *args: calls.append(args))
+
+        extractor = install_dynamic_plugins.CatalogIndexExtractor(str(tmp_path), str(tmp_path / 'extensions'))
+        extractor.start('', [('same', 'quay.io/first:1'), ('same', 'quay.io/second:1')])
+        extractor.wait()
+
+        extra_dir = str(tmp_path / 'extensions' / 'extra')
+        assert calls == [
+            ('quay.io/first:1', 'same', extra_dir, None),
+            ('quay.io/second:1', 'same', extra_dir, 'quay.io/first:1'),
+        ]
+        assert extractor.default_plugins_file() is None
+
+    def test_wait_raises_extraction_errors(self, tmp_path, mocker):
+        """Test that the errors of the background extractions are raised when waiting for them."""
+        mocker.patch.object(install_dynamic_plugins, 'extract_catalog_index', return_value='default.yaml')
+        mocker.patch.object(install_dynamic_plugins, 'extract_extra_catalog_index',
+                            side_effect=InstallException('Failed to download extra catalog index image'))
+
+        extractor = install_dynamic_plugins.CatalogIndexExtractor(str(tmp_path), str(tmp_path / 'extensions'))
+        extractor.start('quay.io/rhdh/index:1.9', [('community', 'quay.io/community:1')])
+
+        assert extractor.default_plugins_file() == 'default.yaml'
+        with pytest.raises(InstallException, match='Failed to download extra catalog index image'):
+            extractor.wait()
+
+    def test_catalog_entities_lock_serializes_extractions(self, tmp_path):
+        """Test that an extraction into a catalog entities directory waits for the one in progress."""
+        import threading
+        import time
+
+        parent_dir = str(tmp_path / 'extensions')
+        entered = []
+
+        def extract():
+            with install_dynamic_plugins.catalog_entities_lock(parent_dir):
+                entered.append(True)
+
+        with install_dynamic_plugins.catalog_entities_lock(parent_dir):
+            thread = threading.Thread(target=extract, daemon=True)
+            thread.start()
+            time.sleep(0.1)
+            assert not entered
+        thread.join(timeout=5)
+
+        assert entered
+        assert os.path.exists(os.path.join(parent_dir, install_dynamic_plugins.CATALOG_ENTITIES_LOCK_FILE))